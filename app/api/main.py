@@ -1,10 +1,12 @@
 from fastapi import APIRouter
 
-from app.api.routes import login, users, instruments
+from app.api.routes import login, users, instruments, prices, fx
 
 # - - - - - - - - - - - - - - - - - - -
 
 api_router = APIRouter()
 api_router.include_router(login.router)
 api_router.include_router(users.router)
-api_router.include_router(instruments.router)
\ No newline at end of file
+api_router.include_router(instruments.router)
+api_router.include_router(prices.router)
+api_router.include_router(fx.router)
\ No newline at end of file
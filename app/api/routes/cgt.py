@@ -0,0 +1,52 @@
+'''
+Module for handling capital gains endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from fastapi import APIRouter, HTTPException
+
+from app.models import CgtReportPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/CGT
+
+@router.get(
+    "/",
+    response_model=CgtReportPublic
+)
+def get_cgt_report(*, session: SessionDep, user_id: int, tax_year: int=None) -> CgtReportPublic:
+    """
+    Get UK capital gains report for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        tax_year (int, optional): Calendar year the tax year starts in, all disposals if None. Defaults to None.
+
+    Returns:
+        CgtReportPublic: Disposals and totals in GBP.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    try:
+        report = crud.get_cgt_report(session=session, user_id=user_id, tax_year=tax_year)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return report
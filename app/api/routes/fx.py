@@ -0,0 +1,78 @@
+'''
+Module for handling FX rate endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
+
+from app.models import FxRateCreate, FxRatesPublic, FxRatesLoaded
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter(prefix="/fx",tags=["fx"])
+
+# - - - - - - - - - - - - - - - - - - -
+# POST /FX/RATES
+
+@router.post(
+    "/rates",
+    response_model=FxRatesLoaded
+)
+def load_fx_rates(*, session: SessionDep, rates_in: list[FxRateCreate]) -> FxRatesLoaded:
+    """
+    Bulk load FX rate history.
+
+    Args:
+        session (SessionDep): SQL session.
+        rates_in (list[FxRateCreate]): Rates to load.
+
+    Returns:
+        FxRatesLoaded: Number of rates loaded.
+    """
+    # Check valid pairs.
+    if any(rate_in.from_currency == rate_in.to_currency for rate_in in rates_in):
+        raise HTTPException(
+            status_code=400,
+            detail="Rates must convert between different currencies."
+        )
+
+    count = crud.upsert_fx_rates(session=session, rates=rates_in)
+    return FxRatesLoaded(count=count)
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /FX/RATES
+
+@router.get(
+    "/rates",
+    response_model=FxRatesPublic
+)
+def get_fx_rates(*, session: SessionDep, from_currency: str=None, to_currency: str=None, start_date: str=None, end_date: str=None) -> FxRatesPublic:
+    """
+    Get FX rate history.
+
+    Args:
+        session (SessionDep): SQL session.
+        from_currency (str, optional): Currency converted from. Defaults to None.
+        to_currency (str, optional): Currency converted to. Defaults to None.
+        start_date (str, optional): Start date. Defaults to None.
+        end_date (str, optional): End date. Defaults to None.
+
+    Returns:
+        FxRatesPublic: Rates.
+    """
+    # Convert dates.
+    if start_date:
+        start_date = datetime.strptime(start_date,"%d/%m/%Y").date()
+    if end_date:
+        end_date = datetime.strptime(end_date,"%d/%m/%Y").date()
+
+    rates = crud.get_fx_rates(
+        session=session, from_currency=from_currency, to_currency=to_currency, start_date=start_date, end_date=end_date
+    )
+    return rates
@@ -0,0 +1,52 @@
+'''
+Module for handling point-in-time holdings endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import date, datetime
+
+from fastapi import APIRouter, HTTPException
+
+from app.models import PositionsPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/HOLDINGS
+
+@router.get(
+    "/",
+    response_model=PositionsPublic
+)
+def get_holdings(*, session: SessionDep, user_id: int, as_of: str=None) -> PositionsPublic:
+    """
+    Get holdings for a given user at the end of a date.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        as_of (str, optional): Date to get holdings at, today if None. Defaults to None.
+
+    Returns:
+        PositionsPublic: Open positions at the date.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    # Convert date.
+    if as_of:
+        as_of = datetime.strptime(as_of,"%d/%m/%Y").date()
+
+    holdings = crud.get_holdings(session=session, user_id=user_id, as_of=as_of or date.today())
+    return holdings
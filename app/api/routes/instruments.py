@@ -5,10 +5,12 @@ Created on 02-07-2025
 @author: Harry New
 
 '''
+from datetime import datetime
+
 from fastapi import APIRouter, HTTPException
-from sqlmodel import select, func
 
-from app.models import InstrumentBase, Instrument, InstrumentsPublic, InstrumentUpdate
+from app.models import InstrumentBase, Instrument, InstrumentsPublic, InstrumentUpdate, InstrumentPriceCreate, InstrumentPricesPublic, InstrumentPricesLoaded, InstrumentPriceUpdate, InstrumentPricesUpdated, InstrumentCacheStats
+from app.core.cache import instrument_cache
 from app.api.deps import SessionDep
 from app import crud
 
@@ -16,6 +18,9 @@ from app import crud
 
 router = APIRouter(prefix="/instruments",tags=["instruments"])
 
+# Maximum number of search results per request.
+MAX_SEARCH_LIMIT = 100
+
 # - - - - - - - - - - - - - - - - - - -
 # GET /INSTRUMENT
 
@@ -23,9 +28,9 @@ router = APIRouter(prefix="/instruments",tags=["instruments"])
     "/",
     response_model=InstrumentsPublic
 )
-def get_instruments(*, session: SessionDep, name: str=None, exchange: str=None, symbol: str=None, currency: str=None) -> InstrumentsPublic:
+def get_instruments(*, session: SessionDep, name: str=None, exchange: str=None, symbol: str=None, currency: str=None, after: str=None, limit: int=100) -> InstrumentsPublic:
     """
-    Get all instruments.
+    Get instruments matching all given filters, paginated by an opaque cursor.
 
     Args:
         session (SessionDep): SQL session.
@@ -33,27 +38,27 @@ def get_instruments(*, session: SessionDep, name: str=None, exchange: str=None,
         exchange (str, optional): Exchange. Defaults to None.
         symbol (str, optional): Symbol. Defaults to None.
         currency (str, optional): Currency. Defaults to None.
+        after (str, optional): Cursor from previous page. Defaults to None.
+        limit (int, optional): Page size. Defaults to 100.
 
     Returns:
-        InstrumentsPublic: List of instruments.
-    """
-    # Counts all instruments, independent of what instruments returned.
-    count_statement = select(func.count()).select_from(Instrument)
-    count = session.exec(count_statement).one()
-
-    # Filtering instruments.
-    statement = select(Instrument)
-    if name: 
-        statement = statement.where(Instrument.name == name)
-    elif exchange:
-        statement = statement.where(Instrument.exchange == exchange)
-    elif symbol:
-        statement = statement.where(Instrument.symbol == symbol)
-    elif currency:
-        statement = statement.where(Instrument.currency == currency)
-    instruments = session.exec(statement).all()
-
-    return InstrumentsPublic(data=instruments, count=count)
+        InstrumentsPublic: List of instruments, with the count matching the filters.
+    """
+    if limit < 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Limit must be positive."
+        )
+
+    # Get instruments.
+    try:
+        instruments = crud.get_instruments(session=session, name=name, exchange=exchange, symbol=symbol, currency=currency, after=after, limit=limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid cursor."
+        )
+    return instruments
 
 # - - - - - - - - - - - - - - - - - - -
 # POST /INSTRUMENT
@@ -86,6 +91,114 @@ def create_instrument(*, session: SessionDep, instrument_in: InstrumentBase) ->
     )
     return instrument
 
+# - - - - - - - - - - - - - - - - - - -
+# POST /INSTRUMENTS/PRICES/HISTORY
+
+@router.post(
+    "/prices/history",
+    response_model=InstrumentPricesLoaded
+)
+def load_instrument_prices(*, session: SessionDep, prices_in: list[InstrumentPriceCreate]) -> InstrumentPricesLoaded:
+    """
+    Bulk load historical price bars for any instruments.
+
+    Args:
+        session (SessionDep): SQL session.
+        prices_in (list[InstrumentPriceCreate]): Bars to load.
+
+    Returns:
+        InstrumentPricesLoaded: Number of bars loaded.
+    """
+    # Check valid instruments.
+    instrument_ids = {price_in.instrument_id for price_in in prices_in}
+    missing_ids = instrument_ids - crud.get_instrument_ids(session=session, ids=instrument_ids)
+    if missing_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No instrument exists with instrument ids: {sorted(missing_ids)}."
+        )
+
+    count = crud.upsert_instrument_prices(session=session, prices=prices_in)
+    return InstrumentPricesLoaded(count=count)
+
+# - - - - - - - - - - - - - - - - - - -
+# PUT /INSTRUMENTS/PRICES
+
+@router.put(
+    "/prices",
+    response_model=InstrumentPricesUpdated
+)
+def update_instrument_prices(*, session: SessionDep, prices_in: list[InstrumentPriceUpdate]) -> InstrumentPricesUpdated:
+    """
+    Update prices of many instruments at once.
+
+    Args:
+        session (SessionDep): SQL session.
+        prices_in (list[InstrumentPriceUpdate]): Prices with an instrument id or symbol.
+
+    Returns:
+        InstrumentPricesUpdated: Number of instruments updated and unmatched identifiers.
+    """
+    # Check every price identifies an instrument.
+    if any(price_in.id is None and price_in.symbol is None for price_in in prices_in):
+        raise HTTPException(
+            status_code=400,
+            detail="Each price requires an instrument id or symbol."
+        )
+
+    updated = crud.update_instrument_prices_bulk(session=session, prices=prices_in)
+    return updated
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /INSTRUMENTS/SEARCH
+
+@router.get(
+    "/search",
+    response_model=InstrumentsPublic
+)
+def search_instruments(*, session: SessionDep, q: str, limit: int=20) -> InstrumentsPublic:
+    """
+    Search instruments by symbol and name, with prefix and typo-tolerant matching.
+
+    Args:
+        session (SessionDep): SQL session.
+        q (str): Search text.
+        limit (int, optional): Maximum number of results. Defaults to 20.
+
+    Returns:
+        InstrumentsPublic: Instruments, best match first.
+    """
+    # Check valid query.
+    if not q.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Search query must not be empty."
+        )
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_SEARCH_LIMIT}."
+        )
+
+    instruments = crud.search_instruments(session=session, query=q, limit=limit)
+    return instruments
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /INSTRUMENTS/CACHE
+
+@router.get(
+    "/cache",
+    response_model=InstrumentCacheStats
+)
+def get_instrument_cache_stats() -> InstrumentCacheStats:
+    """
+    Get hit and miss counters of the instrument cache.
+
+    Returns:
+        InstrumentCacheStats: Cache counters.
+    """
+    return InstrumentCacheStats(**instrument_cache.stats())
+
 # - - - - - - - - - - - - - - - - - - -
 # GET /INSTRUMENTS/{INSTRUMENT_ID}
 
@@ -113,6 +226,43 @@ def get_instrument(*, session: SessionDep, instrument_id: int) -> Instrument:
         )
     return instrument
 
+# - - - - - - - - - - - - - - - - - - -
+# GET /INSTRUMENTS/{INSTRUMENT_ID}/PRICES
+
+@router.get(
+    "/{instrument_id}/prices",
+    response_model=InstrumentPricesPublic
+)
+def get_instrument_prices(*, session: SessionDep, instrument_id: int, start_date: str=None, end_date: str=None) -> InstrumentPricesPublic:
+    """
+    Get price history of an instrument.
+
+    Args:
+        session (SessionDep): SQL session.
+        instrument_id (int): Instrument id.
+        start_date (str, optional): Start date. Defaults to None.
+        end_date (str, optional): End date. Defaults to None.
+
+    Returns:
+        InstrumentPricesPublic: Price bars.
+    """
+    # Get instrument.
+    instrument = crud.get_instrument_by_id(session=session, id=instrument_id)
+    if not instrument:
+        raise HTTPException(
+            status_code=400,
+            detail="No instrument exists with instrument id."
+        )
+
+    # Convert dates.
+    if start_date:
+        start_date = datetime.strptime(start_date,"%d/%m/%Y").date()
+    if end_date:
+        end_date = datetime.strptime(end_date,"%d/%m/%Y").date()
+
+    prices = crud.get_instrument_prices(session=session, instrument_id=instrument_id, start_date=start_date, end_date=end_date)
+    return prices
+
 # - - - - - - - - - - - - - - - - - - -
 # UPDATE /INSTRUMENTS/{INSTRUMENT_ID}
 
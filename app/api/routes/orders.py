@@ -6,25 +6,38 @@ Created on 06-07-2025
 
 '''
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlmodel import Session
 
-from app.models import Order, OrderCreate, OrdersPublic, OrderUpdate
+from app.models import Order, OrderCreate, OrdersPublic, OrderUpdate, OrderImportError, OrdersImportReport
 from app.api.deps import SessionDep
+from app.core.db import engine
+from app.core.order_io import OrderRowParser, FORMATS, MEDIA_TYPES, format_order_rows
 from app import crud
 
 # - - - - - - - - - - - - - - - - - - -
 
 router = APIRouter()
 
+# Rows validated and inserted per round trip during imports.
+IMPORT_BATCH_SIZE = 5000
+# Largest basket accepted by the batch endpoint.
+MAX_BATCH_SIZE = 1000
+# Errors listed individually in an import report, the rest are only counted.
+MAX_IMPORT_ERRORS = 1000
+
 # - - - - - - - - - - - - - - - - - - -
 
 @router.get(
     "/",
     response_model=OrdersPublic
 )
-def get_orders(*, session: SessionDep, user_id: int, instrument_id: int=None, start_date: str=None, end_date: str=None, type: str=None) -> OrdersPublic:
+def get_orders(*, session: SessionDep, user_id: int, instrument_id: int=None, start_date: str=None, end_date: str=None, type: str=None, after: str=None, limit: int=100) -> OrdersPublic:
     """
-    Get orders endpoint.
+    Get orders endpoint, paginated by an opaque cursor.
 
     Args:
         session (SessionDep): SQL session.
@@ -33,6 +46,8 @@ def get_orders(*, session: SessionDep, user_id: int, instrument_id: int=None, st
         start_date (str, optional): Start date. Defaults to None.
         end_date (str, optional): End date. Defaults to None.
         type (str, optional): Order type. Defaults to None.
+        after (str, optional): Cursor from previous page. Defaults to None.
+        limit (int, optional): Page size. Defaults to 100.
 
     Returns:
         OrdersPublic: Order list.
@@ -51,8 +66,20 @@ def get_orders(*, session: SessionDep, user_id: int, instrument_id: int=None, st
     if end_date:
         end_date = datetime.strptime(end_date,"%d/%m/%Y")
     
+    if limit < 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Limit must be positive."
+        )
+
     # Get orders.
-    orders = crud.get_orders(session=session, user_id=user_id, instrument_id=instrument_id, start_date=start_date, end_date=end_date, type=type)
+    try:
+        orders = crud.get_orders(session=session, user_id=user_id, instrument_id=instrument_id, start_date=start_date, end_date=end_date, type=type, after=after, limit=limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid cursor."
+        )
     return orders
 
 
@@ -92,17 +119,158 @@ def create_order(*, session: SessionDep, user_id: int, order_in: OrderCreate) ->
     return order
 
 
+@router.post(
+    "/batch",
+    response_model=OrdersPublic
+)
+def create_orders(*, session: SessionDep, user_id: int, orders_in: list[OrderCreate]) -> OrdersPublic:
+    """
+    Create a basket of orders at once.
+
+    The whole body is validated in one pass, the user and all instruments are
+    checked with one query each and the orders are inserted in one statement.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        orders_in (list[OrderCreate]): Orders details.
+
+    Returns:
+        OrdersPublic: New orders.
+    """
+    if len(orders_in) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No more than {MAX_BATCH_SIZE} orders can be created at once."
+        )
+
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid user found with user id."
+        )
+
+    # Check valid instruments.
+    instrument_ids = {order_in.instrument_id for order_in in orders_in}
+    missing_ids = instrument_ids - crud.get_instrument_ids(session=session, ids=instrument_ids)
+    if missing_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No valid instrument found with instrument ids: {sorted(missing_ids)}."
+        )
+
+    orders = crud.create_orders(session=session, user_id=user_id, order_creates=orders_in)
+    return OrdersPublic(data=orders, count=len(orders))
+
+
+def _import_batch(*, session: Session, user_id: int, rows: list[tuple[int, dict | str]], report: OrdersImportReport) -> None:
+    """
+    Validate and insert a batch of imported rows.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        rows (list[tuple[int, dict | str]]): Row number and parsed row or parse error.
+        report (OrdersImportReport): Report to update.
+    """
+    def record_error(row_number: int, detail: str):
+        report.failed += 1
+        if len(report.errors) < MAX_IMPORT_ERRORS:
+            report.errors.append(OrderImportError(row=row_number, detail=detail))
+
+    # Validate rows.
+    valid = []
+    for row_number, row in rows:
+        if isinstance(row, str):
+            record_error(row_number, row)
+            continue
+        try:
+            valid.append((row_number, OrderCreate.model_validate(row)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            record_error(row_number, f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}")
+
+    # Check all referenced instruments in one query.
+    instrument_ids = crud.get_instrument_ids(session=session, ids={order_create.instrument_id for _, order_create in valid})
+    order_creates = []
+    for row_number, order_create in valid:
+        if order_create.instrument_id not in instrument_ids:
+            record_error(row_number, "No valid instrument found with instrument id.")
+        else:
+            order_creates.append(order_create)
+
+    report.imported += crud.insert_orders(session=session, user_id=user_id, order_creates=order_creates)
+
+
+@router.post(
+    "/import",
+    response_model=OrdersImportReport
+)
+async def import_orders(*, session: SessionDep, user_id: int, request: Request, format: str="csv") -> OrdersImportReport:
+    """
+    Import orders from a streamed CSV or NDJSON body.
+
+    Rows are inserted in batches within a single transaction. Invalid rows are
+    skipped and listed in the report. Dates may be ISO, or dd/mm/yyyy as
+    taken by the other endpoints.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        request (Request): Request with CSV or NDJSON body.
+        format (str, optional): Body format, csv or ndjson. Defaults to "csv".
+
+    Returns:
+        OrdersImportReport: Import report.
+    """
+    # Check valid user.
+    user = await run_in_threadpool(crud.get_user_by_id, session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid user found with user id."
+        )
+
+    try:
+        parser = OrderRowParser(format)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    # Parse body as it arrives, flushing full batches.
+    report = OrdersImportReport(imported=0, failed=0, errors=[])
+    rows = []
+    async for chunk in request.stream():
+        rows.extend(parser.feed(chunk))
+        if len(rows) >= IMPORT_BATCH_SIZE:
+            await run_in_threadpool(_import_batch, session=session, user_id=user_id, rows=rows, report=report)
+            rows = []
+    rows.extend(parser.close())
+    await run_in_threadpool(_import_batch, session=session, user_id=user_id, rows=rows, report=report)
+
+    await run_in_threadpool(session.commit)
+    return report
+
+
 @router.delete(
     "/",
     response_model=OrdersPublic
 )
-def delete_orders(*, session: SessionDep, user_id: int) -> OrdersPublic:
+def delete_orders(*, session: SessionDep, user_id: int, instrument_id: int=None, start_date: str=None, end_date: str=None, type: str=None) -> OrdersPublic:
     """
     Delete orders.
 
     Args:
         session (SessionDep): SQL session.
         user_id (int): User id.
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (str, optional): Start date. Defaults to None.
+        end_date (str, optional): End date. Defaults to None.
+        type (str, optional): Order type. Defaults to None.
 
     Returns:
         OrdersPublic: Deleted orders.
@@ -114,15 +282,71 @@ def delete_orders(*, session: SessionDep, user_id: int) -> OrdersPublic:
             status_code=400,
             detail="No valid user found with user id."
         )
+
+    # Convert dates.
+    if start_date:
+        start_date = datetime.strptime(start_date,"%d/%m/%Y")
+    if end_date:
+        end_date = datetime.strptime(end_date,"%d/%m/%Y")
     
     # Delete orders.
-    orders = crud.get_orders(session=session, user_id=user_id)
-    for order in orders.data:
-        crud.delete_order(session=session, order=order)
-
+    orders = crud.delete_orders_bulk(session=session, user_id=user_id, instrument_id=instrument_id, start_date=start_date, end_date=end_date, type=type)
     return orders
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse
+)
+def export_orders(*, session: SessionDep, user_id: int, format: str="ndjson", instrument_id: int=None, start_date: str=None, end_date: str=None, type: str=None) -> StreamingResponse:
+    """
+    Export orders as a streamed CSV or NDJSON body.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        format (str, optional): Body format, csv or ndjson. Defaults to "ndjson".
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (str, optional): Start date. Defaults to None.
+        end_date (str, optional): End date. Defaults to None.
+        type (str, optional): Order type. Defaults to None.
+
+    Returns:
+        StreamingResponse: Streamed orders.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid user found with user id."
+        )
+
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format, expected one of {', '.join(FORMATS)}."
+        )
+
+    # Convert dates.
+    if start_date:
+        start_date = datetime.strptime(start_date,"%d/%m/%Y")
+    if end_date:
+        end_date = datetime.strptime(end_date,"%d/%m/%Y")
+
+    def generate():
+        # Request session is closed once streaming starts, so hold a dedicated one.
+        with Session(engine) as stream_session:
+            batches = crud.stream_orders(session=stream_session, user_id=user_id, instrument_id=instrument_id, start_date=start_date, end_date=end_date, type=type)
+            yield from format_order_rows(batches, format)
+
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=orders.{format}"}
+    )
+
+
 @router.get(
     "/{order_id}",
     response_model=Order
@@ -0,0 +1,73 @@
+'''
+Module for handling positions endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from fastapi import APIRouter, HTTPException
+
+from app.models import PositionsPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/POSITIONS
+
+@router.get(
+    "/",
+    response_model=PositionsPublic
+)
+def get_positions(*, session: SessionDep, user_id: int) -> PositionsPublic:
+    """
+    Get open positions for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        PositionsPublic: Open positions.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    positions = crud.get_positions(session=session, user_id=user_id)
+    return positions
+
+
+
+@router.post(
+    "/rebuild",
+    response_model=PositionsPublic
+)
+def rebuild_positions(*, session: SessionDep, user_id: int) -> PositionsPublic:
+    """
+    Rebuild positions for a given user from all orders.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        PositionsPublic: Open positions.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    positions = crud.rebuild_positions(session=session, user_id=user_id)
+    return positions
@@ -0,0 +1,88 @@
+'''
+Module for handling live price streaming endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import asyncio
+import json
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.core.hub import Subscriber, price_hub
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter(prefix="/ws",tags=["prices"])
+
+# - - - - - - - - - - - - - - - - - - -
+# WEBSOCKET /WS/PRICES
+
+def _parse_message(text: str) -> tuple[str, set[int]]:
+    """
+    Parse a subscription message.
+
+    Args:
+        text (str): Message, such as {"subscribe": [1, 2]} or {"unsubscribe": [1]}.
+
+    Raises:
+        ValueError: Message is not a valid subscription change.
+
+    Returns:
+        tuple[str, set[int]]: Action and instrument ids.
+    """
+    try:
+        message = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError("Message is not valid JSON.") from e
+    if not isinstance(message, dict) or len(message) != 1:
+        raise ValueError("Expected one of subscribe or unsubscribe.")
+    action, instrument_ids = next(iter(message.items()))
+    if action not in ("subscribe", "unsubscribe"):
+        raise ValueError("Expected one of subscribe or unsubscribe.")
+    if not isinstance(instrument_ids, list) or not all(type(id) is int for id in instrument_ids):
+        raise ValueError("Instrument ids must be a list of integers.")
+    return action, set(instrument_ids)
+
+
+@router.websocket("/prices")
+async def stream_prices(websocket: WebSocket):
+    """
+    Stream price updates for subscribed instruments.
+
+    Clients send {"subscribe": [ids]} or {"unsubscribe": [ids]} and are sent
+    {"subscribed": [ids]} back, then every price update for those
+    instruments as it is written. Clients that fall behind lose their oldest
+    queued updates.
+
+    Args:
+        websocket (WebSocket): Client connection.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+
+    async def send_updates():
+        while True:
+            update = await subscriber.queue.get()
+            await websocket.send_json(update)
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        while True:
+            try:
+                action, instrument_ids = _parse_message(await websocket.receive_text())
+            except ValueError as e:
+                await websocket.send_json({"detail": str(e)})
+                continue
+
+            if action == "subscribe":
+                price_hub.subscribe(subscriber, instrument_ids)
+            else:
+                price_hub.unsubscribe(subscriber, instrument_ids)
+            await websocket.send_json({"subscribed": sorted(subscriber.instrument_ids)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        price_hub.unsubscribe(subscriber)
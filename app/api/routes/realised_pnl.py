@@ -0,0 +1,52 @@
+'''
+Module for handling realised profit and loss endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from fastapi import APIRouter, HTTPException
+
+from app.models import RealisedPnlPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/REALISED-PNL
+
+@router.get(
+    "/",
+    response_model=RealisedPnlPublic
+)
+def get_realised_pnl(*, session: SessionDep, user_id: int, method: str=None) -> RealisedPnlPublic:
+    """
+    Get realised profit and loss with per-lot detail for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        method (str, optional): Lot matching method, the user's setting if None. Defaults to None.
+
+    Returns:
+        RealisedPnlPublic: Matched lots and total.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    try:
+        realised_pnl = crud.get_realised_pnl(session=session, user_id=user_id, method=method or user.lot_method)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return realised_pnl
@@ -0,0 +1,58 @@
+'''
+Module for handling portfolio return endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
+
+from app.models import ReturnsPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/RETURNS
+
+@router.get(
+    "/",
+    response_model=ReturnsPublic
+)
+def get_returns(*, session: SessionDep, user_id: int, as_of: str=None) -> ReturnsPublic:
+    """
+    Get time-weighted and money-weighted returns for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        as_of (str, optional): Last day of the periods, today if None. Defaults to None.
+
+    Returns:
+        ReturnsPublic: Returns for MTD, QTD, YTD and since inception.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    # Convert date.
+    if as_of:
+        as_of = datetime.strptime(as_of,"%d/%m/%Y").date()
+
+    try:
+        returns = crud.get_returns(session=session, user_id=user_id, as_of=as_of)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return returns
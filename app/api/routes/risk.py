@@ -0,0 +1,75 @@
+'''
+Module for handling portfolio risk endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
+
+from app.models import RiskPublic
+from app.api.deps import SessionDep
+from app.core.risk import ROLLING_WINDOW
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/RISK
+
+@router.get(
+    "/",
+    response_model=RiskPublic
+)
+def get_risk(*, session: SessionDep, user_id: int, start: str=None, end: str=None, window: int=ROLLING_WINDOW) -> RiskPublic:
+    """
+    Get portfolio risk metrics for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        start (str, optional): First date, the first order's if None. Defaults to None.
+        end (str, optional): Last date, today if None. Defaults to None.
+        window (int, optional): Days per rolling volatility window. Defaults to ROLLING_WINDOW.
+
+    Returns:
+        RiskPublic: Volatility, rolling volatility, max drawdown and historical value at risk.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    # Convert dates.
+    if start:
+        start = datetime.strptime(start,"%d/%m/%Y").date()
+    if end:
+        end = datetime.strptime(end,"%d/%m/%Y").date()
+
+    # Check valid range and window.
+    if start and end and start > end:
+        raise HTTPException(
+            status_code = 400,
+            detail="Start date must not be after end date."
+        )
+    if window < 2:
+        raise HTTPException(
+            status_code = 400,
+            detail="Window must be at least 2 days."
+        )
+
+    try:
+        risk = crud.get_risk(session=session, user_id=user_id, start_date=start, end_date=end, window=window)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return risk
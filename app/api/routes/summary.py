@@ -7,7 +7,7 @@ Created on 16-07-2025
 '''
 from fastapi import APIRouter, HTTPException
 
-from app.models import Summary, SummaryUpdate
+from app.models import Summary
 from app.api.deps import SessionDep
 from app import crud
 
@@ -48,23 +48,33 @@ def get_summary(*, session: SessionDep, user_id: int) -> Summary:
             status_code=400,
             detail="No summary found with user."
         )
+
+    # Values are maintained on order writes, compute them if never built.
+    if summary.beginning_market_value is None:
+        try:
+            summary = crud.refresh_summary(session=session, summary=summary)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
     return summary
 
 
-@router.put(
-    "/",
+@router.post(
+    "/rebuild",
     response_model=Summary
 )
-def update_summary(*, session: SessionDep, user_id: int, summary_update: SummaryUpdate) -> Summary:
-    """Update summary for a given user.
+def rebuild_summary(*, session: SessionDep, user_id: int) -> Summary:
+    """
+    Rebuild summary for a given user from all orders.
 
     Args:
         session (SessionDep): SQL session.
         user_id (int): User id.
-        summary_update (SummaryUpdate): Summary update details.
 
     Returns:
-        SummaryBase: Updated summary.
+        SummaryBase: Rebuilt summary.
     """
     # Check valid user.
     user = crud.get_user_by_id(session=session, id=user_id)
@@ -81,7 +91,13 @@ def update_summary(*, session: SessionDep, user_id: int, summary_update: Summary
             status_code=400,
             detail="No summary found with user."
         )
-    
-    # Update summary.
-    summary = crud.update_summary(session=session, summary=summary, summary_update=summary_update)
+
+    # Rebuild summary.
+    try:
+        summary = crud.refresh_summary(session=session, summary=summary)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     return summary
\ No newline at end of file
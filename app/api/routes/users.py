@@ -13,13 +13,21 @@ from sqlmodel import select, func
 from app import crud
 from app.models import UserCreate, UserPublic, User, UsersPublic, UserUpdate
 from app.api.deps import SessionDep
-from app.api.routes import orders, summary
+from app.api.routes import orders, summary, positions, realised_pnl, cgt, holdings, valuation, returns, risk
+from app.core.lots import METHODS
 
 # - - - - - - - - - - - - - - - - - - -
 
 router = APIRouter(prefix="/users",tags=["users"])
 router.include_router(orders.router, prefix="/{user_id}/orders", tags=["orders"])
 router.include_router(summary.router, prefix="/{user_id}/summary", tags=["summary"])
+router.include_router(positions.router, prefix="/{user_id}/positions", tags=["positions"])
+router.include_router(realised_pnl.router, prefix="/{user_id}/realised-pnl", tags=["realised-pnl"])
+router.include_router(cgt.router, prefix="/{user_id}/cgt", tags=["cgt"])
+router.include_router(holdings.router, prefix="/{user_id}/holdings", tags=["holdings"])
+router.include_router(valuation.router, prefix="/{user_id}/valuation", tags=["valuation"])
+router.include_router(returns.router, prefix="/{user_id}/returns", tags=["returns"])
+router.include_router(risk.router, prefix="/{user_id}/risk", tags=["risk"])
 
 # - - - - - - - - - - - - - - - - - - -
 # /USERS ENDPOINT
@@ -125,11 +133,25 @@ def update_user(*, session: SessionDep, user_id: int, data: UserUpdate) -> User:
     # Get user to update.
     user = crud.get_user_by_id(session=session,id=user_id)
 
-    if not data.username and not data.password:
+    # A null base currency clears it, so check it was sent rather than its value.
+    change_base_currency = "base_currency" in data.model_fields_set
+    if not data.username and not data.password and not data.lot_method and not change_base_currency:
         raise HTTPException(
             status_code=400,
             detail="No user details to update."
         )
+
+    if data.lot_method and data.lot_method not in METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lot method must be one of {', '.join(METHODS)}."
+        )
+    
+    if data.base_currency is not None and data.base_currency not in crud.get_currencies(session=session):
+        raise HTTPException(
+            status_code=400,
+            detail="Base currency must have FX rates or quote an instrument."
+        )
     
     if data.username:
         updated_user = crud.change_username(session=session,email=user.email,new_username=data.username)
@@ -137,6 +159,12 @@ def update_user(*, session: SessionDep, user_id: int, data: UserUpdate) -> User:
     if data.password:
         updated_user = crud.change_password(session=session,email=user.email,new_password=data.password)
 
+    if data.lot_method:
+        updated_user = crud.change_lot_method(session=session,user=user,lot_method=data.lot_method)
+
+    if change_base_currency:
+        updated_user = crud.change_base_currency(session=session,user=user,base_currency=data.base_currency)
+
     return updated_user
 
 
@@ -160,8 +188,7 @@ def delete_user(*, session: SessionDep, user_id: int):
         )
     
     # Delete any orders.
-    for order in user.orders:
-        crud.delete_order(session=session, order=order)
+    crud.delete_orders_bulk(session=session, user_id=user_id)
 
     # Delete corresponding summary.
     summary = crud.get_summary_by_user_id(session=session,user_id=user_id)
@@ -0,0 +1,68 @@
+'''
+Module for handling portfolio valuation endpoints.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
+
+from app.models import ValuationPublic
+from app.api.deps import SessionDep
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+router = APIRouter()
+
+# - - - - - - - - - - - - - - - - - - -
+# /USERS/{USER_ID}/VALUATION
+
+@router.get(
+    "/",
+    response_model=ValuationPublic
+)
+def get_valuation(*, session: SessionDep, user_id: int, start: str=None, end: str=None) -> ValuationPublic:
+    """
+    Get daily portfolio valuation for a given user.
+
+    Args:
+        session (SessionDep): SQL session.
+        user_id (int): User id.
+        start (str, optional): First date, the first order's if None. Defaults to None.
+        end (str, optional): Last date, today if None. Defaults to None.
+
+    Returns:
+        ValuationPublic: Market value, net capital invested and profit/loss per day.
+    """
+    # Check valid user.
+    user = crud.get_user_by_id(session=session, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code = 400,
+            detail="No user found with user id."
+        )
+
+    # Convert dates.
+    if start:
+        start = datetime.strptime(start,"%d/%m/%Y").date()
+    if end:
+        end = datetime.strptime(end,"%d/%m/%Y").date()
+
+    # Check valid range.
+    if start and end and start > end:
+        raise HTTPException(
+            status_code = 400,
+            detail="Start date must not be after end date."
+        )
+
+    try:
+        valuation = crud.get_valuation(session=session, user_id=user_id, start_date=start, end_date=end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return valuation
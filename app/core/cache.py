@@ -0,0 +1,133 @@
+'''
+Module for caching instrument lookups in process.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import threading
+from collections import OrderedDict
+
+# - - - - - - - - - - - - - - - - - - -
+
+class InstrumentCache:
+    """
+    Least recently used cache of instrument snapshots, with a symbol index.
+
+    Snapshots are plain column dictionaries keyed by instrument id. Every
+    invalidation bumps the version, and a snapshot read from the database is
+    only stored if the version hasn't moved since the read started, so a
+    lookup racing a write can't put stale values back.
+    """
+
+    def __init__(self, max_size: int=10000):
+        """
+        Initialise cache.
+
+        Args:
+            max_size (int, optional): Maximum number of instruments held. Defaults to 10000.
+        """
+        self.max_size = max_size
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._instruments = OrderedDict()
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def get(self, id: int) -> dict | None:
+        """
+        Get an instrument snapshot by id.
+
+        Args:
+            id (int): Instrument id.
+
+        Returns:
+            dict | None: Snapshot, None if not cached.
+        """
+        with self._lock:
+            snapshot = self._instruments.get(id)
+            if snapshot is None:
+                self.misses += 1
+                return None
+            self._instruments.move_to_end(id)
+            self.hits += 1
+            return snapshot
+
+    def get_by_symbol(self, symbol: str) -> dict | None:
+        """
+        Get an instrument snapshot by symbol.
+
+        Args:
+            symbol (str): Symbol.
+
+        Returns:
+            dict | None: Snapshot, None if not cached.
+        """
+        with self._lock:
+            id = self._symbols.get(symbol)
+            if id is None:
+                self.misses += 1
+                return None
+            self._instruments.move_to_end(id)
+            self.hits += 1
+            return self._instruments[id]
+
+    def put(self, snapshot: dict, version: int):
+        """
+        Store an instrument snapshot, evicting the least recently used.
+
+        Args:
+            snapshot (dict): Instrument columns, including id and symbol.
+            version (int): Cache version when the snapshot was read.
+        """
+        with self._lock:
+            if version != self.version:
+                return
+            self._drop(snapshot["id"])
+            self._instruments[snapshot["id"]] = snapshot
+            self._symbols[snapshot["symbol"]] = snapshot["id"]
+            while len(self._instruments) > self.max_size:
+                _, evicted = self._instruments.popitem(last=False)
+                self._symbols.pop(evicted["symbol"], None)
+
+    def invalidate(self, ids: set[int] | None=None):
+        """
+        Drop instruments after a write.
+
+        Args:
+            ids (set[int] | None, optional): Instrument ids, all if None. Defaults to None.
+        """
+        with self._lock:
+            self.version += 1
+            if ids is None:
+                self._instruments.clear()
+                self._symbols.clear()
+            else:
+                for id in ids:
+                    self._drop(id)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Size, maximum size, version, hits and misses.
+        """
+        with self._lock:
+            return {
+                "size": len(self._instruments),
+                "max_size": self.max_size,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, id: int):
+        snapshot = self._instruments.pop(id, None)
+        if snapshot is not None:
+            self._symbols.pop(snapshot["symbol"], None)
+
+# - - - - - - - - - - - - - - - - - - -
+
+instrument_cache = InstrumentCache()
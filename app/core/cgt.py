@@ -0,0 +1,184 @@
+'''
+Module for UK capital gains share matching.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import date, datetime, timedelta
+from typing import Iterable, NamedTuple
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Acquisitions within this many days after a disposal are matched to it.
+BED_AND_BREAKFAST_DAYS = 30
+
+# - - - - - - - - - - - - - - - - - - -
+
+class Disposal(NamedTuple):
+    instrument_id: int
+    date: date
+    quantity: float
+    proceeds: float
+    cost: float
+    gain: float
+    same_day_quantity: float
+    bed_and_breakfast_quantity: float
+    section_104_quantity: float
+    # Sold beyond the holding, left out of proceeds and gain.
+    unmatched_quantity: float
+
+# - - - - - - - - - - - - - - - - - - -
+
+def tax_year_bounds(tax_year: int) -> tuple[date, date]:
+    """
+    Get first and last day of a UK tax year.
+
+    Args:
+        tax_year (int): Calendar year the tax year starts in.
+
+    Returns:
+        tuple[date, date]: 6 April and the following 5 April.
+    """
+    return date(tax_year, 4, 6), date(tax_year + 1, 4, 5)
+
+
+def _group_days(orders: list[tuple[date, int, float, float]]) -> list[list]:
+    """
+    Aggregate an instrument's date-ordered orders per day.
+
+    Returns:
+        list[list]: Day, bought quantity, buy cost, sold quantity and sale proceeds.
+    """
+    days = []
+    for day, sign, volume, price in orders:
+        if not days or days[-1][0] != day:
+            days.append([day, 0.0, 0.0, 0.0, 0.0])
+        if sign > 0:
+            days[-1][1] += volume
+            days[-1][2] += volume * price
+        elif sign < 0:
+            days[-1][3] += volume
+            days[-1][4] += volume * price
+    return days
+
+
+def _match_instrument(instrument_id: int, orders: list[tuple[date, int, float, float]]) -> list[Disposal]:
+    """
+    Apply the same-day, 30-day and Section 104 rules to one instrument.
+
+    Disposals are visited in date order with a pointer into later acquisition
+    days, so each acquisition is consumed at most once by the 30-day rule.
+    What is left of an acquisition joins the pool on its own day.
+    """
+    days = _group_days(orders)
+
+    # Same-day rule, leaving at most one side per day.
+    same_day = []
+    for day in days:
+        matched = min(day[1], day[3])
+        if matched:
+            cost = day[2] * matched / day[1]
+            proceeds = day[4] * matched / day[3]
+            day[1] -= matched
+            day[2] -= cost
+            day[3] -= matched
+            day[4] -= proceeds
+            same_day.append((matched, cost, proceeds))
+        else:
+            same_day.append((0.0, 0.0, 0.0))
+
+    # Acquisition days remaining for the 30-day rule.
+    acquisitions = [index for index, day in enumerate(days) if day[1] > 0]
+    window = 0
+
+    disposals = []
+    pool_quantity = 0.0
+    pool_cost = 0.0
+    for index, day in enumerate(days):
+        matched, cost, proceeds = same_day[index]
+        if day[3] > 0:
+            remaining = day[3]
+            proceeds += day[4]
+
+            # 30-day rule against the earliest later acquisitions.
+            limit = day[0] + timedelta(days=BED_AND_BREAKFAST_DAYS)
+            while window < len(acquisitions) and (acquisitions[window] <= index or days[acquisitions[window]][1] <= 0):
+                window += 1
+            bed_and_breakfast = 0.0
+            cursor = window
+            while remaining > 0 and cursor < len(acquisitions) and days[acquisitions[cursor]][0] <= limit:
+                acquisition = days[acquisitions[cursor]]
+                if acquisition[1] > 0:
+                    taken = min(remaining, acquisition[1])
+                    taken_cost = acquisition[2] * taken / acquisition[1]
+                    acquisition[1] -= taken
+                    acquisition[2] -= taken_cost
+                    cost += taken_cost
+                    bed_and_breakfast += taken
+                    remaining -= taken
+                cursor += 1
+
+            # Section 104 pool for the rest.
+            section_104 = min(remaining, pool_quantity)
+            if section_104 > 0:
+                taken_cost = pool_cost * section_104 / pool_quantity
+                pool_quantity -= section_104
+                pool_cost -= taken_cost
+                cost += taken_cost
+
+            # Proceeds only count for matched shares.
+            unmatched = remaining - section_104
+            if unmatched > 0:
+                proceeds -= day[4] * unmatched / day[3]
+
+            quantity = matched + bed_and_breakfast + section_104
+            disposals.append(Disposal(
+                instrument_id,
+                day[0],
+                quantity,
+                proceeds,
+                cost,
+                proceeds - cost,
+                matched,
+                bed_and_breakfast,
+                section_104,
+                max(unmatched, 0.0)
+            ))
+        elif matched:
+            disposals.append(Disposal(instrument_id, day[0], matched, proceeds, cost, proceeds - cost, matched, 0.0, 0.0, 0.0))
+
+        if day[1] > 0:
+            pool_quantity += day[1]
+            pool_cost += day[2]
+    return disposals
+
+
+def match_disposals(orders: Iterable[tuple[datetime, int, int, float, float]]) -> list[Disposal]:
+    """
+    Compute chargeable gains with HMRC share matching rules.
+
+    Disposals are matched first with acquisitions on the same day, then with
+    acquisitions in the following 30 days (earliest first), then with the
+    Section 104 pool at its average cost. Disposals beyond all holdings are
+    only matched as far as they can be, the rest reported as unmatched
+    without proceeds.
+
+    Args:
+        orders (Iterable[tuple[datetime, int, int, float, float]]): Date,
+            instrument id, sign (1 buy, -1 sell, 0 other), volume and price in
+            pounds at the rate of the order's date per order, in date order.
+
+    Returns:
+        list[Disposal]: Disposals in date order.
+    """
+    # Split per instrument, keeping date order.
+    instruments = {}
+    for order_date, instrument_id, sign, volume, price in orders:
+        instruments.setdefault(instrument_id, []).append((order_date.date(), sign, volume, price))
+
+    disposals = []
+    for instrument_id, instrument_orders in instruments.items():
+        disposals.extend(_match_instrument(instrument_id, instrument_orders))
+    disposals.sort(key=lambda disposal: (disposal.date, disposal.instrument_id))
+    return disposals
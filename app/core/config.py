@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+    # Directory of the memory-mapped price history, disabled if unset.
+    PRICE_STORE_PATH: str | None = None
 
     @computed_field
     @property
@@ -8,6 +8,8 @@ Created on 21-06-2025
 import sys
 import os
 
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import create_engine, SQLModel, Session, MetaData
 
 if __name__ == "core.db":
@@ -32,6 +34,25 @@ def create_db_and_tables():
     Create tables in db.
     """
     SQLModel.metadata.create_all(engine)
+    create_search_indexes()
+
+
+def create_search_indexes() -> bool:
+    """
+    Create trigram indexes for instrument search, where pg_trgm can be installed.
+
+    Returns:
+        bool: Whether the indexes exist.
+    """
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_instrument_symbol_trgm ON instrument USING gin (symbol gin_trgm_ops)"))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_instrument_name_trgm ON instrument USING gin (name gin_trgm_ops)"))
+    except DBAPIError:
+        # Search falls back to the in-memory index.
+        return False
+    return True
 
 
 def clear_db():
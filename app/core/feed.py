@@ -0,0 +1,177 @@
+'''
+Module for ingesting market data quotes with coalescing and replay.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import asyncio
+import csv
+import time
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, NamedTuple
+
+# - - - - - - - - - - - - - - - - - - -
+
+class Quote(NamedTuple):
+    symbol: str
+    time: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+
+
+class FeedStats(NamedTuple):
+    received: int
+    written: int
+    batches: int
+    elapsed: float
+
+    @property
+    def updates_per_second(self) -> float:
+        return self.received / self.elapsed if self.elapsed else 0.0
+
+# - - - - - - - - - - - - - - - - - - -
+
+def read_quote_file(path: str) -> Iterator[Quote]:
+    """
+    Read quotes from a CSV file of bars or ticks, in time order.
+
+    Bar files have time, symbol, open, high, low and close columns. Tick
+    files have time, symbol and price columns, each tick setting all four
+    prices.
+
+    Args:
+        path (str): CSV file path.
+
+    Yields:
+        Quote: Quotes as they appear in the file.
+    """
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            if "price" in row:
+                price = float(row["price"])
+                prices = (price, price, price, price)
+            else:
+                prices = (float(row["open"]), float(row["high"]), float(row["low"]), float(row["close"]))
+            yield Quote(row["symbol"], datetime.fromisoformat(row["time"]), *prices)
+
+
+async def replay(quotes: Iterable[Quote], speed: float=None) -> AsyncIterator[Quote]:
+    """
+    Replay quotes, spacing them by their timestamps.
+
+    Args:
+        quotes (Iterable[Quote]): Quotes in time order.
+        speed (float, optional): Multiple of real time, as fast as possible if None. Defaults to None.
+
+    Yields:
+        Quote: Quotes at their replay time.
+    """
+    start = None
+    for quote in quotes:
+        if speed:
+            if start is None:
+                start = (quote.time, time.monotonic())
+            due = start[1] + (quote.time - start[0]).total_seconds() / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            # Let other tasks run between quotes.
+            await asyncio.sleep(0)
+        yield quote
+
+
+def merge_quotes(earlier: Quote | None, later: Quote) -> Quote:
+    """
+    Merge two quotes of a symbol into one covering both.
+
+    Within a day the first open, highest high, lowest low and last close are
+    kept, so coalesced ticks don't lose the range between them.
+
+    Args:
+        earlier (Quote | None): Earlier quote, if any.
+        later (Quote): Later quote.
+
+    Returns:
+        Quote: Merged quote, the later one if they fall on different days.
+    """
+    if earlier is None or earlier.time.date() != later.time.date():
+        return later
+    return Quote(
+        later.symbol,
+        later.time,
+        earlier.open,
+        max(earlier.high, later.high),
+        min(earlier.low, later.low),
+        later.close
+    )
+
+
+async def coalesce(quotes: AsyncIterable[Quote], window: float) -> AsyncIterator[list[Quote]]:
+    """
+    Group quotes into batches holding one merged quote per symbol and day.
+
+    A batch is emitted every window while quotes arrive. Quotes keep being
+    read while a batch is being consumed, so a slow consumer gets fewer,
+    more coalesced batches rather than falling behind.
+
+    Args:
+        quotes (AsyncIterable[Quote]): Quote source.
+        window (float): Seconds between batches.
+
+    Yields:
+        list[Quote]: Quote per symbol and day since the last batch, in time order.
+    """
+    pending = {}
+
+    async def read():
+        async for quote in quotes:
+            # Replays can cross days within a window, each day keeping its own bar.
+            key = (quote.symbol, quote.time.date())
+            pending[key] = merge_quotes(pending.get(key), quote)
+
+    reader = asyncio.create_task(read())
+    try:
+        while not reader.done():
+            await asyncio.wait([reader], timeout=window)
+            if pending:
+                batch = list(pending.values())
+                pending.clear()
+                yield batch
+        # Reraise any error from the source.
+        reader.result()
+    finally:
+        reader.cancel()
+
+
+async def run_feed(quotes: AsyncIterable[Quote], write: Callable[[list[Quote]], None], window: float=1.0) -> FeedStats:
+    """
+    Coalesce quotes and write each batch in a worker thread.
+
+    Args:
+        quotes (AsyncIterable[Quote]): Quote source, such as a replay or a vendor adapter.
+        write (Callable[[list[Quote]], None]): Blocking batch writer.
+        window (float, optional): Seconds between batches. Defaults to 1.0.
+
+    Returns:
+        FeedStats: Quotes received and written, batches and elapsed seconds.
+    """
+    received = 0
+
+    async def count():
+        nonlocal received
+        async for quote in quotes:
+            received += 1
+            yield quote
+
+    written = 0
+    batches = 0
+    start = time.monotonic()
+    async for batch in coalesce(count(), window):
+        await asyncio.to_thread(write, batch)
+        written += len(batch)
+        batches += 1
+    return FeedStats(received, written, batches, time.monotonic() - start)
@@ -0,0 +1,158 @@
+'''
+Module for caching FX rates and building currency conversion matrices.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import threading
+from datetime import date
+from typing import Iterable
+
+import numpy as np
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Currencies quoted in a fraction of another, with that fraction.
+SUBUNITS = {
+    "GBX": ("GBP", 0.01),
+}
+
+# Matrices kept between rate changes.
+MAX_MATRICES = 1024
+
+# - - - - - - - - - - - - - - - - - - -
+
+class FxRates:
+    """
+    In-process copy of the FX rate history, building conversion matrices.
+
+    Entry [i, j] of a matrix converts an amount in currency i into currency
+    j. Recorded rates fill their pair and its inverse, subunits are fixed
+    fractions of their currency, and missing pairs are filled through other
+    currencies. Pairs still without a rate are NaN, for callers to report.
+    Loads follow the same versioning as the
+    instrument cache, so a load racing a write is discarded.
+    """
+
+    def __init__(self):
+        """
+        Initialise rates.
+        """
+        self.version = 0
+        self.loaded = False
+        self._pairs = {}
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[tuple[str, str, date, float]], version: int):
+        """
+        Load the rate history.
+
+        Args:
+            rows (Iterable[tuple[str, str, date, float]]): From currency, to currency,
+                date and rate per row, in date order per pair.
+            version (int): Version read before the rows.
+        """
+        pairs = {}
+        for from_currency, to_currency, day, rate in rows:
+            pairs.setdefault((from_currency, to_currency), ([], []))
+            pairs[(from_currency, to_currency)][0].append(day)
+            pairs[(from_currency, to_currency)][1].append(rate)
+        pairs = {
+            pair: (np.array(days, "datetime64[D]"), np.array(rates, np.float64))
+            for pair, (days, rates) in pairs.items()
+        }
+        with self._lock:
+            if version != self.version:
+                return
+            self._pairs = pairs
+            self._matrices = {}
+            self.loaded = True
+
+    def invalidate(self):
+        """
+        Drop the loaded history after rates change.
+        """
+        with self._lock:
+            self.version += 1
+            self.loaded = False
+            self._pairs = {}
+            self._matrices = {}
+
+    @property
+    def currencies(self) -> set[str]:
+        """
+        Currencies with a recorded or fixed rate.
+        """
+        currencies = {currency for pair in self._pairs for currency in pair}
+        for subunit, (currency, _) in SUBUNITS.items():
+            currencies.update((subunit, currency))
+        return currencies
+
+    def matrices(self, currencies: list[str], start_date: date, end_date: date) -> np.ndarray:
+        """
+        Get conversion matrices for every day of a date range.
+
+        Args:
+            currencies (list[str]): Unique currencies to convert between.
+            start_date (date): First day.
+            end_date (date): Last day.
+
+        Returns:
+            np.ndarray: (currencies, currencies, days) conversion factors, NaN without a rate.
+        """
+        pairs = self._pairs
+        # Include every known currency, as cross rates may go through them.
+        codes = list(dict.fromkeys([*currencies, *sorted(self.currencies)]))
+        index = {currency: i for i, currency in enumerate(codes)}
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+
+        matrices = np.full((len(codes), len(codes), len(days)), np.nan)
+        matrices[np.arange(len(codes)), np.arange(len(codes))] = 1.0
+        for subunit, (currency, fraction) in SUBUNITS.items():
+            matrices[index[subunit], index[currency]] = fraction
+            matrices[index[currency], index[subunit]] = 1 / fraction
+        for (from_currency, to_currency), (pair_days, rates) in pairs.items():
+            # Latest rate on or before each day.
+            latest = np.searchsorted(pair_days, days, side="right") - 1
+            known = latest >= 0
+            forward = matrices[index[from_currency], index[to_currency]]
+            forward[known] = rates[latest[known]]
+            inverse = matrices[index[to_currency], index[from_currency]]
+            missing = known & np.isnan(inverse)
+            inverse[missing] = 1 / rates[latest[missing]]
+
+        # Fill missing pairs through each currency in turn.
+        for via in range(len(codes)):
+            crossed = matrices[:, via:via + 1] * matrices[via:via + 1, :]
+            np.copyto(matrices, crossed, where=np.isnan(matrices))
+        return matrices[:len(currencies), :len(currencies)]
+
+    def matrix(self, currencies: list[str], on: date) -> np.ndarray:
+        """
+        Get the conversion matrix on a day, reusing matrices built since the last change.
+
+        Args:
+            currencies (list[str]): Unique currencies to convert between.
+            on (date): Day.
+
+        Returns:
+            np.ndarray: (currencies, currencies) conversion factors, NaN without a rate.
+        """
+        key = (tuple(currencies), on)
+        with self._lock:
+            matrix = self._matrices.get(key)
+        if matrix is None:
+            version = self.version
+            matrix = self.matrices(currencies, on, on)[:, :, 0]
+            with self._lock:
+                if version == self.version:
+                    if len(self._matrices) >= MAX_MATRICES:
+                        self._matrices.clear()
+                    self._matrices[key] = matrix
+        return matrix
+
+# - - - - - - - - - - - - - - - - - - -
+
+fx_rates = FxRates()
@@ -0,0 +1,127 @@
+'''
+Module for fanning out live price updates to subscribers.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import asyncio
+from typing import Iterable
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Updates held per subscriber before the oldest are dropped.
+QUEUE_SIZE = 256
+
+# - - - - - - - - - - - - - - - - - - -
+
+class Subscriber:
+    """
+    Bounded queue of price updates for one client.
+
+    When the client falls behind, the oldest queued update is dropped to make
+    room, so a slow client only ever misses stale prices and never holds up
+    the hub or other clients.
+    """
+
+    def __init__(self, size: int=QUEUE_SIZE):
+        """
+        Initialise subscriber.
+
+        Args:
+            size (int, optional): Queue size. Defaults to QUEUE_SIZE.
+        """
+        self.instrument_ids = set()
+        self.dropped = 0
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def offer(self, update: dict):
+        """
+        Queue an update, dropping the oldest if full.
+
+        Args:
+            update (dict): Price update.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(update)
+
+
+class PriceHub:
+    """
+    Fan price updates out to subscribers by instrument id.
+
+    Subscriptions live on the event loop serving the websockets. Publishing
+    is safe from any thread, as writes happen in the threadpool running sync
+    routes: updates are handed to the loop and dispatched there, without
+    touching the database.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._subscriptions = {}
+
+    def subscribe(self, subscriber: Subscriber, instrument_ids: Iterable[int]):
+        """
+        Subscribe to instruments, from the event loop.
+
+        Args:
+            subscriber (Subscriber): Subscriber.
+            instrument_ids (Iterable[int]): Instrument ids.
+        """
+        self._loop = asyncio.get_running_loop()
+        for instrument_id in instrument_ids:
+            self._subscriptions.setdefault(instrument_id, set()).add(subscriber)
+            subscriber.instrument_ids.add(instrument_id)
+
+    def unsubscribe(self, subscriber: Subscriber, instrument_ids: Iterable[int] | None=None):
+        """
+        Unsubscribe from instruments, from the event loop.
+
+        Args:
+            subscriber (Subscriber): Subscriber.
+            instrument_ids (Iterable[int] | None, optional): Instrument ids, all if None. Defaults to None.
+        """
+        instrument_ids = set(subscriber.instrument_ids if instrument_ids is None else instrument_ids)
+        for instrument_id in instrument_ids:
+            subscribers = self._subscriptions.get(instrument_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscriptions[instrument_id]
+        subscriber.instrument_ids -= instrument_ids
+
+    def publish(self, updates: Iterable[dict]):
+        """
+        Publish price updates, from any thread.
+
+        Args:
+            updates (Iterable[dict]): Updates, each with an instrument_id. Only
+                consumed if anyone is subscribed.
+        """
+        loop = self._loop
+        if not self._subscriptions or loop is None or loop.is_closed():
+            return
+        updates = list(updates)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(updates)
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, updates)
+        except RuntimeError:
+            # Loop closed since the check.
+            pass
+
+    def _dispatch(self, updates: list[dict]):
+        for update in updates:
+            for subscriber in self._subscriptions.get(update["instrument_id"], ()):
+                subscriber.offer(update)
+
+# - - - - - - - - - - - - - - - - - - -
+
+price_hub = PriceHub()
@@ -0,0 +1,135 @@
+'''
+Module for matching sells against buy lots to compute realised P&L.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import heapq
+from collections import deque
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+# - - - - - - - - - - - - - - - - - - -
+
+FIFO = "FIFO"
+LIFO = "LIFO"
+AVERAGE = "AVERAGE"
+HIFO = "HIFO"
+
+METHODS = (FIFO, LIFO, AVERAGE, HIFO)
+
+# - - - - - - - - - - - - - - - - - - -
+
+class LotMatch(NamedTuple):
+    instrument_id: int
+    sell_order_id: int
+    buy_order_id: int | None
+    sell_date: datetime
+    buy_date: datetime | None
+    volume: float
+    cost: float
+    proceeds: float
+    pnl: float
+
+# - - - - - - - - - - - - - - - - - - -
+
+class _Lots:
+    """
+    Open buy lots of one instrument, consumed in the order of a matching method.
+
+    Each lot is a mutable [order_id, date, remaining volume, price] list.
+    """
+
+    def __init__(self, method: str):
+        self.method = method
+        self._lots = deque() if method == FIFO else []
+        self._count = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._lots)
+
+    def push(self, lot: list):
+        if self.method == HIFO:
+            # Highest price first, ties broken by age.
+            heapq.heappush(self._lots, (-lot[3], self._count, lot))
+            self._count += 1
+        else:
+            self._lots.append(lot)
+
+    def peek(self) -> list:
+        if self.method == FIFO:
+            return self._lots[0]
+        if self.method == HIFO:
+            return self._lots[0][2]
+        return self._lots[-1]
+
+    def pop(self):
+        if self.method == FIFO:
+            self._lots.popleft()
+        elif self.method == HIFO:
+            heapq.heappop(self._lots)
+        else:
+            self._lots.pop()
+
+# - - - - - - - - - - - - - - - - - - -
+
+def match_lots(orders: Iterable[tuple[int, datetime, int, int, float, float]], method: str) -> list[LotMatch]:
+    """
+    Match sells against earlier buys in a single pass over date-ordered orders.
+
+    FIFO, LIFO and highest-cost-first consume individual buy lots from a deque,
+    stack or heap, so the pass is O(n log n) at worst. Average cost matches
+    sells against a running pool, reported without a buy order. Sell volume
+    beyond the open lots is left unmatched.
+
+    Args:
+        orders (Iterable[tuple[int, datetime, int, int, float, float]]): Id, date,
+            instrument id, sign (1 buy, -1 sell, 0 other), volume and price per
+            order, in date order.
+        method (str): One of METHODS.
+
+    Raises:
+        ValueError: Unsupported method.
+
+    Returns:
+        list[LotMatch]: Matched lots, in sell order.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unsupported method, expected one of {', '.join(METHODS)}.")
+
+    matches = []
+    books = {}
+    for order_id, date, instrument_id, sign, volume, price in orders:
+        if method == AVERAGE:
+            pool = books.setdefault(instrument_id, [0.0, 0.0])
+            if sign > 0:
+                pool[0] += volume
+                pool[1] += volume * price
+            elif sign < 0 and pool[0] > 0:
+                matched = min(volume, pool[0])
+                cost = pool[1] * matched / pool[0]
+                pool[0] -= matched
+                pool[1] -= cost
+                proceeds = matched * price
+                matches.append(LotMatch(instrument_id, order_id, None, date, None, matched, cost, proceeds, proceeds - cost))
+            continue
+
+        lots = books.get(instrument_id)
+        if lots is None:
+            lots = books[instrument_id] = _Lots(method)
+        if sign > 0:
+            lots.push([order_id, date, volume, price])
+        elif sign < 0:
+            remaining = volume
+            while remaining > 0 and lots:
+                lot = lots.peek()
+                matched = min(remaining, lot[2])
+                cost = matched * lot[3]
+                proceeds = matched * price
+                matches.append(LotMatch(instrument_id, order_id, lot[0], date, lot[1], matched, cost, proceeds, proceeds - cost))
+                remaining -= matched
+                lot[2] -= matched
+                if lot[2] <= 0:
+                    lots.pop()
+    return matches
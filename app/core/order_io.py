@@ -0,0 +1,177 @@
+'''
+Module for reading and writing orders as CSV or NDJSON.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator
+
+# - - - - - - - - - - - - - - - - - - -
+
+FORMATS = ("csv", "ndjson")
+
+# Columns written on export, in order.
+EXPORT_FIELDS = ("id", "date", "volume", "price", "type", "instrument_id")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Date format of the other endpoints, accepted on import alongside ISO.
+DATE_FORMAT = "%d/%m/%Y"
+
+# - - - - - - - - - - - - - - - - - - -
+
+class OrderRowParser:
+    """
+    Incrementally split an uploaded CSV or NDJSON body into order rows.
+
+    Chunks are fed as they arrive, so only the unfinished trailing line, or
+    CSV record with a quoted field spanning lines, is ever held in memory.
+    Dates may be ISO or dd/mm/yyyy.
+    """
+
+    def __init__(self, format: str):
+        """
+        Initialise parser.
+
+        Args:
+            format (str): Either csv or ndjson.
+
+        Raises:
+            ValueError: Unsupported format.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format, expected one of {', '.join(FORMATS)}.")
+        self.format = format
+        self.header = None
+        self.row_number = 0
+        self._buffer = b""
+        self._record = None
+
+    def feed(self, chunk: bytes) -> list[tuple[int, dict | str]]:
+        """
+        Feed a chunk of the body.
+
+        Args:
+            chunk (bytes): Raw body chunk.
+
+        Returns:
+            list[tuple[int, dict | str]]: Row number and either parsed row or error detail.
+        """
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return self._parse_lines(lines)
+
+    def close(self) -> list[tuple[int, dict | str]]:
+        """
+        Parse any trailing line without a newline.
+
+        Returns:
+            list[tuple[int, dict | str]]: Row number and either parsed row or error detail.
+        """
+        lines, self._buffer = [self._buffer], b""
+        rows = self._parse_lines(lines)
+        if self._record is not None:
+            self._record = None
+            self.row_number += 1
+            rows.append((self.row_number, "Row has an unterminated quoted field."))
+        return rows
+
+    def _parse_lines(self, lines: list[bytes]) -> list[tuple[int, dict | str]]:
+        rows = []
+        for raw in lines:
+            try:
+                line = raw.decode("utf-8").lstrip("\ufeff")
+            except UnicodeDecodeError:
+                self.row_number += 1
+                rows.append((self.row_number, "Row is not valid UTF-8."))
+                continue
+
+            # Quoted CSV fields may hold newlines, so a record runs until its quotes balance.
+            if self.format == "csv":
+                if self._record is not None:
+                    line = self._record + "\n" + line.rstrip("\r")
+                if line.count('"') % 2:
+                    self._record = line
+                    continue
+                self._record = None
+            line = line.strip()
+            if not line:
+                continue
+
+            # First CSV line holds the column names.
+            if self.format == "csv" and self.header is None:
+                self.header = [name.strip() for name in next(csv.reader([line]))]
+                continue
+
+            self.row_number += 1
+            rows.append((self.row_number, _parse_date(self._parse_line(line))))
+        return rows
+
+    def _parse_line(self, line: str) -> dict | str:
+        if self.format == "ndjson":
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                return "Row is not valid JSON."
+            if not isinstance(row, dict):
+                return "Row is not a JSON object."
+            return row
+
+        values = next(csv.reader([line]))
+        if len(values) != len(self.header):
+            return f"Expected {len(self.header)} columns, got {len(values)}."
+        return dict(zip(self.header, values))
+
+
+def _parse_date(row: dict | str) -> dict | str:
+    # Convert dd/mm/yyyy dates to ISO, leaving anything else to validation.
+    if isinstance(row, dict) and isinstance(row.get("date"), str):
+        try:
+            row["date"] = datetime.strptime(row["date"].strip(), DATE_FORMAT).isoformat()
+        except ValueError:
+            pass
+    return row
+
+# - - - - - - - - - - - - - - - - - - -
+
+def format_order_rows(batches: Iterable[list], format: str) -> Iterator[str]:
+    """
+    Format batches of order rows as CSV or NDJSON text.
+
+    Args:
+        batches (Iterable[list]): Batches of rows with EXPORT_FIELDS columns.
+        format (str): Either csv or ndjson.
+
+    Yields:
+        str: Formatted text, one chunk per batch.
+    """
+    if format == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\n"
+
+    for batch in batches:
+        buffer = io.StringIO()
+        if format == "csv":
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerows(
+                (id, date.isoformat(), volume, price, type, instrument_id)
+                for id, date, volume, price, type, instrument_id in batch
+            )
+        else:
+            for id, date, volume, price, type, instrument_id in batch:
+                buffer.write(json.dumps({
+                    "id": id,
+                    "date": date.isoformat(),
+                    "volume": volume,
+                    "price": price,
+                    "type": type,
+                    "instrument_id": instrument_id,
+                }) + "\n")
+        yield buffer.getvalue()
@@ -0,0 +1,71 @@
+'''
+Module for average-cost position accounting.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import datetime
+from typing import NamedTuple
+
+# - - - - - - - - - - - - - - - - - - -
+
+class PositionState(NamedTuple):
+    quantity: float = 0.0
+    cost_basis: float = 0.0
+    realised_pnl: float = 0.0
+    gross_invested: float = 0.0
+
+# - - - - - - - - - - - - - - - - - - -
+
+def apply_order(state: PositionState, signed_volume: float, price: float) -> PositionState:
+    """
+    Apply an order to a position using average cost.
+
+    Orders on the same side as the position add to its cost basis. Orders on
+    the opposite side close it at the average cost, realising the difference,
+    and any excess opens a position on the other side at the order price.
+
+    Args:
+        state (PositionState): Current position.
+        signed_volume (float): Volume, positive for buys and negative for sells.
+        price (float): Order price.
+
+    Returns:
+        PositionState: Updated position.
+    """
+    quantity, cost_basis, realised_pnl, gross_invested = state
+    if signed_volume > 0:
+        gross_invested += signed_volume * price
+
+    if quantity == 0 or (quantity > 0) == (signed_volume > 0):
+        return PositionState(quantity + signed_volume, cost_basis + signed_volume * price, realised_pnl, gross_invested)
+
+    # Close against the average cost.
+    average_cost = cost_basis / quantity
+    closing = max(-abs(quantity), min(abs(quantity), signed_volume))
+    realised_pnl -= closing * (price - average_cost)
+    quantity += closing
+    cost_basis = 0.0 if quantity == 0 else cost_basis + closing * average_cost
+
+    # Open the remainder on the other side.
+    remainder = signed_volume - closing
+    if remainder:
+        quantity += remainder
+        cost_basis += remainder * price
+    return PositionState(quantity, cost_basis, realised_pnl, gross_invested)
+
+
+def next_month_start(moment: datetime) -> datetime:
+    """
+    Get the start of the month after a moment.
+
+    Args:
+        moment (datetime): Moment.
+
+    Returns:
+        datetime: Midnight on the first of the next month.
+    """
+    if moment.month == 12:
+        return datetime(moment.year + 1, 1, 1, tzinfo=moment.tzinfo)
+    return datetime(moment.year, moment.month + 1, 1, tzinfo=moment.tzinfo)
@@ -0,0 +1,213 @@
+'''
+Module for a memory-mapped columnar store of daily price history.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Open memory maps kept per store.
+MAX_OPEN_MAPS = 4096
+
+# - - - - - - - - - - - - - - - - - - -
+
+class PriceSeries(NamedTuple):
+    dates: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+def _empty_series() -> PriceSeries:
+    return PriceSeries(np.empty(0, "datetime64[D]"), *[np.empty(0) for _ in range(4)])
+
+
+class PriceStore:
+    """
+    Daily bars stored as one memory-mapped file per instrument.
+
+    Each file is a (5, n) float64 array, so every column is contiguous. The
+    first row holds the datetime64[D] dates bit for bit, and is viewed back
+    as dates without copying. Reads return views into the map, so no Python
+    object is created per bar. Rewrites go to a temporary file swapped in
+    atomically, so readers keep a consistent old map until they next look.
+    The exception is overwriting the latest bar, which is done in place, so
+    views already read see that bar's prices change. Copy them to keep them.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialise store.
+
+        Args:
+            path (str): Directory for the instrument files.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._maps = OrderedDict()
+        # Reentrant, as writes map the existing file while holding it.
+        self._lock = threading.RLock()
+
+    def read(self, instrument_id: int, start_date: date=None, end_date: date=None) -> PriceSeries:
+        """
+        Read an instrument's bars over a date range.
+
+        Args:
+            instrument_id (int): Instrument id.
+            start_date (date, optional): First date. Defaults to None.
+            end_date (date, optional): Last date. Defaults to None.
+
+        Returns:
+            PriceSeries: Read-only views of dates and prices, the latest bar
+                changing with in-place updates.
+        """
+        array = self._map(instrument_id)
+        if array is None:
+            return _empty_series()
+        dates = array[0].view("datetime64[D]")
+        start = 0 if start_date is None else np.searchsorted(dates, np.datetime64(start_date, "D"))
+        end = len(dates) if end_date is None else np.searchsorted(dates, np.datetime64(end_date, "D"), side="right")
+        return PriceSeries(dates[start:end], *array[1:, start:end])
+
+    def read_many(self, instrument_ids: Iterable[int], start_date: date=None, end_date: date=None) -> dict[int, PriceSeries]:
+        """
+        Read several instruments' bars over a date range.
+
+        Args:
+            instrument_ids (Iterable[int]): Instrument ids.
+            start_date (date, optional): First date. Defaults to None.
+            end_date (date, optional): Last date. Defaults to None.
+
+        Returns:
+            dict[int, PriceSeries]: Views per instrument id.
+        """
+        return {id: self.read(id, start_date, end_date) for id in instrument_ids}
+
+    def write(self, instrument_id: int, dates: np.ndarray, prices: np.ndarray):
+        """
+        Insert or overwrite bars of an instrument.
+
+        Overwriting the latest bar, as intraday price updates do, is done in
+        place, and shows through views already read. Anything else merges
+        into a new file.
+
+        Args:
+            instrument_id (int): Instrument id.
+            dates (np.ndarray): Bar dates, unique.
+            prices (np.ndarray): (4, n) open, high, low and close per bar.
+        """
+        dates = np.asarray(dates, "datetime64[D]")
+        prices = np.asarray(prices, np.float64).reshape(4, -1)
+        with self._lock:
+            array = self._map(instrument_id)
+            existing = np.empty((5, 0)) if array is None else array
+
+            # Overwrite the latest bar in place.
+            if len(dates) == 1 and existing.shape[1] and existing[0, -1:].view("datetime64[D]")[0] == dates[0]:
+                writable = np.load(self._file(instrument_id), mmap_mode="r+")
+                writable[1:, -1] = prices[:, 0]
+                writable.flush()
+                return
+
+            # Merge, new bars first so they win on repeated dates.
+            merged_dates, index = np.unique(
+                np.concatenate((dates, existing[0].view("datetime64[D]"))),
+                return_index=True
+            )
+            merged = np.empty((5, len(merged_dates)))
+            merged[0] = merged_dates.view(np.float64)
+            merged[1:] = np.concatenate((prices, existing[1:]), axis=1)[:, index]
+
+            descriptor, temporary = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                np.save(file, merged)
+            os.replace(temporary, self._file(instrument_id))
+            self._maps.pop(instrument_id, None)
+
+    def write_bars(self, rows: Iterable[tuple[int, date, float, float, float, float]]):
+        """
+        Insert or overwrite bars of any instruments.
+
+        Args:
+            rows (Iterable[tuple[int, date, float, float, float, float]]): Instrument
+                id, date, open, high, low and close per bar.
+        """
+        bars = {}
+        for instrument_id, day, *prices in rows:
+            # Later bars for the same date win.
+            bars.setdefault(instrument_id, {})[day] = prices
+        for instrument_id, days in bars.items():
+            self.write(instrument_id, np.array(list(days), "datetime64[D]"), np.array(list(days.values()), np.float64).T)
+
+    def delete(self, instrument_id: int):
+        """
+        Delete an instrument's bars.
+
+        Args:
+            instrument_id (int): Instrument id.
+        """
+        with self._lock:
+            self._maps.pop(instrument_id, None)
+            try:
+                os.remove(self._file(instrument_id))
+            except FileNotFoundError:
+                pass
+
+    def has(self, instrument_id: int) -> bool:
+        """
+        Check whether an instrument has any bars stored.
+
+        Args:
+            instrument_id (int): Instrument id.
+
+        Returns:
+            bool: Whether the instrument has a file.
+        """
+        return os.path.exists(self._file(instrument_id))
+
+    @property
+    def empty(self) -> bool:
+        """
+        Whether no instrument has bars stored, as before a first rebuild.
+        """
+        return not any(name.endswith(".npy") for name in os.listdir(self.path))
+
+    def _file(self, instrument_id: int) -> str:
+        return os.path.join(self.path, f"{instrument_id}.npy")
+
+    def _map(self, instrument_id: int) -> np.ndarray | None:
+        # Reuse an open map unless the file has been replaced since.
+        with self._lock:
+            try:
+                stat = os.stat(self._file(instrument_id))
+            except FileNotFoundError:
+                self._maps.pop(instrument_id, None)
+                return None
+            key = (stat.st_ino, stat.st_size)
+            cached = self._maps.get(instrument_id)
+            if cached is not None and cached[0] == key:
+                self._maps.move_to_end(instrument_id)
+                return cached[1]
+            array = np.load(self._file(instrument_id), mmap_mode="r")
+            self._maps[instrument_id] = (key, array)
+            while len(self._maps) > MAX_OPEN_MAPS:
+                self._maps.popitem(last=False)
+            return array
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Optional, only kept when a path is configured.
+price_store = PriceStore(settings.PRICE_STORE_PATH) if settings.PRICE_STORE_PATH else None
@@ -0,0 +1,202 @@
+'''
+Module for resampling ticks into OHLCV bars with NumPy.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from typing import NamedTuple
+
+import numpy as np
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Bar lengths in seconds.
+INTERVALS = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+# - - - - - - - - - - - - - - - - - - -
+
+class Bars(NamedTuple):
+    instrument_id: np.ndarray
+    start: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+
+def _empty_bars() -> Bars:
+    return Bars(
+        np.empty(0, np.int64),
+        np.empty(0, "datetime64[s]"),
+        *[np.empty(0, np.float64) for _ in range(5)]
+    )
+
+
+def _reduce(bars: Bars) -> Bars:
+    """
+    Merge consecutive bars of the same instrument and start.
+
+    Bars must be sorted by instrument then start, and in time order within
+    a group, so every field reduces over a contiguous segment.
+    """
+    instrument_ids, starts = bars.instrument_id, bars.start
+    boundary = np.empty(len(instrument_ids), bool)
+    boundary[:1] = True
+    np.not_equal(instrument_ids[1:], instrument_ids[:-1], out=boundary[1:])
+    boundary[1:] |= starts[1:] != starts[:-1]
+    first = np.flatnonzero(boundary)
+    last = np.append(first[1:], len(instrument_ids)) - 1
+    return Bars(
+        instrument_ids[first],
+        starts[first],
+        bars.open[first],
+        np.maximum.reduceat(bars.high, first),
+        np.minimum.reduceat(bars.low, first),
+        bars.close[last],
+        np.add.reduceat(bars.volume, first)
+    )
+
+# - - - - - - - - - - - - - - - - - - -
+
+class BarResampler:
+    """
+    Incrementally resample ticks of many instruments into bars of one interval.
+
+    The latest bar of each instrument stays open, as later ticks may still
+    fall into it, and is only returned once a tick for a later bar arrives
+    or it's flushed. Each update only sorts and reduces the new ticks, then
+    merges them with the open bars, so work is proportional to the batch
+    rather than the history.
+    """
+
+    def __init__(self, interval: str):
+        """
+        Initialise resampler.
+
+        Args:
+            interval (str): One of INTERVALS.
+
+        Raises:
+            ValueError: Unsupported interval.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval, expected one of {', '.join(INTERVALS)}.")
+        self.interval = interval
+        self.seconds = INTERVALS[interval]
+        self.late = 0
+        self._open_bars = _empty_bars()
+
+    @property
+    def open_bars(self) -> Bars:
+        return self._open_bars
+
+    def update(
+            self,
+            instrument_ids: np.ndarray,
+            timestamps: np.ndarray,
+            prices: np.ndarray,
+            volumes: np.ndarray=None
+        ) -> Bars:
+        """
+        Add newly arrived ticks.
+
+        Ticks earlier than an instrument's open bar can no longer be placed and
+        are counted as late.
+
+        Args:
+            instrument_ids (np.ndarray): Instrument id per tick.
+            timestamps (np.ndarray): Tick times as datetime64.
+            prices (np.ndarray): Tick prices.
+            volumes (np.ndarray, optional): Tick volumes, zero if None. Defaults to None.
+
+        Returns:
+            Bars: Bars completed by these ticks, by instrument then start.
+        """
+        instrument_ids = np.asarray(instrument_ids, np.int64)
+        times = np.asarray(timestamps, "datetime64[ns]")
+        prices = np.asarray(prices, np.float64)
+        volumes = np.zeros(len(prices)) if volumes is None else np.asarray(volumes, np.float64)
+        seconds = times.astype("datetime64[s]").astype(np.int64)
+        starts = (seconds - seconds % self.seconds).astype("datetime64[s]")
+
+        # Drop ticks before each instrument's open bar.
+        open_bars = self._open_bars
+        if len(open_bars.instrument_id) and len(instrument_ids):
+            index = np.searchsorted(open_bars.instrument_id, instrument_ids).clip(max=len(open_bars.instrument_id) - 1)
+            late = (open_bars.instrument_id[index] == instrument_ids) & (starts < open_bars.start[index])
+            if late.any():
+                self.late += int(late.sum())
+                keep = ~late
+                instrument_ids, times, starts, prices, volumes = instrument_ids[keep], times[keep], starts[keep], prices[keep], volumes[keep]
+
+        # Ticks are bars with a single price, placed after the open bars they may extend.
+        combined = Bars(*[np.concatenate(pair) for pair in zip(
+            open_bars,
+            Bars(instrument_ids, starts, prices, prices, prices, prices, volumes)
+        )])
+        # Stable sort by instrument then tick time, open bars sorting at their start.
+        # Ticks usually arrive in time order, needing only a stable sort by instrument.
+        if np.all(times[1:] >= times[:-1]):
+            order = np.argsort(combined.instrument_id, kind="stable")
+        else:
+            times = np.concatenate((open_bars.start.astype("datetime64[ns]"), times))
+            order = np.lexsort((times, combined.instrument_id))
+        bars = _reduce(Bars(*[field[order] for field in combined]))
+
+        # Keep each instrument's latest bar open.
+        latest = np.append(bars.instrument_id[1:] != bars.instrument_id[:-1], True)
+        self._open_bars = Bars(*[field[latest] for field in bars])
+        return Bars(*[field[~latest] for field in bars])
+
+    def flush(self, until: np.datetime64=None) -> Bars:
+        """
+        Close open bars.
+
+        Args:
+            until (np.datetime64, optional): Close only bars ending by this time, all if None. Defaults to None.
+
+        Returns:
+            Bars: Closed bars, by instrument.
+        """
+        if until is None:
+            closing = np.ones(len(self._open_bars.instrument_id), bool)
+        else:
+            closing = self._open_bars.start + np.timedelta64(self.seconds, "s") <= np.datetime64(until, "s")
+        closed = Bars(*[field[closing] for field in self._open_bars])
+        self._open_bars = Bars(*[field[~closing] for field in self._open_bars])
+        return closed
+
+
+def resample(
+        instrument_ids: np.ndarray,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        interval: str,
+        volumes: np.ndarray=None
+    ) -> Bars:
+    """
+    Resample a complete set of ticks into bars.
+
+    Args:
+        instrument_ids (np.ndarray): Instrument id per tick.
+        timestamps (np.ndarray): Tick times as datetime64.
+        prices (np.ndarray): Tick prices.
+        interval (str): One of INTERVALS.
+        volumes (np.ndarray, optional): Tick volumes, zero if None. Defaults to None.
+
+    Returns:
+        Bars: Bars by instrument then start.
+    """
+    resampler = BarResampler(interval)
+    completed = resampler.update(instrument_ids, timestamps, prices, volumes)
+    final = resampler.flush()
+    bars = Bars(*[np.concatenate(pair) for pair in zip(completed, final)])
+    order = np.lexsort((bars.start, bars.instrument_id))
+    return Bars(*[field[order] for field in bars])
@@ -0,0 +1,139 @@
+'''
+Module for time-weighted and money-weighted portfolio returns.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import date
+
+import numpy as np
+
+# - - - - - - - - - - - - - - - - - - -
+
+PERIODS = ("MTD", "QTD", "YTD", "ITD")
+
+# Day count basis for annualising money-weighted returns, as XIRR.
+DAYS_PER_YEAR = 365.0
+
+# - - - - - - - - - - - - - - - - - - -
+
+def period_starts(as_of: date, inception: date) -> dict[str, date]:
+    """
+    Get the first day of each period ending on a date.
+
+    Args:
+        as_of (date): Last day of the periods.
+        inception (date): First day with orders.
+
+    Returns:
+        dict[str, date]: First day per period, no earlier than inception.
+    """
+    starts = {
+        "MTD": as_of.replace(day=1),
+        "QTD": date(as_of.year, 3 * ((as_of.month - 1) // 3) + 1, 1),
+        "YTD": date(as_of.year, 1, 1),
+        "ITD": inception,
+    }
+    return {period: max(start, inception) for period, start in starts.items()}
+
+
+def daily_returns(market_value: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """
+    Get each day's return, stripping out that day's flows.
+
+    Args:
+        market_value (np.ndarray): Market value at the end of each day.
+        flows (np.ndarray): Net capital invested on each day.
+
+    Returns:
+        np.ndarray: Return per day, NaN on days starting without capital at risk.
+    """
+    previous = np.concatenate(([0.0], market_value[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous != 0, (market_value - flows) / previous - 1, np.nan)
+
+
+def time_weighted_returns(market_value: np.ndarray, flows: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Chain-link daily returns from each start to the last day.
+
+    Each day's return strips out that day's flows, so it's independent of
+    when capital was added or withdrawn. Days starting without capital at
+    risk are skipped.
+
+    Args:
+        market_value (np.ndarray): Market value at the end of each day.
+        flows (np.ndarray): Net capital invested on each day.
+        starts (np.ndarray): Index of each period's first day.
+
+    Returns:
+        np.ndarray: Cumulative return per period.
+    """
+    growth = 1 + np.nan_to_num(daily_returns(market_value, flows))
+    # Growth from each day to the end, so any period is a single lookup.
+    remaining = np.cumprod(growth[::-1])[::-1]
+    return remaining[starts] - 1
+
+
+def money_weighted_flows(market_value: np.ndarray, flows: np.ndarray, start: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the investor's cash flows over a period ending on the last day.
+
+    The value before the period counts as an initial investment and the
+    final value as a final withdrawal. Flows are timed at the end of their day.
+
+    Args:
+        market_value (np.ndarray): Market value at the end of each day.
+        flows (np.ndarray): Net capital invested on each day.
+        start (int): Index of the period's first day.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Amounts, negative when invested, and
+            their times in years from the period start.
+    """
+    days = np.flatnonzero(flows[start:]) + start
+    initial = market_value[start - 1] if start else 0.0
+    amounts = np.concatenate(([-initial], -flows[days], [market_value[-1]]))
+    years = np.concatenate(([0.0], days - start + 1, [len(flows) - start])) / DAYS_PER_YEAR
+    return amounts, years
+
+
+def xirr(amounts: np.ndarray, years: np.ndarray, tol: float=1e-10, max_iter: int=50) -> np.ndarray:
+    """
+    Solve the annual rates setting the net present value of cash flows to zero.
+
+    Every row is solved at once by Newton's method, evaluating the NPV and
+    its derivative as array operations. Iterating on the log growth rate
+    keeps rates above -100% without clamping.
+
+    Args:
+        amounts (np.ndarray): (rows, flows) amounts, zero padded.
+        years (np.ndarray): (rows, flows) times in years.
+        tol (float, optional): Convergence tolerance on the log rate. Defaults to 1e-10.
+        max_iter (int, optional): Iteration limit. Defaults to 50.
+
+    Returns:
+        np.ndarray: Rate per row, NaN without a solution.
+    """
+    amounts = np.atleast_2d(amounts)
+    years = np.atleast_2d(years)
+    rates = np.full(len(amounts), np.nan)
+    # A root needs both inflows and outflows.
+    active = np.flatnonzero((amounts > 0).any(axis=1) & (amounts < 0).any(axis=1))
+    log_rates = np.full(len(active), np.log1p(0.1))
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        discounted = amounts[active] * np.exp(-log_rates[:, None] * years[active])
+        npv = discounted.sum(axis=1)
+        derivative = -(discounted * years[active]).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = npv / derivative
+        log_rates -= step
+        converged = np.abs(step) < tol
+        rates[active[converged]] = np.expm1(log_rates[converged])
+        # Drop converged and diverged rows.
+        keep = ~converged & np.isfinite(log_rates)
+        active, log_rates = active[keep], log_rates[keep]
+    return rates
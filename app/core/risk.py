@@ -0,0 +1,203 @@
+'''
+Module for portfolio risk metrics and caching them in process.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.core.returns import DAYS_PER_YEAR
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Confidence levels of historical value at risk.
+VAR_LEVELS = (0.95, 0.99)
+
+# Days per rolling volatility window.
+ROLLING_WINDOW = 30
+
+# - - - - - - - - - - - - - - - - - - -
+
+def annualised_volatility(returns: np.ndarray) -> float:
+    """
+    Annualise the standard deviation of daily returns.
+
+    Args:
+        returns (np.ndarray): Daily returns.
+
+    Returns:
+        float: Volatility, NaN with fewer than two returns.
+    """
+    if len(returns) < 2:
+        return np.nan
+    return float(returns.std(ddof=1) * np.sqrt(DAYS_PER_YEAR))
+
+
+def rolling_volatility(returns: np.ndarray, window: int) -> np.ndarray:
+    """
+    Annualised volatility over each window of consecutive daily returns.
+
+    Windows are strided views of the returns, so none is copied out.
+
+    Args:
+        returns (np.ndarray): Daily returns.
+        window (int): Returns per window, at least two.
+
+    Returns:
+        np.ndarray: Volatility per window, ending on each return from the window's last.
+    """
+    if len(returns) < window:
+        return np.empty(0)
+    return sliding_window_view(returns, window).std(axis=1, ddof=1) * np.sqrt(DAYS_PER_YEAR)
+
+
+def max_drawdown(returns: np.ndarray) -> tuple[float, int, int]:
+    """
+    Get the largest fall of the growth index from a previous peak.
+
+    Args:
+        returns (np.ndarray): Daily returns, NaN on days without capital at risk.
+
+    Returns:
+        tuple[float, int, int]: Drawdown as a negative fraction, and the
+            indexes of its peak and trough.
+    """
+    wealth = np.cumprod(1 + np.nan_to_num(returns))
+    drawdowns = wealth / np.maximum.accumulate(wealth) - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(wealth[:trough + 1]))
+    return float(drawdowns[trough]), peak, trough
+
+
+def historical_var(returns: np.ndarray, levels: tuple[float, ...]=VAR_LEVELS) -> np.ndarray:
+    """
+    Get historical value at risk, the daily loss only exceeded on the tail of past returns.
+
+    Each level's order statistic is found by one partial sort, rather than
+    sorting every return.
+
+    Args:
+        returns (np.ndarray): Daily returns.
+        levels (tuple[float, ...], optional): Confidence levels. Defaults to VAR_LEVELS.
+
+    Returns:
+        np.ndarray: Loss per level as a positive fraction, NaN without returns.
+    """
+    if not len(returns):
+        return np.full(len(levels), np.nan)
+    ranks = np.ceil((1 - np.asarray(levels)) * len(returns)).astype(np.int64) - 1
+    ranks = ranks.clip(0, len(returns) - 1)
+    return -np.partition(returns, ranks)[ranks]
+
+# - - - - - - - - - - - - - - - - - - -
+
+class RiskCache:
+    """
+    Least recently used cache of computed risk metrics.
+
+    Entries are keyed by a tuple starting with the user id, and remember the
+    instruments they were valued from, so a price change only drops the
+    holders' entries. Versioning matches the instrument cache, so metrics
+    computed while a write lands aren't stored.
+    """
+
+    def __init__(self, max_size: int=10000):
+        """
+        Initialise cache.
+
+        Args:
+            max_size (int, optional): Maximum number of entries held. Defaults to 10000.
+        """
+        self.max_size = max_size
+        self.version = 0
+        self._entries = OrderedDict()
+        self._users = {}
+        self._instruments = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[Hashable, ...]):
+        """
+        Get cached metrics.
+
+        Args:
+            key (tuple[Hashable, ...]): User id followed by the parameters.
+
+        Returns:
+            Metrics, None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple[Hashable, ...], value, instrument_ids: set[int], version: int):
+        """
+        Store metrics, evicting the least recently used.
+
+        Args:
+            key (tuple[Hashable, ...]): User id followed by the parameters.
+            value: Metrics.
+            instrument_ids (set[int]): Instruments the metrics were valued from.
+            version (int): Cache version when computing started.
+        """
+        with self._lock:
+            if version != self.version:
+                return
+            self._drop(key)
+            self._entries[key] = (frozenset(instrument_ids), value)
+            self._users.setdefault(key[0], set()).add(key)
+            for instrument_id in instrument_ids:
+                self._instruments.setdefault(instrument_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_ids: set[int] | None=None, instrument_ids: set[int] | None=None):
+        """
+        Drop metrics after orders or prices change.
+
+        Args:
+            user_ids (set[int] | None, optional): Users whose orders changed. Defaults to None.
+            instrument_ids (set[int] | None, optional): Instruments whose prices changed. Defaults to None.
+                All metrics are dropped if neither is given.
+        """
+        with self._lock:
+            self.version += 1
+            if user_ids is None and instrument_ids is None:
+                self._entries.clear()
+                self._users.clear()
+                self._instruments.clear()
+                return
+            keys = set()
+            for user_id in user_ids or ():
+                keys.update(self._users.get(user_id, ()))
+            for instrument_id in instrument_ids or ():
+                keys.update(self._instruments.get(instrument_id, ()))
+            for key in keys:
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: tuple[Hashable, ...]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._users[key[0]].discard(key)
+        if not self._users[key[0]]:
+            del self._users[key[0]]
+        for instrument_id in entry[0]:
+            self._instruments[instrument_id].discard(key)
+            if not self._instruments[instrument_id]:
+                del self._instruments[instrument_id]
+
+# - - - - - - - - - - - - - - - - - - -
+
+risk_cache = RiskCache()
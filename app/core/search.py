@@ -0,0 +1,245 @@
+'''
+Module for ranked prefix and fuzzy instrument search in memory.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+# - - - - - - - - - - - - - - - - - - -
+
+# Minimum trigram similarity for a fuzzy match, as pg_trgm's default.
+SIMILARITY_THRESHOLD = 0.3
+
+# Shorter queries only match by prefix.
+MIN_FUZZY_LENGTH = 3
+
+# Rank tiers, ahead of any similarity score.
+EXACT_SYMBOL = 3
+SYMBOL_PREFIX = 2
+NAME_PREFIX = 1
+
+# - - - - - - - - - - - - - - - - - - -
+
+def trigrams(text: str) -> set[str]:
+    """
+    Split text into trigrams the way pg_trgm does.
+
+    Each lower-cased alphanumeric word is padded with two spaces in front and
+    one behind, so prefixes weigh more than the rest of the word.
+
+    Args:
+        text (str): Text.
+
+    Returns:
+        set[str]: Trigrams.
+    """
+    grams = set()
+    for word in re.findall(r"[0-9a-z]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: set[str], b: set[str]) -> float:
+    """
+    Share of trigrams in common, as pg_trgm similarity().
+
+    Args:
+        a (set[str]): Trigrams.
+        b (set[str]): Trigrams.
+
+    Returns:
+        float: Similarity between 0 and 1.
+    """
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+# - - - - - - - - - - - - - - - - - - -
+
+class InstrumentSearchIndex:
+    """
+    Trigram and prefix index over instrument symbols and name words.
+
+    Symbols and name words are held once each as keys, with their instrument
+    ids sorted by symbol. Prefixes are found by bisecting the sorted keys and
+    typos by trigram postings over keys, so work scales with the number of
+    distinct matching keys rather than matching instruments. Results are
+    merged lazily in rank order and stop at the limit.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._symbols = {}
+        self._words = {}
+        self._symbol_ids = {}
+        self._word_ids = {}
+        self._keys = []
+        self._key_grams = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def load(self, instruments: list[tuple[int, str, str]]):
+        """
+        Replace the index contents.
+
+        Args:
+            instruments (list[tuple[int, str, str]]): Id, symbol and name per instrument.
+        """
+        with self._lock:
+            self._reset()
+            for id, symbol, name in sorted(instruments, key=lambda instrument: (instrument[1].lower(), instrument[0])):
+                symbol = symbol.lower()
+                self._symbols[id] = symbol
+                self._words[id] = set(re.findall(r"[0-9a-z]+", name.lower()))
+                self._symbol_ids.setdefault(symbol, []).append((symbol, id))
+                for word in self._words[id]:
+                    self._word_ids.setdefault(word, []).append((symbol, id))
+            self._keys = sorted(self._symbol_ids.keys() | self._word_ids.keys())
+            for key in self._keys:
+                self._add_key(key)
+            self.loaded = True
+
+    def clear(self):
+        """
+        Empty the index, to be reloaded on next search.
+        """
+        with self._lock:
+            self._reset()
+
+    def add(self, id: int, symbol: str, name: str):
+        """
+        Add or replace one instrument.
+
+        Args:
+            id (int): Instrument id.
+            symbol (str): Symbol.
+            name (str): Name.
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            self._remove(id)
+            symbol = symbol.lower()
+            self._symbols[id] = symbol
+            self._words[id] = set(re.findall(r"[0-9a-z]+", name.lower()))
+            for key, ids in [(symbol, self._symbol_ids)] + [(word, self._word_ids) for word in self._words[id]]:
+                if key not in self._key_grams:
+                    self._add_key(key)
+                    self._keys.insert(bisect_left(self._keys, key), key)
+                key_ids = ids.setdefault(key, [])
+                key_ids.insert(bisect_left(key_ids, (symbol, id)), (symbol, id))
+
+    def remove(self, id: int):
+        """
+        Remove one instrument.
+
+        Args:
+            id (int): Instrument id.
+        """
+        with self._lock:
+            if self.loaded:
+                self._remove(id)
+
+    def search(self, query: str, limit: int) -> list[int]:
+        """
+        Rank instruments against a query.
+
+        Exact symbol matches come first, then symbol prefixes, then names with
+        a word starting with the query, each by the share of the key matched.
+        Fuzzy matches by trigram similarity to a symbol or name word come
+        last, and are only looked for if prefixes don't fill the limit.
+
+        Args:
+            query (str): Search text.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[int]: Instrument ids, best first.
+        """
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        with self._lock:
+            # Prefix matches, from the sorted keys.
+            groups = {}
+            start = bisect_left(self._keys, needle)
+            end = bisect_left(self._keys, needle[:-1] + chr(ord(needle[-1]) + 1), start)
+            for key in self._keys[start:end]:
+                closeness = len(needle) / len(key)
+                if key in self._symbol_ids:
+                    tier = EXACT_SYMBOL if key == needle else SYMBOL_PREFIX
+                    groups.setdefault((tier, closeness), []).append(self._symbol_ids[key])
+                if key in self._word_ids:
+                    groups.setdefault((NAME_PREFIX, closeness), []).append(self._word_ids[key])
+            results = self._take(groups, limit, [])
+
+            # Fuzzy matches, scoring only keys sharing a trigram.
+            if len(results) < limit and len(needle) >= MIN_FUZZY_LENGTH:
+                query_grams = trigrams(needle)
+                shared = Counter()
+                for gram in query_grams:
+                    shared.update(self._postings.get(gram, ()))
+                groups = {}
+                for key, common in shared.items():
+                    # Best case bound, before computing the similarity.
+                    if common / len(query_grams) < SIMILARITY_THRESHOLD:
+                        continue
+                    score = similarity(query_grams, self._key_grams[key])
+                    if score >= SIMILARITY_THRESHOLD:
+                        key_ids = groups.setdefault((0, score), [])
+                        key_ids.extend(ids[key] for ids in (self._symbol_ids, self._word_ids) if key in ids)
+                results = self._take(groups, limit, results)
+        return results
+
+    def _take(self, groups: dict[tuple, list[list]], limit: int, results: list[int]) -> list[int]:
+        # Visit groups best rank first, merging each group's lists by symbol.
+        seen = set(results)
+        for rank in sorted(groups, reverse=True):
+            for _, id in heapq.merge(*groups[rank]):
+                if len(results) >= limit:
+                    return results
+                if id not in seen:
+                    seen.add(id)
+                    results.append(id)
+        return results
+
+    def _reset(self):
+        self.loaded = False
+        self._symbols = {}
+        self._words = {}
+        self._symbol_ids = {}
+        self._word_ids = {}
+        self._keys = []
+        self._key_grams = {}
+        self._postings = {}
+
+    def _add_key(self, key: str):
+        # Callers keep the sorted key list.
+        self._key_grams[key] = trigrams(key)
+        for gram in self._key_grams[key]:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _remove(self, id: int):
+        symbol = self._symbols.pop(id, None)
+        if symbol is None:
+            return
+        for key, ids in [(symbol, self._symbol_ids)] + [(word, self._word_ids) for word in self._words.pop(id)]:
+            ids[key].remove((symbol, id))
+            if not ids[key]:
+                del ids[key]
+            if key not in self._symbol_ids and key not in self._word_ids:
+                self._keys.pop(bisect_left(self._keys, key))
+                for gram in self._key_grams.pop(key):
+                    self._postings[gram].discard(key)
+
+# - - - - - - - - - - - - - - - - - - -
+
+instrument_search_index = InstrumentSearchIndex()
@@ -0,0 +1,54 @@
+'''
+Module for computing portfolio summaries from orders.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from typing import NamedTuple
+
+import numpy as np
+
+# - - - - - - - - - - - - - - - - - - -
+
+class SummaryValues(NamedTuple):
+    ending_market_value: float
+    beginning_market_value: float
+    profit_loss: float
+
+# - - - - - - - - - - - - - - - - - - -
+
+def compute_summary(
+        signs: np.ndarray,
+        volumes: np.ndarray,
+        prices: np.ndarray,
+        closes: np.ndarray
+    ) -> SummaryValues:
+    """
+    Compute summary values from order arrays in one vectorised pass.
+
+    The beginning market value is the net capital invested (buys less sells),
+    the ending market value marks net holdings to the latest close and the
+    profit/loss is the difference. Orders in instruments without a close are
+    marked at their own price, which keeps every order's contribution
+    independent so the values can also be maintained incrementally.
+
+    Args:
+        signs (np.ndarray): 1 for buys, -1 for sells and 0 otherwise.
+        volumes (np.ndarray): Volume per order.
+        prices (np.ndarray): Price per order.
+        closes (np.ndarray): Latest close of each order's instrument, NaN if unknown.
+
+    Returns:
+        SummaryValues: Computed summary values.
+    """
+    signed_volumes = signs * volumes
+    marks = np.where(np.isnan(closes), prices, closes)
+
+    beginning_market_value = float(np.dot(signed_volumes, prices))
+    ending_market_value = float(np.dot(signed_volumes, marks))
+    return SummaryValues(
+        ending_market_value,
+        beginning_market_value,
+        ending_market_value - beginning_market_value
+    )
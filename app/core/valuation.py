@@ -0,0 +1,187 @@
+'''
+Module for valuing portfolios over daily date grids with NumPy.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from typing import NamedTuple
+
+import numpy as np
+
+# - - - - - - - - - - - - - - - - - - -
+
+class ValuationSeries(NamedTuple):
+    dates: np.ndarray
+    market_value: np.ndarray
+    net_invested: np.ndarray
+
+# - - - - - - - - - - - - - - - - - - -
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """
+    Carry the last known value of each row forward over NaNs.
+
+    Args:
+        matrix (np.ndarray): (rows, days) values, NaN where unknown.
+
+    Returns:
+        np.ndarray: Filled values, NaN before a row's first known value.
+    """
+    known = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[1]))
+    np.maximum.accumulate(known, axis=1, out=known)
+    return np.take_along_axis(matrix, known, axis=1)
+
+
+def _grid_matrix(rows: np.ndarray, days: np.ndarray, values: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """
+    Place values on a (rows, days) grid, the last value winning per cell.
+
+    Values must be in time order, and days before the grid count as its first day.
+    """
+    matrix = np.full(shape, np.nan)
+    keep = (days < shape[1]) & ~np.isnan(values)
+    if not keep.all():
+        rows, days, values = rows[keep], days[keep], values[keep]
+    if not len(values):
+        return matrix
+    cells = rows * shape[1] + days.clip(min=0)
+    # Keep the last value per cell, as repeated fancy assignment has no defined order.
+    # Bars usually arrive sorted by instrument and date, needing no sort.
+    if np.any(cells[1:] < cells[:-1]):
+        order = np.argsort(cells, kind="stable")
+        cells, values = cells[order], values[order]
+    last = np.append(cells[1:] != cells[:-1], True)
+    matrix.reshape(-1)[cells[last]] = values[last]
+    return matrix
+
+
+def close_matrix(
+        start: np.datetime64,
+        end: np.datetime64,
+        bar_instruments: np.ndarray,
+        bar_dates: np.ndarray,
+        bar_closes: np.ndarray,
+        instruments: int
+    ) -> np.ndarray:
+    """
+    Get each instrument's latest close on every day of a date range.
+
+    Args:
+        start (np.datetime64): First day.
+        end (np.datetime64): Last day.
+        bar_instruments (np.ndarray): Instrument index per bar, from 0.
+        bar_dates (np.ndarray): Bar dates in time order per instrument, earlier
+            bars counting towards the first day.
+        bar_closes (np.ndarray): Close per bar, NaN if unknown.
+        instruments (int): Number of instruments.
+
+    Returns:
+        np.ndarray: (instruments, days) closes, NaN before an instrument's first close.
+    """
+    start = np.datetime64(start, "D")
+    shape = (instruments, int((np.datetime64(end, "D") - start).astype(np.int64)) + 1)
+    bar_days = (np.asarray(bar_dates, "datetime64[D]") - start).astype(np.int64)
+    return forward_fill(_grid_matrix(bar_instruments, bar_days, bar_closes, shape))
+
+
+def value_holdings(
+        start: np.datetime64,
+        order_instruments: np.ndarray,
+        order_dates: np.ndarray,
+        signed_volumes: np.ndarray,
+        order_prices: np.ndarray,
+        closes: np.ndarray,
+        rates: np.ndarray=None,
+        order_rates: np.ndarray=None
+    ) -> ValuationSeries:
+    """
+    Value a portfolio's holdings against a close matrix.
+
+    Holdings are cumulative sums of order volumes over the grid, marked at
+    each day's close, or at the latest order price before an instrument has
+    a close. Orders before the range count towards its first day. With
+    rates, marks are converted by one multiply over the grid, and flows at
+    each order's own rate.
+
+    Args:
+        start (np.datetime64): First day.
+        order_instruments (np.ndarray): Instrument index per order, from 0.
+        order_dates (np.ndarray): Order times in time order.
+        signed_volumes (np.ndarray): Volume per order, positive for buys and negative for sells.
+        order_prices (np.ndarray): Price per order.
+        closes (np.ndarray): (instruments, days) closes from the first day, as close_matrix.
+        rates (np.ndarray, optional): (instruments, days) factors converting
+            closes into the valuation currency. Defaults to None.
+        order_rates (np.ndarray, optional): Factor converting each order's
+            price into the valuation currency. Defaults to None.
+
+    Returns:
+        ValuationSeries: Market value and net capital invested per day.
+    """
+    start = np.datetime64(start, "D")
+    shape = closes.shape
+    dates = start + np.arange(shape[1])
+
+    # Holdings per instrument and day.
+    order_days = (np.asarray(order_dates, "datetime64[D]") - start).astype(np.int64)
+    in_range = order_days < shape[1]
+    order_cells = order_instruments[in_range] * shape[1] + order_days[in_range].clip(min=0)
+    holdings = np.bincount(order_cells, signed_volumes[in_range], minlength=shape[0] * shape[1]).reshape(shape)
+    np.cumsum(holdings, axis=1, out=holdings)
+    amounts = signed_volumes * order_prices
+    if order_rates is not None:
+        amounts = amounts * order_rates
+    flows = np.bincount(order_days[in_range].clip(min=0), amounts[in_range], minlength=shape[1])
+
+    # Fall back to the latest order price without a close.
+    marks = closes
+    missing = np.isnan(closes)
+    if missing.any():
+        marks = np.where(missing, forward_fill(_grid_matrix(order_instruments, order_days, order_prices, shape)), closes)
+    if rates is not None:
+        marks = marks * rates
+
+    values = np.where(holdings != 0, holdings * marks, 0.0)
+    return ValuationSeries(dates, values.sum(axis=0), np.cumsum(flows))
+
+
+def value_portfolio(
+        start: np.datetime64,
+        end: np.datetime64,
+        order_instruments: np.ndarray,
+        order_dates: np.ndarray,
+        signed_volumes: np.ndarray,
+        order_prices: np.ndarray,
+        bar_instruments: np.ndarray,
+        bar_dates: np.ndarray,
+        bar_closes: np.ndarray,
+        rates: np.ndarray=None,
+        order_rates: np.ndarray=None
+    ) -> ValuationSeries:
+    """
+    Value a portfolio on every day of a date range.
+
+    Orders and bars before the range count towards its first day.
+
+    Args:
+        start (np.datetime64): First day.
+        end (np.datetime64): Last day.
+        order_instruments (np.ndarray): Instrument index per order, from 0.
+        order_dates (np.ndarray): Order times in time order.
+        signed_volumes (np.ndarray): Volume per order, positive for buys and negative for sells.
+        order_prices (np.ndarray): Price per order.
+        bar_instruments (np.ndarray): Instrument index per bar, from 0.
+        bar_dates (np.ndarray): Bar dates in time order per instrument.
+        bar_closes (np.ndarray): Close per bar, NaN if unknown.
+        rates (np.ndarray, optional): (instruments, days) factors converting
+            closes into the valuation currency. Defaults to None.
+        order_rates (np.ndarray, optional): Factor converting each order's
+            price into the valuation currency. Defaults to None.
+
+    Returns:
+        ValuationSeries: Market value and net capital invested per day.
+    """
+    instruments = int(max(order_instruments.max(initial=-1), bar_instruments.max(initial=-1))) + 1
+    closes = close_matrix(start, end, bar_instruments, bar_dates, bar_closes, instruments)
+    return value_holdings(start, order_instruments, order_dates, signed_volumes, order_prices, closes, rates, order_rates)
@@ -5,12 +5,97 @@ Created on 22-06-2025
 @author: Harry New
 
 '''
-from datetime import datetime
-
+import functools
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from typing import Iterable, Iterator
+
+import numpy as np
+from sqlalchemy import ARRAY, event, Date, Float, Integer, String, case, cast, column, delete, func, insert, literal, or_, text, true, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import aliased, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from sqlmodel import Session, select
 
-from app.models import User, UserCreate, Instrument, Order, OrderCreate, OrdersPublic, InstrumentBase, OrderUpdate, Summary, SummaryUpdate
+from app.models import User, UserCreate, Instrument, InstrumentsPublic, InstrumentPrice, InstrumentPriceBase, InstrumentPriceCreate, InstrumentPricesPublic, InstrumentPriceUpdate, InstrumentPricesUpdated, FxRate, FxRateBase, FxRateCreate, FxRatesPublic, Order, OrderCreate, OrdersPublic, InstrumentBase, OrderUpdate, Summary, SummaryUpdate, Position, PositionCheckpoint, PositionPublic, PositionsPublic, LotMatchPublic, RealisedPnlPublic, DisposalPublic, CgtReportPublic, ValuationPublic, PeriodReturnPublic, ReturnsPublic, RiskPublic, RiskVersion, BUY, SELL
 from app.core.security import get_password_hash, verify_password
+from app.core.cache import instrument_cache
+from app.core.hub import price_hub
+from app.core.feed import Quote
+from app.core.resample import Bars
+from app.core.price_store import PriceStore, price_store
+from app.core.fx import FxRates, fx_rates
+from app.core.search import instrument_search_index, EXACT_SYMBOL, SYMBOL_PREFIX, NAME_PREFIX
+from app.core.summary import compute_summary
+from app.core.positions import PositionState, apply_order, next_month_start
+from app.core.lots import match_lots
+from app.core.cgt import match_disposals, tax_year_bounds
+from app.core.valuation import ValuationSeries, close_matrix, value_holdings, value_portfolio
+from app.core.returns import daily_returns, money_weighted_flows, period_starts, time_weighted_returns, xirr
+from app.core.risk import ROLLING_WINDOW, annualised_volatility, historical_var, max_drawdown, risk_cache, rolling_volatility
+
+# - - - - - - - - - - - - - - - - - - -
+# CURSOR HELPERS
+
+def _encode_cursor(*values) -> str:
+    """
+    Encode keyset values as an opaque cursor.
+
+    Args:
+        *values: JSON serialisable keyset values.
+
+    Returns:
+        str: Opaque cursor.
+    """
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list:
+    """
+    Decode an opaque cursor back into keyset values.
+
+    Args:
+        cursor (str): Opaque cursor.
+
+    Raises:
+        ValueError: Cursor is malformed.
+
+    Returns:
+        list: Keyset values.
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor.")
+    return values
+
+# - - - - - - - - - - - - - - - - - - -
+# BULK HELPERS
+
+def _unnest(name: str, **columns: tuple):
+    """
+    Build a derived table from parallel arrays, one bind parameter per column.
+
+    Unlike a multi-row VALUES list, the statement text doesn't grow with the
+    number of rows, so it compiles once and is served from the cache after.
+
+    Args:
+        name (str): Table alias.
+        **columns (tuple): Column type and list of values, per column name.
+
+    Returns:
+        TableValuedAlias: Derived table with the given columns.
+    """
+    return func.unnest(
+        *[cast(literal(values, ARRAY(type_)), ARRAY(type_)) for type_, values in columns.values()]
+    ).table_valued(
+        *[column(key, type_) for key, (type_, _) in columns.items()],
+        name=name
+    ).render_derived()
 
 # - - - - - - - - - - - - - - - - - - -
 # USER OPERATIONS
@@ -151,6 +236,44 @@ def change_password(*, session: Session, email: str, new_password: str) -> User:
     return user
 
 
+def change_lot_method(*, session: Session, user: User, lot_method: str) -> User:
+    """
+    Change lot matching method.
+
+    Args:
+        session (Session): SQL session.
+        user (User): User to update.
+        lot_method (str): Lot matching method.
+
+    Returns:
+        User: Updated User model.
+    """
+    user.lot_method = lot_method
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def change_base_currency(*, session: Session, user: User, base_currency: str | None) -> User:
+    """
+    Change base currency, leaving the summary to be recomputed in it.
+
+    Args:
+        session (Session): SQL session.
+        user (User): User to update.
+        base_currency (str | None): Base currency, None to leave values in instrument currencies.
+
+    Returns:
+        User: Updated User model.
+    """
+    user.base_currency = base_currency
+    _reset_summaries(session=session, user_ids=[user.id])
+    _queue_risk_invalidation(session=session, user_ids={user.id})
+    session.commit()
+    session.refresh(user)
+    return user
+
+
 def delete_user(*, session: Session, user: User):
     """
     Delete user.
@@ -162,6 +285,7 @@ def delete_user(*, session: Session, user: User):
     # Delete user.
     session.delete(user)
     session.commit()
+    risk_cache.invalidate(user_ids={user.id})
 
 # - - - - - - - - - - - - - - - - - - -
 # INSTRUMENT OPERATIONS
@@ -180,9 +304,58 @@ def create_instrument(*, session: Session, instrument_create: InstrumentBase):
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
+    instrument_cache.invalidate({db_obj.id})
+    instrument_search_index.add(db_obj.id, db_obj.symbol, db_obj.name)
     return db_obj
 
 
+# Prices change from other processes too, so only these are cached.
+CACHED_INSTRUMENT_COLUMNS = {"id", "name", "exchange", "symbol", "currency"}
+
+# Loaded from the db on first access after a cache hit.
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+
+def _attach_instrument(*, session: Session, snapshot: dict) -> Instrument:
+    """
+    Attach a cached instrument snapshot to a session without loading it.
+
+    Prices aren't cached, and are read from the db when first accessed.
+
+    Args:
+        session (Session): SQL session.
+        snapshot (dict): Instrument metadata columns.
+
+    Returns:
+        Instrument: Persistent instrument.
+    """
+    # Keep an instrument already in the session, with any pending changes.
+    existing = session.identity_map.get(identity_key(Instrument, snapshot["id"]))
+    if existing is not None:
+        return existing
+    instrument = Instrument.model_validate(snapshot)
+    make_transient_to_detached(instrument)
+    instrument = session.merge(instrument, load=False)
+    session.expire(instrument, PRICE_COLUMNS)
+    return instrument
+
+
+def _cache_instrument(instrument: Instrument | None, version: int) -> Instrument | None:
+    """
+    Store a loaded instrument in the cache.
+
+    Args:
+        instrument (Instrument | None): Loaded instrument.
+        version (int): Cache version before loading.
+
+    Returns:
+        Instrument | None: Same instrument.
+    """
+    if instrument is not None:
+        instrument_cache.put(instrument.model_dump(include=CACHED_INSTRUMENT_COLUMNS), version)
+    return instrument
+
+
 def get_instrument_by_symbol(*, session: Session, symbol:str) -> Instrument:
     """
     Get instrument by symbol.
@@ -194,9 +367,37 @@ def get_instrument_by_symbol(*, session: Session, symbol:str) -> Instrument:
     Returns:
         Instrument: Instrument in database.
     """
+    snapshot = instrument_cache.get_by_symbol(symbol)
+    if snapshot is not None:
+        return _attach_instrument(session=session, snapshot=snapshot)
+
+    version = instrument_cache.version
     statement = select(Instrument).where(Instrument.symbol == symbol)
     session_instrument = session.exec(statement).first()
-    return session_instrument
+    return _cache_instrument(session_instrument, version)
+
+
+def get_instrument_ids(*, session: Session, ids: set[int]) -> set[int]:
+    """
+    Get which of the given instrument ids exist, querying only those not cached.
+
+    Args:
+        session (Session): SQL session.
+        ids (set[int]): Instrument ids to check.
+
+    Returns:
+        set[int]: Existing instrument ids.
+    """
+    existing = {id for id in ids if instrument_cache.get(id) is not None}
+    remaining = set(ids) - existing
+    if not remaining:
+        return existing
+
+    version = instrument_cache.version
+    statement = select(Instrument).where(Instrument.id.in_(remaining))
+    for instrument in session.exec(statement):
+        existing.add(_cache_instrument(instrument, version).id)
+    return existing
 
 
 def get_instrument_by_id(*, session: Session, id: int) -> Instrument:
@@ -210,9 +411,219 @@ def get_instrument_by_id(*, session: Session, id: int) -> Instrument:
     Returns:
         Instrument: Instrument
     """
+    snapshot = instrument_cache.get(id)
+    if snapshot is not None:
+        return _attach_instrument(session=session, snapshot=snapshot)
+
+    version = instrument_cache.version
     statement = select(Instrument).where(Instrument.id == id)
     session_instrument = session.exec(statement).first()
-    return session_instrument
+    return _cache_instrument(session_instrument, version)
+
+
+def get_instruments(
+        *,
+        session: Session,
+        name: str=None,
+        exchange: str=None,
+        symbol: str=None,
+        currency: str=None,
+        after: str=None,
+        limit: int=None
+    ) -> InstrumentsPublic:
+    """
+    Get a page of instruments matching all given filters, ordered by id.
+
+    The page and the filtered total come from one statement, with the count
+    as a one row derived table outer joined to the page, so it's returned
+    even when the page is empty.
+
+    Args:
+        session (Session): SQL session.
+        name (str, optional): Name. Defaults to None.
+        exchange (str, optional): Exchange. Defaults to None.
+        symbol (str, optional): Symbol. Defaults to None.
+        currency (str, optional): Currency. Defaults to None.
+        after (str, optional): Cursor returned by a previous page. Defaults to None.
+        limit (int, optional): Maximum instruments to return. Defaults to None.
+
+    Raises:
+        ValueError: Cursor is malformed.
+
+    Returns:
+        InstrumentsPublic: Instruments, total matching the filters and next page cursor.
+    """
+    # Combine filters.
+    filters = [
+        column == value
+        for column, value in [
+            (Instrument.name, name),
+            (Instrument.exchange, exchange),
+            (Instrument.symbol, symbol),
+            (Instrument.currency, currency)
+        ]
+        if value is not None
+    ]
+    total = select(func.count().label("count")).select_from(Instrument).where(*filters).subquery()
+
+    # Seek past the last instrument of the previous page.
+    page = select(Instrument).where(*filters)
+    if after:
+        try:
+            after_id, = _decode_cursor(after)
+            after_id = int(after_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor.") from e
+        page = page.where(Instrument.id > after_id)
+    page = page.order_by(Instrument.id)
+    if limit:
+        # Fetch one extra row to know whether another page exists.
+        page = page.limit(limit + 1)
+    page = page.subquery()
+
+    statement = select(total.c.count, aliased(Instrument, page)).select_from(total).outerjoin(page, true()).order_by(page.c.id)
+    rows = session.exec(statement).all()
+
+    count = rows[0][0]
+    results = [instrument for _, instrument in rows if instrument is not None]
+    next_cursor = None
+    if limit and len(results) > limit:
+        results = results[:limit]
+        next_cursor = _encode_cursor(results[-1].id)
+    return InstrumentsPublic(data=results, count=count, next_cursor=next_cursor)
+
+
+@functools.cache
+def _has_trigram_indexes(bind) -> bool:
+    """
+    Check once per engine whether the trigram search indexes exist.
+
+    Args:
+        bind: Engine.
+
+    Returns:
+        bool: Whether pg_trgm indexes exist on instruments.
+    """
+    with Session(bind) as session:
+        statement = select(func.count()).select_from(text("pg_indexes")).where(text("indexname = 'ix_instrument_symbol_trgm'"))
+        return session.exec(statement).one() > 0
+
+
+def search_instruments(*, session: Session, query: str, limit: int=20) -> InstrumentsPublic:
+    """
+    Search instruments by symbol and name, ranked for type-ahead.
+
+    Exact symbols rank first, then symbol prefixes, then names with a word
+    starting with the query, then typo-tolerant trigram matches. Uses the
+    pg_trgm indexes when present and the in-memory index otherwise.
+
+    Args:
+        session (Session): SQL session.
+        query (str): Search text.
+        limit (int, optional): Maximum number of results. Defaults to 20.
+
+    Returns:
+        InstrumentsPublic: Instruments, best first.
+    """
+    needle = query.strip().lower()
+    if _has_trigram_indexes(session.get_bind()):
+        # Escape LIKE wildcards in the query.
+        pattern = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        symbol_prefix = Instrument.symbol.ilike(f"{pattern}%")
+        name_prefix = or_(Instrument.name.ilike(f"{pattern}%"), Instrument.name.ilike(f"% {pattern}%"))
+        tier = case(
+            (func.lower(Instrument.symbol) == needle, EXACT_SYMBOL),
+            (symbol_prefix, SYMBOL_PREFIX),
+            (name_prefix, NAME_PREFIX),
+            else_=0
+        )
+        closeness = case(
+            (symbol_prefix, float(len(needle)) / func.length(Instrument.symbol)),
+            else_=func.greatest(func.similarity(needle, Instrument.symbol), func.word_similarity(needle, Instrument.name))
+        )
+        statement = select(Instrument).where(or_(
+            symbol_prefix,
+            name_prefix,
+            Instrument.symbol.op("%")(needle),
+            literal(needle).op("<%")(Instrument.name)
+        )).order_by(tier.desc(), closeness.desc(), func.lower(Instrument.symbol)).limit(limit)
+        instruments = session.exec(statement).all()
+        return InstrumentsPublic(data=instruments, count=len(instruments))
+
+    # Build the in-memory index on first use.
+    if not instrument_search_index.loaded:
+        instrument_search_index.load(session.exec(select(Instrument.id, Instrument.symbol, Instrument.name)).all())
+    ids = instrument_search_index.search(needle, limit)
+    if not ids:
+        return InstrumentsPublic(data=[], count=0)
+    instruments = {instrument.id: instrument for instrument in session.exec(select(Instrument).where(Instrument.id.in_(ids)))}
+    data = [instruments[id] for id in ids if id in instruments]
+    return InstrumentsPublic(data=data, count=len(data))
+
+
+def _revalue_summaries(*, session: Session, closes: dict[int, float]) -> None:
+    """
+    Move holders' summary market values to new closes, without committing.
+
+    Must run before the instruments' closes are updated, as the previous
+    closes are read from the instrument table.
+
+    Args:
+        session (Session): SQL session.
+        closes (dict[int, float]): New close per instrument id.
+    """
+    if not closes:
+        return
+    new_closes = _unnest(
+        "new_closes",
+        instrument_id=(Integer, list(closes.keys())),
+        close=(Float, list(closes.values()))
+    )
+    # Deltas are in instrument currency, converted at the latest rates.
+    rates = _get_fx_rates(session=session)
+    codes = sorted(rates.currencies)
+    matrix = rates.matrix(codes, date.today()).ravel()
+    known = ~np.isnan(matrix)
+    factors = _unnest(
+        "factors",
+        from_currency=(String, np.repeat(codes, len(codes))[known].tolist()),
+        to_currency=(String, np.tile(codes, len(codes))[known].tolist()),
+        factor=(Float, matrix[known].tolist())
+    )
+    # Null for holdings without a rate, whose summaries are left for a rebuild
+    # on read to report.
+    factor = case(
+        (User.base_currency.is_(None) | (Instrument.currency == User.base_currency), 1.0),
+        else_=factors.c.factor
+    )
+
+    # Without a close, a position is carried at its net invested capital.
+    old_value = case(
+        (Instrument.close.is_(None), Position.cost_basis - Position.realised_pnl),
+        else_=Position.quantity * Instrument.close
+    )
+    deltas = select(
+        Position.user_id,
+        func.sum((Position.quantity * new_closes.c.close - old_value) * factor).label("delta"),
+        func.bool_or(factor.is_(None)).label("missing")
+    ).join(
+        Instrument, Instrument.id == Position.instrument_id
+    ).join(
+        new_closes, new_closes.c.instrument_id == Position.instrument_id
+    ).join(
+        User, User.id == Position.user_id
+    ).outerjoin(
+        factors, (factors.c.from_currency == Instrument.currency) & (factors.c.to_currency == User.base_currency)
+    ).group_by(Position.user_id).subquery()
+    statement = update(Summary).where(
+        Summary.user_id == deltas.c.user_id,
+        Summary.beginning_market_value.is_not(None)
+    ).values(
+        beginning_market_value=case((deltas.c.missing, None), else_=Summary.beginning_market_value),
+        ending_market_value=case((deltas.c.missing, None), else_=Summary.ending_market_value + deltas.c.delta),
+        profit_loss=case((deltas.c.missing, None), else_=Summary.profit_loss + deltas.c.delta)
+    )
+    session.execute(statement)
 
 
 def update_instrument_prices(*, session: Session, instrument: Instrument, open: float, high: float, low: float, close: float) -> Instrument:
@@ -230,17 +641,148 @@ def update_instrument_prices(*, session: Session, instrument: Instrument, open:
     Returns:
         Instrument: Updated instrument.
     """
+    # Revalue holders' summaries against the new close.
+    _revalue_summaries(session=session, closes={instrument.id: close})
+
     # Update prices.
     instrument.open = open
     instrument.high = high
     instrument.low = low
     instrument.close = close
+    # Record as today's bar in price history.
+    _upsert_price_bars(session=session, rows=[{
+        "instrument_id": instrument.id,
+        "date": date.today(),
+        "open": open,
+        "high": high,
+        "low": low,
+        "close": close
+    }])
     # Commit to db.
     session.commit()
+    instrument_cache.invalidate({instrument.id})
+    price_hub.publish([{"instrument_id": instrument.id, "open": open, "high": high, "low": low, "close": close}])
     session.refresh(instrument)
     return instrument
 
 
+def update_instrument_prices_bulk(
+        *,
+        session: Session,
+        prices: list[InstrumentPriceUpdate],
+        dates: list[date]=None,
+        chunk_size: int=5000,
+        merge: bool=False
+    ) -> InstrumentPricesUpdated:
+    """
+    Update prices of many instruments, identified by id or symbol, in one transaction.
+
+    Each chunk resolves symbols to ids in one query, then applies the prices
+    with a single UPDATE joined to unnested price arrays, alongside the
+    summary revaluation and the day's price bars. Instruments take the bar
+    of their latest date.
+
+    Args:
+        session (Session): SQL session.
+        prices (list[InstrumentPriceUpdate]): Prices with an instrument id or symbol.
+        dates (list[date], optional): Bar date per price, today for all if None. Defaults to None.
+        chunk_size (int, optional): Instruments per statement. Defaults to 5000.
+        merge (bool, optional): Combine with existing bars as intraday updates,
+            keeping the open, widening the high and low and taking the close. Defaults to False.
+
+    Returns:
+        InstrumentPricesUpdated: Number of distinct instruments updated, and ids or
+            symbols that matched no instrument.
+    """
+    dates = dates or [date.today()] * len(prices)
+    missing = []
+    updates = {}
+    for start in range(0, len(prices), chunk_size):
+        chunk = prices[start:start + chunk_size]
+        chunk_dates = dates[start:start + chunk_size]
+
+        # Resolve identifiers to instrument ids.
+        ids = {price.id for price in chunk if price.id is not None}
+        symbols = {price.symbol for price in chunk if price.id is None}
+        statement = select(Instrument.id, Instrument.symbol).where(
+            or_(Instrument.id.in_(ids), Instrument.symbol.in_(symbols))
+        )
+        known_ids = set()
+        symbol_ids = {}
+        for instrument_id, symbol in session.exec(statement):
+            known_ids.add(instrument_id)
+            symbol_ids[symbol] = instrument_id
+
+        # Later prices for the same instrument and date win, as one statement can't touch a row twice.
+        bars = {}
+        for price, day in zip(chunk, chunk_dates):
+            instrument_id = price.id if price.id is not None else symbol_ids.get(price.symbol)
+            if instrument_id not in known_ids:
+                missing.append(str(price.id if price.id is not None else price.symbol))
+                continue
+            bars[(instrument_id, day)] = {
+                "instrument_id": instrument_id, "date": day, "open": price.open, "high": price.high, "low": price.low, "close": price.close
+            }
+        if not bars:
+            continue
+
+        # Record in price history, the instruments taking the stored bar of their latest date.
+        bars = _upsert_price_bars(session=session, merge=merge, rows=list(bars.values()))
+        rows = {}
+        for bar in sorted(bars, key=lambda bar: bar["date"]):
+            rows[bar["instrument_id"]] = (bar["instrument_id"], bar["open"], bar["high"], bar["low"], bar["close"])
+        updates.update(rows)
+
+        # Revalue summaries against the old closes before overwriting them.
+        _revalue_summaries(session=session, closes={row[0]: row[4] for row in rows.values()})
+
+        ids, opens, highs, lows, closes = zip(*rows.values())
+        new_prices = _unnest(
+            "new_prices",
+            id=(Integer, list(ids)),
+            open=(Float, list(opens)),
+            high=(Float, list(highs)),
+            low=(Float, list(lows)),
+            close=(Float, list(closes))
+        )
+        statement = update(Instrument).where(
+            Instrument.id == new_prices.c.id
+        ).values(
+            open=new_prices.c.open,
+            high=new_prices.c.high,
+            low=new_prices.c.low,
+            close=new_prices.c.close
+        ).execution_options(synchronize_session=False)
+        session.execute(statement)
+    session.commit()
+    instrument_cache.invalidate(set(updates))
+    price_hub.publish(
+        {"instrument_id": id, "open": open, "high": high, "low": low, "close": close}
+        for id, open, high, low, close in updates.values()
+    )
+    return InstrumentPricesUpdated(count=len(updates), missing=missing)
+
+
+def apply_quotes(*, session: Session, quotes: list[Quote]) -> list[str]:
+    """
+    Write a batch of market data quotes through to instrument prices,
+    combined with the bars of the days they were quoted on.
+
+    Args:
+        session (Session): SQL session.
+        quotes (list[Quote]): Latest quote per symbol and day, in time order.
+
+    Returns:
+        list[str]: Symbols that matched no instrument.
+    """
+    prices = [
+        InstrumentPriceUpdate(symbol=quote.symbol, open=quote.open, high=quote.high, low=quote.low, close=quote.close)
+        for quote in quotes
+    ]
+    dates = [quote.time.date() for quote in quotes]
+    return update_instrument_prices_bulk(session=session, prices=prices, dates=dates, merge=True).missing
+
+
 def update_instrument_currency(*, session: Session, instrument: Instrument, currency: str) -> Instrument:
     """
     Update currency of instrument.
@@ -254,7 +796,11 @@ def update_instrument_currency(*, session: Session, instrument: Instrument, curr
         Instrument: Updated instrument.
     """
     instrument.currency = currency
+    # Holders' values convert from the new currency.
+    _reset_summaries(session=session, user_ids=select(Order.user_id).where(Order.instrument_id == instrument.id))
+    _queue_risk_invalidation(session=session, instrument_ids={instrument.id})
     session.commit()
+    instrument_cache.invalidate({instrument.id})
     session.refresh(instrument)
     return instrument
 
@@ -267,166 +813,1688 @@ def delete_instrument(*, session: Session, instrument: Instrument):
         session (Session): SQL session.
         instrument (Instrument): Instrument to delete.
     """
-    # Delete instrument.
+    # Load prices a cached instrument left expired, as the deleted row can't be read after.
+    session.refresh(instrument)
+
+    # Delete instrument and its price history.
+    session.execute(delete(InstrumentPrice).where(InstrumentPrice.instrument_id == instrument.id))
     session.delete(instrument)
+    _queue_risk_invalidation(session=session, instrument_ids={instrument.id})
     session.commit()
+    instrument_cache.invalidate({instrument.id})
+    instrument_search_index.remove(instrument.id)
+    if price_store is not None:
+        price_store.delete(instrument.id)
 
 # - - - - - - - - - - - - - - - - - - -
-# ORDER OPERATIONS
+# INSTRUMENT PRICE OPERATIONS
 
-def create_order(*, session: Session, user_id: int, order_create: OrderCreate) -> Order:
+@event.listens_for(Session, "after_commit")
+def _write_price_store(session: Session):
+    # Bars reach the price store only once committed to the db.
+    rows = session.info.pop("price_store_rows", None)
+    if rows and price_store is not None:
+        price_store.write_bars(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_price_store(session: Session):
+    session.info.pop("price_store_rows", None)
+
+
+def _upsert_price_bars(*, session: Session, rows: list[dict], merge: bool=False) -> list[dict]:
     """
-    Creating a new order.
+    Insert or overwrite price bars with one statement, without committing.
 
     Args:
         session (Session): SQL session.
-        user_id (int): User id.
-        order_create (OrderCreate): Order details.
+        rows (list[dict]): Bars with instrument_id, date, open, high, low and close.
+        merge (bool, optional): Combine with existing bars as intraday updates,
+            keeping the open, widening the high and low and taking the close. Defaults to False.
 
     Returns:
-        Order: New order.
+        list[dict]: Bars as stored.
     """
-    db_obj = Order.model_validate(
-        order_create, 
-        update={"user_id":user_id}
-    )
-    session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
-    return db_obj
-
-
-def get_orders(
-        *, 
-        session: Session,
-        user_id: int, 
-        instrument_id: int=None, 
-        start_date: datetime=None, 
-        end_date: datetime=None, 
-        type: str=None
-    ) -> OrdersPublic:
+    if not rows:
+        return []
+    types = {"instrument_id": Integer, "date": Date, "open": Float, "high": Float, "low": Float, "close": Float}
+    bars = _unnest("bars", **{key: (type_, [row[key] for row in rows]) for key, type_ in types.items()})
+    statement = pg_insert(InstrumentPrice).from_select(list(types), select(*[bars.c[key] for key in types]))
+    if merge:
+        statement = statement.on_conflict_do_update(
+            index_elements=["instrument_id", "date"],
+            set_={
+                "open": func.coalesce(InstrumentPrice.open, statement.excluded.open),
+                "high": func.greatest(InstrumentPrice.high, statement.excluded.high),
+                "low": func.least(InstrumentPrice.low, statement.excluded.low),
+                "close": statement.excluded.close
+            }
+        ).returning(*[InstrumentPrice.__table__.c[key] for key in types])
+        rows = [dict(row._mapping) for row in session.execute(statement)]
+    else:
+        statement = statement.on_conflict_do_update(
+            index_elements=["instrument_id", "date"],
+            set_={key: statement.excluded[key] for key in ["open", "high", "low", "close"]}
+        )
+        session.execute(statement)
+    _queue_risk_invalidation(session=session, instrument_ids={row["instrument_id"] for row in rows})
+    if price_store is not None:
+        session.info.setdefault("price_store_rows", []).extend(
+            (row["instrument_id"], row["date"], row["open"], row["high"], row["low"], row["close"])
+            for row in rows
+        )
+    return rows
+
+
+def upsert_instrument_prices(*, session: Session, prices: Iterable[InstrumentPriceCreate], chunk_size: int=5000) -> int:
     """
-    Get orders with various filters.
+    Bulk load price bars in chunked multi-row upserts within one transaction.
 
     Args:
         session (Session): SQL session.
-        user_id (int): User id.
-        instrument_id (int, optional): Instrument id. Defaults to None.
-        start_date (datetime, optional): Start date.. Defaults to None.
-        end_date (datetime, optional): End date. Defaults to None.
-        type (str, optional): Type. Defaults to None.
+        prices (Iterable[InstrumentPriceCreate]): Bars to load, may be a generator.
+        chunk_size (int, optional): Bars per statement. Defaults to 5000.
 
     Returns:
-        OrdersPublic: Returned orders
+        int: Number of bars loaded.
     """
-    # Basic statement.
-    statement = select(Order).where(Order.user_id == user_id)
-
-    if instrument_id:
-        statement = statement.where(Order.instrument_id == instrument_id)
-    if start_date:
-        statement = statement.where(Order.date >= start_date)
-    if end_date:
-        statement = statement.where(Order.date <= end_date)
-    if type:
-        statement = statement.where(Order.type == type)
-
-    results = session.exec(statement).all()
-    return OrdersPublic(data=results,count=len(results))
+    count = 0
+    chunk = {}
+    for price in prices:
+        # Later bars for the same key win, as one statement can't touch a row twice.
+        chunk[(price.instrument_id, price.date)] = price.model_dump()
+        if len(chunk) >= chunk_size:
+            _upsert_price_bars(session=session, rows=list(chunk.values()))
+            count += len(chunk)
+            chunk = {}
+    _upsert_price_bars(session=session, rows=list(chunk.values()))
+    count += len(chunk)
+    session.commit()
+    return count
 
 
-def get_order_by_id(*, session: Session, order_id: int) -> Order:
+def store_daily_bars(*, session: Session, bars: Bars) -> int:
     """
-    Get order by id.
+    Write resampled daily bars to price history, and today's bars to instrument prices.
 
     Args:
         session (Session): SQL session.
-        order_id (int): Order id.
+        bars (Bars): Daily bars.
 
     Returns:
-        Order: Order.
+        int: Number of bars stored.
     """
-    statement = select(Order).where(Order.id == order_id)
-    db_obj = session.exec(statement).first()
-    return db_obj
-
-
-def update_order(*, session: Session, order: Order, order_update: OrderUpdate) -> Order:
+    dates = bars.start.astype("datetime64[D]").astype(object)
+    rows = list(zip(bars.instrument_id.tolist(), dates, bars.open.tolist(), bars.high.tolist(), bars.low.tolist(), bars.close.tolist()))
+    count = upsert_instrument_prices(session=session, prices=(
+        InstrumentPriceCreate(instrument_id=id, date=day, open=open, high=high, low=low, close=close)
+        for id, day, open, high, low, close in rows
+    ))
+
+    # Bars for today are also the instruments' current prices.
+    today = date.today()
+    prices = [
+        InstrumentPriceUpdate(id=id, open=open, high=high, low=low, close=close)
+        for id, day, open, high, low, close in rows
+        if day == today
+    ]
+    if prices:
+        update_instrument_prices_bulk(session=session, prices=prices)
+    return count
+
+
+def get_instrument_prices(*, session: Session, instrument_id: int, start_date: date=None, end_date: date=None) -> InstrumentPricesPublic:
     """
-    Update order.
+    Get price bars of an instrument over a date range.
 
     Args:
         session (Session): SQL session.
-        order (Order): Order to update.
-        order_update (OrderUpdate): New details.
+        instrument_id (int): Instrument id.
+        start_date (date, optional): First date. Defaults to None.
+        end_date (date, optional): Last date. Defaults to None.
 
     Returns:
-        Order: Updated order.
+        InstrumentPricesPublic: Bars in date order.
     """
-    update_dict = order_update.model_dump(exclude_unset=True)
-    for key, value in update_dict.items():
-        if hasattr(order, key):
-            setattr(order, key, value)
-    session.commit()
-    session.refresh(order)
-    return order
+    statement = select(
+        InstrumentPrice.date, InstrumentPrice.open, InstrumentPrice.high, InstrumentPrice.low, InstrumentPrice.close
+    ).where(InstrumentPrice.instrument_id == instrument_id)
+    if start_date:
+        statement = statement.where(InstrumentPrice.date >= start_date)
+    if end_date:
+        statement = statement.where(InstrumentPrice.date <= end_date)
+    statement = statement.order_by(InstrumentPrice.date)
 
+    bars = [InstrumentPriceBase(**row._mapping) for row in session.exec(statement)]
+    return InstrumentPricesPublic(data=bars, count=len(bars))
 
-def delete_order(*, session: Session, order: Order) -> None:
+
+def rebuild_price_store(*, session: Session, store: PriceStore, chunk_size: int=100000) -> int:
     """
-    Delete order.
+    Copy all price history from the db into a price store.
 
     Args:
         session (Session): SQL session.
-        order (Order): Order to delete.
+        store (PriceStore): Price store to fill.
+        chunk_size (int, optional): Bars fetched per round trip. Defaults to 100000.
+
+    Returns:
+        int: Number of bars copied.
     """
-    session.delete(order)
-    session.commit()
+    statement = select(
+        InstrumentPrice.instrument_id, InstrumentPrice.date, InstrumentPrice.open,
+        InstrumentPrice.high, InstrumentPrice.low, InstrumentPrice.close
+    ).order_by(InstrumentPrice.instrument_id, InstrumentPrice.date).execution_options(yield_per=chunk_size)
+
+    count = 0
+    for instrument_id, rows in groupby(session.exec(statement), key=lambda row: row[0]):
+        rows = list(rows)
+        store.write(
+            instrument_id,
+            np.array([row[1] for row in rows], "datetime64[D]"),
+            np.array([row[2:] for row in rows], np.float64).T
+        )
+        count += len(rows)
+    return count
 
 # - - - - - - - - - - - - - - - - - - -
-# SUMMARY OPERATIONS
+# FX OPERATIONS
 
-def create_summary(*, session: Session, user: User) -> Summary:
+def _get_fx_rates(*, session: Session) -> FxRates:
     """
-    Create summary.
+    Get the cached FX rate history, loading it in one query if needed.
 
     Args:
         session (Session): SQL session.
-        user (User): User.
 
     Returns:
-        Summary: New summary.
+        FxRates: Loaded rates.
     """
-    db_obj = Summary(user=user)
-    session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
-    return db_obj
+    if not fx_rates.loaded:
+        version = fx_rates.version
+        statement = select(
+            FxRate.from_currency, FxRate.to_currency, FxRate.date, FxRate.rate
+        ).order_by(FxRate.from_currency, FxRate.to_currency, FxRate.date)
+        fx_rates.load(session.exec(statement).all(), version)
+    return fx_rates
 
 
-def get_summary_by_id(*, session: Session, summary_id: int) -> Summary:
+def _conversion_factors(*, session: Session, currencies: np.ndarray, base_currency: str | None) -> np.ndarray:
     """
-    Get summary by id.
+    Get the latest factors converting amounts into a base currency.
 
     Args:
         session (Session): SQL session.
-        summary_id (int): Summary id.
+        currencies (np.ndarray): Currency per amount.
+        base_currency (str | None): Currency to convert into, none if None.
 
     Returns:
-        Summary: Summary.
+        np.ndarray: Factor per amount, NaN without a rate.
     """
-    statement = select(Summary).where(Summary.id == summary_id)
-    db_obj = session.exec(statement).first()
-    return db_obj
+    if base_currency is None:
+        return np.ones(len(currencies))
+    codes = np.unique(np.append(np.asarray(currencies, dtype=str), base_currency))
+    matrix = _get_fx_rates(session=session).matrix(codes.tolist(), date.today())
+    return matrix[np.searchsorted(codes, currencies), np.searchsorted(codes, base_currency)]
 
 
-def get_summary_by_user_id(*, session: Session, user_id: int) -> Summary:
+def _conversion_matrices(*, session: Session, currencies: np.ndarray, start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray]:
     """
-    Get summary by user id.
+    Get daily conversion matrices between currencies over a date range.
 
     Args:
         session (Session): SQL session.
-        user_id (int): User id.
+        currencies (np.ndarray): Currencies to convert between, may repeat.
+        start_date (date): First date.
+        end_date (date): Last date.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Sorted unique currencies, and their
+            (currencies, currencies, days) conversion factors.
+    """
+    codes = np.unique(np.asarray(currencies, dtype=str))
+    return codes, _get_fx_rates(session=session).matrices(codes.tolist(), start_date, end_date)
+
+
+def _check_rates(*, rates: np.ndarray, currencies: np.ndarray, base_currency: str, start_date: date, first_days: np.ndarray=None) -> None:
+    """
+    Check amounts never need converting on a day without a rate.
+
+    Args:
+        rates (np.ndarray): (amounts, days) factors into the base currency, from the start date.
+        currencies (np.ndarray): Currency per amount.
+        base_currency (str): Currency converted into.
+        start_date (date): First date.
+        first_days (np.ndarray, optional): First day needed per amount, every day if None. Defaults to None.
+
+    Raises:
+        ValueError: Naming the first missing pair.
+    """
+    missing = np.isnan(rates)
+    if first_days is not None:
+        missing &= np.arange(rates.shape[1]) >= first_days[:, None]
+    if missing.any():
+        day, amount = np.argwhere(missing.T)[0].tolist()
+        raise ValueError(
+            f"No FX rate from {currencies[amount]} to {base_currency} on {start_date + timedelta(days=day)}."
+        )
+
+
+def get_currencies(*, session: Session) -> set[str]:
+    """
+    Get currencies with a recorded or fixed rate, or quoting an instrument.
+
+    Args:
+        session (Session): SQL session.
+
+    Returns:
+        set[str]: Currencies.
+    """
+    instrument_currencies = session.exec(select(Instrument.currency).distinct()).all()
+    return _get_fx_rates(session=session).currencies | set(instrument_currencies)
+
+
+def _reset_summaries(*, session: Session, user_ids=None) -> None:
+    """
+    Clear summaries for a full rebuild on their next read, without committing.
+
+    Args:
+        session (Session): SQL session.
+        user_ids (optional): User ids or a select of them, all users if None. Defaults to None.
+    """
+    statement = update(Summary).values(
+        beginning_market_value=None,
+        ending_market_value=None,
+        profit_loss=None
+    )
+    if user_ids is not None:
+        statement = statement.where(Summary.user_id.in_(user_ids))
+    session.execute(statement)
+
+
+def upsert_fx_rates(*, session: Session, rates: Iterable[FxRateCreate], chunk_size: int=5000) -> int:
+    """
+    Insert or overwrite FX rates in bulk.
+
+    Summaries are cleared, as every base currency value may have moved.
+
+    Args:
+        session (Session): SQL session.
+        rates (Iterable[FxRateCreate]): Rates to load.
+        chunk_size (int, optional): Rates per statement. Defaults to 5000.
+
+    Returns:
+        int: Number of rates loaded.
+    """
+    # Later rates for the same key win, as one statement can't touch a row twice.
+    rows = list({(rate.from_currency, rate.to_currency, rate.date): rate.model_dump() for rate in rates}.values())
+    for start in range(0, len(rows), chunk_size):
+        statement = pg_insert(FxRate).values(rows[start:start + chunk_size])
+        statement = statement.on_conflict_do_update(
+            index_elements=[FxRate.from_currency, FxRate.to_currency, FxRate.date],
+            set_={"rate": statement.excluded.rate}
+        )
+        session.execute(statement)
+    _reset_summaries(session=session)
+    session.commit()
+    fx_rates.invalidate()
+    risk_cache.invalidate()
+    return len(rows)
+
+
+def get_fx_rates(
+        *,
+        session: Session,
+        from_currency: str=None,
+        to_currency: str=None,
+        start_date: date=None,
+        end_date: date=None
+    ) -> FxRatesPublic:
+    """
+    Get recorded FX rates, ordered by pair and date.
+
+    Args:
+        session (Session): SQL session.
+        from_currency (str, optional): Currency converted from. Defaults to None.
+        to_currency (str, optional): Currency converted to. Defaults to None.
+        start_date (date, optional): First date. Defaults to None.
+        end_date (date, optional): Last date. Defaults to None.
+
+    Returns:
+        FxRatesPublic: Rates.
+    """
+    statement = select(FxRate).order_by(FxRate.from_currency, FxRate.to_currency, FxRate.date)
+    if from_currency is not None:
+        statement = statement.where(FxRate.from_currency == from_currency)
+    if to_currency is not None:
+        statement = statement.where(FxRate.to_currency == to_currency)
+    if start_date is not None:
+        statement = statement.where(FxRate.date >= start_date)
+    if end_date is not None:
+        statement = statement.where(FxRate.date <= end_date)
+    data = [FxRateBase.model_validate(rate) for rate in session.exec(statement).all()]
+    return FxRatesPublic(data=data, count=len(data))
+
+# - - - - - - - - - - - - - - - - - - -
+# ORDER OPERATIONS
+
+def _order_sign(type: str) -> int:
+    """
+    Get the sign of an order type.
+
+    Args:
+        type (str): Order type.
+
+    Returns:
+        int: 1 for buys, -1 for sells and 0 otherwise.
+    """
+    type = type.upper()
+    if type == BUY:
+        return 1
+    if type == SELL:
+        return -1
+    return 0
+
+
+def _order_sign_column():
+    """
+    Get the sign of Order.type as a SQL expression.
+
+    Returns:
+        SQL case expression, 1 for buys, -1 for sells and 0 otherwise.
+    """
+    order_type = func.upper(Order.type)
+    return case((order_type == BUY, 1), (order_type == SELL, -1), else_=0)
+
+
+def _get_closes(*, session: Session, ids: set[int]) -> dict[int, tuple[float | None, str]]:
+    """
+    Get latest closes and currencies of instruments in a single query.
+
+    Args:
+        session (Session): SQL session.
+        ids (set[int]): Instrument ids.
+
+    Returns:
+        dict[int, tuple[float | None, str]]: Close and currency per instrument id.
+    """
+    if not ids:
+        return {}
+    statement = select(Instrument.id, Instrument.close, Instrument.currency).where(Instrument.id.in_(ids))
+    return {id: (close, currency) for id, close, currency in session.exec(statement).all()}
+
+
+def _apply_order_deltas(*, session: Session, user_id: int, orders: list[tuple[str, float, float, int]], direction: int=1) -> None:
+    """
+    Add or remove the contribution of orders to the user's summary, without committing.
+
+    Contributions match compute_summary: net capital invested and the orders
+    marked at the latest close (or their own price without one), converted
+    into the user's base currency at the latest rates. Summaries that were
+    never computed, or need a missing rate, are left for a full rebuild on
+    first read.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        orders (list[tuple[str, float, float, int]]): Type, volume, price and instrument id per order.
+        direction (int, optional): 1 to add orders, -1 to remove them. Defaults to 1.
+    """
+    if not orders:
+        return
+    _queue_risk_invalidation(session=session, user_ids={user_id})
+    closes = _get_closes(session=session, ids={instrument_id for *_, instrument_id in orders})
+    currencies = sorted({currency for _, currency in closes.values()})
+    factors = _conversion_factors(
+        session=session, currencies=currencies, base_currency=session.get(User, user_id).base_currency
+    )
+    if np.isnan(factors).any():
+        # Left for a rebuild on read to report the missing rate.
+        _reset_summaries(session=session, user_ids=[user_id])
+        return
+    factors = dict(zip(currencies, factors.tolist()))
+    invested = 0.0
+    market_value = 0.0
+    for type, volume, price, instrument_id in orders:
+        close, currency = closes.get(instrument_id, (None, None))
+        signed_volume = direction * _order_sign(type) * volume * factors.get(currency, 1.0)
+        invested += signed_volume * price
+        market_value += signed_volume * (price if close is None else close)
+
+    statement = update(Summary).where(
+        Summary.user_id == user_id,
+        Summary.beginning_market_value.is_not(None)
+    ).values(
+        beginning_market_value=func.coalesce(Summary.beginning_market_value, 0) + invested,
+        ending_market_value=func.coalesce(Summary.ending_market_value, 0) + market_value,
+        profit_loss=func.coalesce(Summary.profit_loss, 0) + market_value - invested
+    )
+    session.execute(statement)
+
+
+def _filter_orders(
+        statement,
+        *,
+        user_id: int,
+        instrument_id: int=None,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        type: str=None
+    ):
+    """
+    Apply order filters to a statement.
+
+    Args:
+        statement: Select or delete statement on Order.
+        user_id (int): User id.
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (datetime, optional): Start date. Defaults to None.
+        end_date (datetime, optional): End date. Defaults to None.
+        type (str, optional): Type. Defaults to None.
+
+    Returns:
+        Filtered statement.
+    """
+    statement = statement.where(Order.user_id == user_id)
+    if instrument_id:
+        statement = statement.where(Order.instrument_id == instrument_id)
+    if start_date:
+        statement = statement.where(Order.date >= start_date)
+    if end_date:
+        statement = statement.where(Order.date <= end_date)
+    if type:
+        statement = statement.where(Order.type == type)
+    return statement
+
+
+def create_order(*, session: Session, user_id: int, order_create: OrderCreate) -> Order:
+    """
+    Creating a new order.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        order_create (OrderCreate): Order details.
+
+    Returns:
+        Order: New order.
+    """
+    db_obj = Order.model_validate(
+        order_create, 
+        update={"user_id":user_id}
+    )
+    session.add(db_obj)
+    _apply_order_deltas(session=session, user_id=user_id, orders=[(db_obj.type, db_obj.volume, db_obj.price, db_obj.instrument_id)])
+    _apply_position_orders(session=session, user_id=user_id, orders=[(db_obj.type, db_obj.volume, db_obj.price, db_obj.instrument_id, db_obj.date)])
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj
+
+
+def create_orders(*, session: Session, user_id: int, order_creates: list[OrderCreate]) -> list[Order]:
+    """
+    Create several orders with one multi-row INSERT ... RETURNING.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        order_creates (list[OrderCreate]): Order details.
+
+    Returns:
+        list[Order]: New orders.
+    """
+    if not order_creates:
+        return []
+    rows = [{**order_create.model_dump(), "user_id": user_id} for order_create in order_creates]
+    statement = insert(Order).values(rows).returning(*Order.__table__.columns)
+    # Build orders from returned rows so no refresh is needed after commit.
+    results = [Order(**row._mapping) for row in session.execute(statement)]
+    _apply_order_deltas(session=session, user_id=user_id, orders=[(row["type"], row["volume"], row["price"], row["instrument_id"]) for row in rows])
+    _apply_position_orders(session=session, user_id=user_id, orders=[(row["type"], row["volume"], row["price"], row["instrument_id"], row["date"]) for row in rows])
+    session.commit()
+    return results
+
+
+def insert_orders(*, session: Session, user_id: int, order_creates: list[OrderCreate]) -> int:
+    """
+    Insert a batch of orders with a single executemany, without committing.
+
+    Leaving the commit to the caller lets several batches share one transaction.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        order_creates (list[OrderCreate]): Validated order details.
+
+    Returns:
+        int: Number of orders inserted.
+    """
+    if not order_creates:
+        return 0
+    rows = [{**order_create.model_dump(), "user_id": user_id} for order_create in order_creates]
+    session.execute(insert(Order), rows)
+    _apply_order_deltas(session=session, user_id=user_id, orders=[(row["type"], row["volume"], row["price"], row["instrument_id"]) for row in rows])
+    _apply_position_orders(session=session, user_id=user_id, orders=[(row["type"], row["volume"], row["price"], row["instrument_id"], row["date"]) for row in rows])
+    return len(rows)
+
+
+def get_orders(
+        *, 
+        session: Session,
+        user_id: int, 
+        instrument_id: int=None, 
+        start_date: datetime=None, 
+        end_date: datetime=None, 
+        type: str=None,
+        after: str=None,
+        limit: int=None
+    ) -> OrdersPublic:
+    """
+    Get orders with various filters, ordered by date and id.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (datetime, optional): Start date.. Defaults to None.
+        end_date (datetime, optional): End date. Defaults to None.
+        type (str, optional): Type. Defaults to None.
+        after (str, optional): Cursor returned by a previous page. Defaults to None.
+        limit (int, optional): Maximum orders to return. Defaults to None.
+
+    Raises:
+        ValueError: Cursor is malformed.
+
+    Returns:
+        OrdersPublic: Returned orders
+    """
+    # Basic statement.
+    statement = _filter_orders(
+        select(Order),
+        user_id=user_id,
+        instrument_id=instrument_id,
+        start_date=start_date,
+        end_date=end_date,
+        type=type
+    )
+
+    # Seek past the last order of the previous page.
+    if after:
+        try:
+            after_date, after_id = _decode_cursor(after)
+            after_date = datetime.fromisoformat(after_date)
+            after_id = int(after_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor.") from e
+        statement = statement.where(tuple_(Order.date, Order.id) > tuple_(after_date, after_id))
+
+    statement = statement.order_by(Order.date, Order.id)
+    if limit:
+        # Fetch one extra row to know whether another page exists.
+        statement = statement.limit(limit + 1)
+
+    results = session.exec(statement).all()
+
+    next_cursor = None
+    if limit and len(results) > limit:
+        results = results[:limit]
+        next_cursor = _encode_cursor(results[-1].date.isoformat(), results[-1].id)
+    return OrdersPublic(data=results,count=len(results),next_cursor=next_cursor)
+
+
+def stream_orders(
+        *,
+        session: Session,
+        user_id: int,
+        instrument_id: int=None,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        type: str=None,
+        batch_size: int=1000
+    ) -> Iterator[list]:
+    """
+    Stream orders in batches from a server-side cursor, ordered by date and id.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (datetime, optional): Start date. Defaults to None.
+        end_date (datetime, optional): End date. Defaults to None.
+        type (str, optional): Type. Defaults to None.
+        batch_size (int, optional): Rows fetched per batch. Defaults to 1000.
+
+    Yields:
+        list: Batch of (id, date, volume, price, type, instrument_id) rows.
+    """
+    statement = _filter_orders(
+        select(Order.id, Order.date, Order.volume, Order.price, Order.type, Order.instrument_id),
+        user_id=user_id,
+        instrument_id=instrument_id,
+        start_date=start_date,
+        end_date=end_date,
+        type=type
+    ).order_by(Order.date, Order.id).execution_options(yield_per=batch_size)
+    yield from session.exec(statement).partitions()
+
+
+def get_order_arrays(*, session: Session, user_id: int) -> dict[str, np.ndarray]:
+    """
+    Get a user's orders as column arrays, ordered by date and id.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        dict[str, np.ndarray]: Arrays of id, date, instrument_id, sign (1 buy,
+            -1 sell, 0 other), volume, price, instrument close and instrument currency.
+    """
+    statement = select(
+        Order.id,
+        Order.date,
+        Order.instrument_id,
+        _order_sign_column(),
+        Order.volume,
+        Order.price,
+        Instrument.close,
+        Instrument.currency
+    ).join(
+        Instrument, Instrument.id == Order.instrument_id
+    ).where(
+        Order.user_id == user_id
+    ).order_by(Order.date, Order.id)
+    columns = list(zip(*session.exec(statement).all())) or [()] * 8
+
+    return {
+        "id": np.array(columns[0], dtype=np.int64),
+        "date": np.array(columns[1], dtype="datetime64[us]"),
+        "instrument_id": np.array(columns[2], dtype=np.int64),
+        "sign": np.array(columns[3], dtype=np.float64),
+        "volume": np.array(columns[4], dtype=np.float64),
+        "price": np.array(columns[5], dtype=np.float64),
+        "close": np.array(columns[6], dtype=np.float64),
+        "currency": np.array(columns[7], dtype=str),
+    }
+
+
+def get_order_by_id(*, session: Session, order_id: int) -> Order:
+    """
+    Get order by id.
+
+    Args:
+        session (Session): SQL session.
+        order_id (int): Order id.
+
+    Returns:
+        Order: Order.
+    """
+    statement = select(Order).where(Order.id == order_id)
+    db_obj = session.exec(statement).first()
+    return db_obj
+
+
+def update_order(*, session: Session, order: Order, order_update: OrderUpdate) -> Order:
+    """
+    Update order.
+
+    Args:
+        session (Session): SQL session.
+        order (Order): Order to update.
+        order_update (OrderUpdate): New details.
+
+    Returns:
+        Order: Updated order.
+    """
+    # Swap the old contribution for the new one.
+    old_key = (order.user_id, order.instrument_id)
+    old_checkpoint = (order.user_id, order.date)
+    _apply_order_deltas(session=session, user_id=order.user_id, orders=[(order.type, order.volume, order.price, order.instrument_id)], direction=-1)
+    update_dict = order_update.model_dump(exclude_unset=True)
+    for key, value in update_dict.items():
+        if hasattr(order, key):
+            setattr(order, key, value)
+    _apply_order_deltas(session=session, user_id=order.user_id, orders=[(order.type, order.volume, order.price, order.instrument_id)])
+
+    # Replay affected positions.
+    for user_id, instrument_id in {old_key, (order.user_id, order.instrument_id)}:
+        _rebuild_positions(session=session, user_id=user_id, instrument_ids={instrument_id})
+    for user_id, since in sorted({old_checkpoint, (order.user_id, order.date)}):
+        _invalidate_checkpoints(session=session, user_id=user_id, since=since)
+    session.commit()
+    session.refresh(order)
+    return order
+
+
+def delete_order(*, session: Session, order: Order) -> None:
+    """
+    Delete order.
+
+    Args:
+        session (Session): SQL session.
+        order (Order): Order to delete.
+    """
+    _apply_order_deltas(session=session, user_id=order.user_id, orders=[(order.type, order.volume, order.price, order.instrument_id)], direction=-1)
+    session.delete(order)
+    _rebuild_positions(session=session, user_id=order.user_id, instrument_ids={order.instrument_id})
+    _invalidate_checkpoints(session=session, user_id=order.user_id, since=order.date)
+    session.commit()
+
+
+def delete_orders_bulk(
+        *,
+        session: Session,
+        user_id: int,
+        instrument_id: int=None,
+        start_date: datetime=None,
+        end_date: datetime=None,
+        type: str=None
+    ) -> OrdersPublic:
+    """
+    Delete all orders matching filters in a single statement.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        instrument_id (int, optional): Instrument id. Defaults to None.
+        start_date (datetime, optional): Start date. Defaults to None.
+        end_date (datetime, optional): End date. Defaults to None.
+        type (str, optional): Type. Defaults to None.
+
+    Returns:
+        OrdersPublic: Deleted orders.
+    """
+    statement = _filter_orders(
+        delete(Order),
+        user_id=user_id,
+        instrument_id=instrument_id,
+        start_date=start_date,
+        end_date=end_date,
+        type=type
+    ).returning(*Order.__table__.columns)
+    # Build detached orders from returned rows, as the originals are now gone.
+    results = [Order(**row._mapping) for row in session.execute(statement)]
+    _apply_order_deltas(session=session, user_id=user_id, orders=[(order.type, order.volume, order.price, order.instrument_id) for order in results], direction=-1)
+    _rebuild_positions(session=session, user_id=user_id, instrument_ids={order.instrument_id for order in results})
+    if results:
+        _invalidate_checkpoints(session=session, user_id=user_id, since=min(order.date for order in results))
+    session.commit()
+    return OrdersPublic(data=results,count=len(results))
+
+# - - - - - - - - - - - - - - - - - - -
+# POSITION OPERATIONS
+
+def _upsert_positions(*, session: Session, user_id: int, states: dict[int, tuple[PositionState, datetime]]) -> None:
+    """
+    Insert or overwrite positions, without committing.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        states (dict[int, tuple[PositionState, datetime]]): Position and last order date per instrument id.
+    """
+    if not states:
+        return
+    rows = [
+        {"user_id": user_id, "instrument_id": instrument_id, "last_order_date": last_order_date, **state._asdict()}
+        for instrument_id, (state, last_order_date) in states.items()
+    ]
+    statement = pg_insert(Position).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "instrument_id"],
+        set_={key: statement.excluded[key] for key in [*PositionState._fields, "last_order_date"]}
+    )
+    session.execute(statement)
+
+
+def _rebuild_positions(*, session: Session, user_id: int, instrument_ids: set[int] | None=None) -> None:
+    """
+    Replay a user's orders into positions, without committing.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        instrument_ids (set[int] | None, optional): Instruments to rebuild, all if None. Defaults to None.
+    """
+    statement = select(
+        Order.instrument_id, _order_sign_column(), Order.volume, Order.price, Order.date
+    ).where(Order.user_id == user_id)
+    stale = delete(Position).where(Position.user_id == user_id)
+    if instrument_ids is not None:
+        if not instrument_ids:
+            return
+        statement = statement.where(Order.instrument_id.in_(instrument_ids))
+        stale = stale.where(Position.instrument_id.in_(instrument_ids))
+
+    # Replay orders in date order per instrument.
+    states = {}
+    for instrument_id, sign, volume, price, order_date in session.exec(statement.order_by(Order.instrument_id, Order.date, Order.id)):
+        state, _ = states.get(instrument_id, (PositionState(), None))
+        states[instrument_id] = (apply_order(state, sign * volume, price), order_date)
+
+    # Remove positions without orders left.
+    if states:
+        stale = stale.where(Position.instrument_id.not_in(states))
+    session.execute(stale)
+    _upsert_positions(session=session, user_id=user_id, states=states)
+
+
+def _apply_position_orders(*, session: Session, user_id: int, orders: list[tuple[str, float, float, int, datetime]]) -> None:
+    """
+    Apply new orders to a user's positions, without committing.
+
+    Orders dated on or after a position's last order are applied directly,
+    otherwise the position is replayed from its orders.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        orders (list[tuple[str, float, float, int, datetime]]): Type, volume, price, instrument id and date per order.
+    """
+    if not orders:
+        return
+    _invalidate_checkpoints(session=session, user_id=user_id, since=min(order[4] for order in orders))
+    statement = select(
+        Position.instrument_id,
+        Position.quantity,
+        Position.cost_basis,
+        Position.realised_pnl,
+        Position.gross_invested,
+        Position.last_order_date
+    ).where(
+        Position.user_id == user_id,
+        Position.instrument_id.in_({order[3] for order in orders})
+    ).with_for_update()
+    states = {row[0]: (PositionState(*row[1:5]), row[5]) for row in session.exec(statement)}
+
+    rebuild = set()
+    for type, volume, price, instrument_id, order_date in sorted(orders, key=lambda order: order[4]):
+        if instrument_id in rebuild:
+            continue
+        state, last_order_date = states.get(instrument_id, (PositionState(), None))
+        if last_order_date and order_date < last_order_date:
+            rebuild.add(instrument_id)
+            continue
+        states[instrument_id] = (apply_order(state, _order_sign(type) * volume, price), order_date)
+
+    _upsert_positions(session=session, user_id=user_id, states={key: value for key, value in states.items() if key not in rebuild})
+    _rebuild_positions(session=session, user_id=user_id, instrument_ids=rebuild)
+
+
+def rebuild_positions(*, session: Session, user_id: int) -> PositionsPublic:
+    """
+    Rebuild all of a user's positions from their orders.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        PositionsPublic: Open positions.
+    """
+    _rebuild_positions(session=session, user_id=user_id)
+    _invalidate_checkpoints(session=session, user_id=user_id, since=datetime.min)
+    session.commit()
+    return get_positions(session=session, user_id=user_id)
+
+
+def get_positions(*, session: Session, user_id: int) -> PositionsPublic:
+    """
+    Get open positions from the maintained positions table.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        PositionsPublic: Open positions.
+    """
+    statement = select(
+        Position, Instrument.close
+    ).join(
+        Instrument, Instrument.id == Position.instrument_id
+    ).where(
+        Position.user_id == user_id,
+        Position.quantity != 0
+    ).order_by(Position.instrument_id)
+
+    positions = []
+    for position, close in session.exec(statement):
+        positions.append(PositionPublic(
+            instrument_id=position.instrument_id,
+            volume=position.quantity,
+            average_cost=position.cost_basis / position.quantity,
+            cost_basis=position.cost_basis,
+            realised_pnl=position.realised_pnl,
+            gross_invested=position.gross_invested,
+            close=close,
+            market_value=position.quantity * close if close is not None else None
+        ))
+    return PositionsPublic(data=positions, count=len(positions))
+
+def get_realised_pnl(*, session: Session, user_id: int, method: str) -> RealisedPnlPublic:
+    """
+    Get realised profit and loss by matching sells against buy lots.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        method (str): Lot matching method.
+
+    Raises:
+        ValueError: Unsupported method.
+
+    Returns:
+        RealisedPnlPublic: Matched lots and total.
+    """
+    arrays = get_order_arrays(session=session, user_id=user_id)
+    orders = zip(*(arrays[key].tolist() for key in ["id", "date", "instrument_id", "sign", "volume", "price"]))
+    matches = match_lots(orders, method)
+    return RealisedPnlPublic(
+        method=method,
+        total=sum(match.pnl for match in matches),
+        data=[LotMatchPublic(**match._asdict()) for match in matches],
+        count=len(matches)
+    )
+
+def get_cgt_report(*, session: Session, user_id: int, tax_year: int=None) -> CgtReportPublic:
+    """
+    Get capital gains report using same-day, 30-day and Section 104 matching.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        tax_year (int, optional): Calendar year the tax year starts in, all disposals if None. Defaults to None.
+
+    Returns:
+        CgtReportPublic: Disposals and totals in GBP.
+
+    Raises:
+        ValueError: If an order's currency has no rate into GBP on its date.
+    """
+    arrays = get_order_arrays(session=session, user_id=user_id)
+
+    # Prices in pounds at the rate of each order's date, so acquisitions and
+    # disposals are each converted on the day they happened.
+    prices = arrays["price"]
+    if len(prices):
+        order_days = arrays["date"].astype("datetime64[D]")
+        start_date = order_days.min().item()
+        codes, matrices = _conversion_matrices(
+            session=session, currencies=np.append(arrays["currency"], "GBP"), start_date=start_date, end_date=order_days.max().item()
+        )
+        rates = matrices[
+            np.searchsorted(codes, arrays["currency"]),
+            np.searchsorted(codes, "GBP"),
+            (order_days - np.datetime64(start_date, "D")).astype(np.int64)
+        ]
+        missing = np.flatnonzero(np.isnan(rates))
+        if len(missing):
+            raise ValueError(f"No FX rate from {arrays['currency'][missing[0]]} to GBP on {order_days[missing[0]]}.")
+        prices = prices * rates
+
+    orders = zip(*(arrays[key].tolist() for key in ["date", "instrument_id", "sign", "volume"]), prices.tolist())
+    disposals = match_disposals(orders)
+    if tax_year is not None:
+        start, end = tax_year_bounds(tax_year)
+        disposals = [disposal for disposal in disposals if start <= disposal.date <= end]
+
+    gains = [disposal.gain for disposal in disposals]
+    return CgtReportPublic(
+        tax_year=tax_year,
+        total_proceeds=sum(disposal.proceeds for disposal in disposals),
+        total_cost=sum(disposal.cost for disposal in disposals),
+        total_gains=sum(gain for gain in gains if gain > 0),
+        total_losses=-sum(gain for gain in gains if gain < 0),
+        net_gain=sum(gains),
+        data=[DisposalPublic(**disposal._asdict()) for disposal in disposals],
+        count=len(disposals)
+    )
+
+# - - - - - - - - - - - - - - - - - - -
+# HOLDINGS OPERATIONS
+
+# Advisory lock namespace, serialising writes to a user's checkpoints.
+CHECKPOINT_LOCK = 1021
+
+
+def _lock_checkpoints(*, session: Session, user_id: int) -> None:
+    """
+    Lock a user's checkpoints until the transaction ends.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+    """
+    session.execute(select(func.pg_advisory_xact_lock(CHECKPOINT_LOCK, user_id)))
+
+
+def _invalidate_checkpoints(*, session: Session, user_id: int, since: datetime) -> None:
+    """
+    Delete checkpoints affected by orders from a date, without committing.
+
+    Checkpoints cover orders before their date, so only later ones are stale.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        since (datetime): Earliest changed order date.
+    """
+    _lock_checkpoints(session=session, user_id=user_id)
+    session.execute(delete(PositionCheckpoint).where(
+        PositionCheckpoint.user_id == user_id,
+        PositionCheckpoint.date > since
+    ))
+
+
+def _replay_holdings(
+        *,
+        session: Session,
+        user_id: int,
+        before: datetime
+    ) -> tuple[dict[int, PositionState], dict[datetime, dict[int, PositionState]]]:
+    """
+    Replay a user's orders before a date from the nearest checkpoint.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        before (datetime): Exclusive end date.
+
+    Returns:
+        tuple[dict[int, PositionState], dict[datetime, dict[int, PositionState]]]: Positions
+            per instrument id, and missing checkpoints crossed during the replay.
+    """
+    statement = select(func.max(PositionCheckpoint.date)).where(
+        PositionCheckpoint.user_id == user_id,
+        PositionCheckpoint.date <= before
+    )
+    checkpoint_date = session.exec(statement).one()
+
+    states = {}
+    orders = select(
+        Order.instrument_id, _order_sign_column(), Order.volume, Order.price, Order.date
+    ).where(Order.user_id == user_id, Order.date < before)
+    if checkpoint_date is not None:
+        statement = select(
+            PositionCheckpoint.instrument_id,
+            PositionCheckpoint.quantity,
+            PositionCheckpoint.cost_basis,
+            PositionCheckpoint.realised_pnl,
+            PositionCheckpoint.gross_invested
+        ).where(PositionCheckpoint.user_id == user_id, PositionCheckpoint.date == checkpoint_date)
+        states = {row[0]: PositionState(*row[1:]) for row in session.exec(statement)}
+        orders = orders.where(Order.date >= checkpoint_date)
+
+    # Checkpoint the start of each month following orders.
+    checkpoints = {}
+    boundary = None
+    for instrument_id, sign, volume, price, order_date in session.exec(orders.order_by(Order.date, Order.id)):
+        if boundary is not None and order_date >= boundary:
+            checkpoints[boundary] = dict(states)
+        boundary = next_month_start(order_date)
+        states[instrument_id] = apply_order(states.get(instrument_id, PositionState()), sign * volume, price)
+    if boundary is not None and boundary <= before:
+        checkpoints[boundary] = dict(states)
+    return states, checkpoints
+
+
+def get_holdings(*, session: Session, user_id: int, as_of: date) -> PositionsPublic:
+    """
+    Get a user's holdings at the end of a date.
+
+    Positions are read from the nearest monthly checkpoint and the orders
+    after it, so a lookup costs an index seek plus at most a month of orders.
+    Checkpoints the replay crosses are stored for later lookups.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        as_of (date): Date to value holdings at.
+
+    Returns:
+        PositionsPublic: Open positions, marked at the latest close on or before the date.
+    """
+    before = datetime.combine(as_of + timedelta(days=1), time())
+    states, checkpoints = _replay_holdings(session=session, user_id=user_id, before=before)
+    if checkpoints:
+        # Replay again under the lock, so a concurrent back-dated order can't leave stale checkpoints.
+        _lock_checkpoints(session=session, user_id=user_id)
+        states, checkpoints = _replay_holdings(session=session, user_id=user_id, before=before)
+        rows = [
+            {"user_id": user_id, "instrument_id": instrument_id, "date": checkpoint_date, **state._asdict()}
+            for checkpoint_date, checkpoint in checkpoints.items()
+            for instrument_id, state in checkpoint.items()
+        ]
+        if rows:
+            session.execute(pg_insert(PositionCheckpoint).values(rows).on_conflict_do_nothing())
+        session.commit()
+
+    # Latest close on or before the date, one index seek per instrument.
+    open_states = {instrument_id: state for instrument_id, state in states.items() if state.quantity != 0}
+    closes = {}
+    if open_states:
+        ids = _unnest("ids", id=(Integer, list(open_states)))
+        close = select(InstrumentPrice.close).where(
+            InstrumentPrice.instrument_id == ids.c.id,
+            InstrumentPrice.date <= as_of
+        ).order_by(InstrumentPrice.date.desc()).limit(1).scalar_subquery()
+        closes = dict(session.exec(select(ids.c.id, close)).all())
+
+    positions = []
+    for instrument_id in sorted(open_states):
+        state = open_states[instrument_id]
+        close = closes.get(instrument_id)
+        positions.append(PositionPublic(
+            instrument_id=instrument_id,
+            volume=state.quantity,
+            average_cost=state.cost_basis / state.quantity,
+            cost_basis=state.cost_basis,
+            realised_pnl=state.realised_pnl,
+            gross_invested=state.gross_invested,
+            close=close,
+            market_value=state.quantity * close if close is not None else None
+        ))
+    return PositionsPublic(data=positions, count=len(positions))
+
+# - - - - - - - - - - - - - - - - - - -
+# VALUATION OPERATIONS
+
+def _get_close_arrays(*, session: Session, instrument_ids: np.ndarray, start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get closes of instruments over a date range, with the latest close before it.
+
+    Reads from the price store where one is configured, falling back to the
+    db for instruments without a store file.
+
+    Args:
+        session (Session): SQL session.
+        instrument_ids (np.ndarray): Sorted instrument ids.
+        start_date (date): First date.
+        end_date (date): Last date.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Instrument index, date and
+            close per bar, in date order per instrument.
+    """
+    if price_store is None:
+        return _get_db_close_arrays(session=session, instrument_ids=instrument_ids, start_date=start_date, end_date=end_date)
+
+    stored = np.array([price_store.has(id) for id in instrument_ids.tolist()], dtype=bool)
+    indexes, dates, closes = [], [], []
+    series_by_id = price_store.read_many(instrument_ids[stored].tolist(), end_date=end_date)
+    for index, series in zip(np.flatnonzero(stored).tolist(), series_by_id.values()):
+        # Start from the latest bar on or before the first date.
+        first = max(np.searchsorted(series.dates, np.datetime64(start_date, "D"), side="right") - 1, 0)
+        dates.append(series.dates[first:])
+        closes.append(series.close[first:])
+        indexes.append(np.full(len(dates[-1]), index))
+    if not stored.all():
+        db_indexes, db_dates, db_closes = _get_db_close_arrays(
+            session=session, instrument_ids=instrument_ids[~stored], start_date=start_date, end_date=end_date
+        )
+        indexes.append(np.flatnonzero(~stored)[db_indexes])
+        dates.append(db_dates)
+        closes.append(db_closes)
+    if not dates:
+        return np.empty(0, np.int64), np.empty(0, "datetime64[D]"), np.empty(0)
+    indexes = np.concatenate(indexes)
+    order = np.argsort(indexes, kind="stable")
+    return indexes[order], np.concatenate(dates)[order], np.concatenate(closes)[order]
+
+
+def _get_db_close_arrays(*, session: Session, instrument_ids: np.ndarray, start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get closes of instruments over a date range from the db, with the latest close before it.
+
+    Args:
+        session (Session): SQL session.
+        instrument_ids (np.ndarray): Sorted instrument ids.
+        start_date (date): First date.
+        end_date (date): Last date.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Instrument index, date and
+            close per bar, in date order per instrument.
+    """
+    ids = _unnest("ids", id=(Integer, instrument_ids.tolist()))
+    latest = select(func.max(InstrumentPrice.date)).where(
+        InstrumentPrice.instrument_id == ids.c.id,
+        InstrumentPrice.date < start_date
+    ).scalar_subquery()
+    first = select(ids.c.id, func.coalesce(latest, start_date).label("date")).subquery()
+    # One text array per instrument, parsed by NumPy rather than a row object per bar.
+    statement = select(
+        InstrumentPrice.instrument_id,
+        func.array_to_string(func.array_agg(aggregate_order_by(InstrumentPrice.date - start_date, InstrumentPrice.date)), ","),
+        func.array_to_string(func.array_agg(aggregate_order_by(InstrumentPrice.close, InstrumentPrice.date)), ",", "NaN")
+    ).join(
+        first, (first.c.id == InstrumentPrice.instrument_id) & (InstrumentPrice.date >= first.c.date)
+    ).where(
+        InstrumentPrice.date <= end_date
+    ).group_by(InstrumentPrice.instrument_id).order_by(InstrumentPrice.instrument_id)
+
+    indexes, days, closes = [], [], []
+    for instrument_id, instrument_days, instrument_closes in session.exec(statement):
+        days.append(np.fromstring(instrument_days, dtype=np.int64, sep=","))
+        closes.append(np.fromstring(instrument_closes, sep=","))
+        indexes.append(np.full(len(days[-1]), np.searchsorted(instrument_ids, instrument_id)))
+    if not days:
+        return np.empty(0, np.int64), np.empty(0, "datetime64[D]"), np.empty(0)
+    return np.concatenate(indexes), np.datetime64(start_date, "D") + np.concatenate(days), np.concatenate(closes)
+
+
+def _get_valuation_series(*, session: Session, user_id: int, start_date: date=None, end_date: date=None) -> tuple[ValuationSeries | None, np.ndarray]:
+    """
+    Value a user's portfolio on every day of a date range.
+
+    Values are in the user's base currency, converted at each day's rates,
+    and flows at the rates of their order dates.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        start_date (date, optional): First date, the first order's if None. Defaults to None.
+        end_date (date, optional): Last date, today if None. Defaults to None.
+
+    Returns:
+        tuple[ValuationSeries | None, np.ndarray]: Series, None if the range is
+            empty, and the ids of the instruments valued.
+
+    Raises:
+        ValueError: If a holding has no rate into the base currency on a day.
+    """
+    arrays = get_order_arrays(session=session, user_id=user_id)
+    end_date = end_date or date.today()
+    if start_date is None:
+        if not len(arrays["date"]):
+            return None, np.empty(0, np.int64)
+        start_date = arrays["date"][0].astype("datetime64[D]").item()
+    if start_date > end_date:
+        return None, np.empty(0, np.int64)
+
+    instrument_ids, first_orders, order_instruments = np.unique(arrays["instrument_id"], return_index=True, return_inverse=True)
+    bar_instruments, bar_dates, bar_closes = _get_close_arrays(
+        session=session, instrument_ids=instrument_ids, start_date=start_date, end_date=end_date
+    )
+
+    # Conversion factors per instrument and day, from the first order.
+    rates = order_rates = None
+    base_currency = session.get(User, user_id).base_currency
+    if base_currency is not None:
+        first_date = min(start_date, arrays["date"][0].astype("datetime64[D]").item()) if len(arrays["date"]) else start_date
+        codes, matrices = _conversion_matrices(
+            session=session, currencies=np.append(arrays["currency"], base_currency), start_date=first_date, end_date=end_date
+        )
+        rates = matrices[np.searchsorted(codes, arrays["currency"][first_orders]), np.searchsorted(codes, base_currency)]
+        order_days = (arrays["date"].astype("datetime64[D]") - np.datetime64(first_date, "D")).astype(np.int64)
+        _check_rates(
+            rates=rates,
+            currencies=arrays["currency"][first_orders],
+            base_currency=base_currency,
+            start_date=first_date,
+            first_days=order_days[first_orders]
+        )
+        order_rates = rates[order_instruments, order_days.clip(max=rates.shape[1] - 1)]
+        rates = rates[:, (start_date - first_date).days:]
+
+    series = value_portfolio(
+        start_date,
+        end_date,
+        order_instruments,
+        arrays["date"],
+        arrays["sign"] * arrays["volume"],
+        arrays["price"],
+        bar_instruments,
+        bar_dates,
+        bar_closes,
+        rates,
+        order_rates
+    )
+    return series, instrument_ids
+
+
+def get_valuation(*, session: Session, user_id: int, start_date: date=None, end_date: date=None) -> ValuationPublic:
+    """
+    Get a user's daily portfolio valuation over a date range.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        start_date (date, optional): First date, the first order's if None. Defaults to None.
+        end_date (date, optional): Last date, today if None. Defaults to None.
+
+    Returns:
+        ValuationPublic: Market value, net capital invested and profit/loss per day.
+    """
+    series, _ = _get_valuation_series(session=session, user_id=user_id, start_date=start_date, end_date=end_date)
+    if series is None:
+        return ValuationPublic(dates=[], market_value=[], net_invested=[], profit_loss=[], count=0)
+    return ValuationPublic(
+        dates=series.dates.tolist(),
+        market_value=series.market_value.tolist(),
+        net_invested=series.net_invested.tolist(),
+        profit_loss=(series.market_value - series.net_invested).tolist(),
+        count=len(series.dates)
+    )
+
+
+def get_all_returns(*, session: Session, as_of: date=None, user_ids: list[int]=None) -> dict[int, ReturnsPublic]:
+    """
+    Get time-weighted and money-weighted returns of many users for every period.
+
+    Orders and closes are fetched once for all users, each user's portfolio
+    is valued over a daily grid of the shared closes in their base currency,
+    and the money-weighted returns of every user and period are solved together.
+
+    Args:
+        session (Session): SQL session.
+        as_of (date, optional): Last day of the periods, today if None. Defaults to None.
+        user_ids (list[int], optional): Users to include, all if None. Defaults to None.
+
+    Returns:
+        dict[int, ReturnsPublic]: Returns per user id, for users with orders by the date.
+
+    Raises:
+        ValueError: If a holding has no rate into its user's base currency on a day.
+    """
+    as_of = as_of or date.today()
+    statement = select(
+        Order.user_id, Order.date, Order.instrument_id, _order_sign_column(), Order.volume, Order.price,
+        Instrument.currency, User.base_currency
+    ).join(
+        Instrument, Instrument.id == Order.instrument_id
+    ).join(
+        User, User.id == Order.user_id
+    ).where(
+        Order.date < datetime.combine(as_of + timedelta(days=1), time())
+    ).order_by(Order.user_id, Order.date, Order.id)
+    if user_ids is not None:
+        statement = statement.where(Order.user_id.in_(user_ids))
+    columns = list(zip(*session.exec(statement).all()))
+    if not columns:
+        return {}
+    order_users = np.array(columns[0], dtype=np.int64)
+    order_dates = np.array(columns[1], dtype="datetime64[us]")
+    signed_volumes = np.array(columns[3], dtype=np.float64) * np.array(columns[4], dtype=np.float64)
+    order_prices = np.array(columns[5], dtype=np.float64)
+    instrument_ids, first_orders, order_instruments = np.unique(np.array(columns[2], dtype=np.int64), return_index=True, return_inverse=True)
+
+    # Closes of every instrument from the first order, shared by all users.
+    start_date = order_dates.min().astype("datetime64[D]").item()
+    closes = close_matrix(start_date, as_of, *_get_close_arrays(
+        session=session, instrument_ids=instrument_ids, start_date=start_date, end_date=as_of
+    ), len(instrument_ids))
+
+    # Conversion matrices shared by all users, indexed by each user's base currency.
+    order_currencies = np.array(columns[6], dtype=str)
+    base_currencies = np.array(columns[7], dtype=object)
+    codes, matrices = _conversion_matrices(
+        session=session,
+        currencies=np.concatenate((order_currencies, base_currencies[base_currencies != None].astype(str))),
+        start_date=start_date,
+        end_date=as_of
+    )
+    instrument_currencies = np.searchsorted(codes, order_currencies[first_orders])
+    order_days = (order_dates.astype("datetime64[D]") - np.datetime64(start_date, "D")).astype(np.int64)
+
+    users, firsts = np.unique(order_users, return_index=True)
+    periods = []
+    cash_flows = []
+    for user_id, first, last in zip(users.tolist(), firsts, np.append(firsts[1:], len(order_users))):
+        user_instruments, user_firsts, user_order_instruments = np.unique(
+            order_instruments[first:last], return_index=True, return_inverse=True
+        )
+        inception = order_dates[first].astype("datetime64[D]").item()
+        rates = order_rates = None
+        if base_currencies[first] is not None:
+            rates = matrices[instrument_currencies[user_instruments], np.searchsorted(codes, base_currencies[first])]
+            _check_rates(
+                rates=rates,
+                currencies=codes[instrument_currencies[user_instruments]],
+                base_currency=base_currencies[first],
+                start_date=start_date,
+                first_days=order_days[first:last][user_firsts]
+            )
+            order_rates = rates[user_order_instruments, order_days[first:last]]
+            rates = rates[:, (inception - start_date).days:]
+        series = value_holdings(
+            inception,
+            user_order_instruments,
+            order_dates[first:last],
+            signed_volumes[first:last],
+            order_prices[first:last],
+            closes[user_instruments, (inception - start_date).days:],
+            rates,
+            order_rates
+        )
+
+        flows = np.diff(series.net_invested, prepend=0.0)
+        starts = period_starts(as_of, inception)
+        indexes = np.array([(start - inception).days for start in starts.values()])
+        time_weighted = time_weighted_returns(series.market_value, flows, indexes)
+        for (period, start), index, period_time_weighted in zip(starts.items(), indexes, time_weighted):
+            periods.append((user_id, period, start, period_time_weighted))
+            cash_flows.append(money_weighted_flows(series.market_value, flows, index))
+
+    # Solve all money-weighted returns at once, padding with zero amounts.
+    amounts = np.zeros((len(cash_flows), max(len(flow_amounts) for flow_amounts, _ in cash_flows)))
+    years = np.zeros_like(amounts)
+    for row, (flow_amounts, flow_years) in enumerate(cash_flows):
+        amounts[row, :len(flow_amounts)] = flow_amounts
+        years[row, :len(flow_years)] = flow_years
+    money_weighted = xirr(amounts, years)
+
+    returns = {}
+    for (user_id, period, start, period_time_weighted), period_money_weighted in zip(periods, money_weighted.tolist()):
+        user_returns = returns.setdefault(user_id, ReturnsPublic(data=[], count=0))
+        user_returns.data.append(PeriodReturnPublic(
+            period=period,
+            start_date=start,
+            end_date=as_of,
+            time_weighted=float(period_time_weighted) if np.isfinite(period_time_weighted) else None,
+            money_weighted=period_money_weighted if np.isfinite(period_money_weighted) else None
+        ))
+        user_returns.count += 1
+    return returns
+
+
+def get_returns(*, session: Session, user_id: int, as_of: date=None) -> ReturnsPublic:
+    """
+    Get a user's time-weighted and money-weighted returns for every period.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        as_of (date, optional): Last day of the periods, today if None. Defaults to None.
+
+    Returns:
+        ReturnsPublic: Returns for MTD, QTD, YTD and ITD, none without orders.
+    """
+    returns = get_all_returns(session=session, as_of=as_of, user_ids=[user_id])
+    return returns.get(user_id, ReturnsPublic(data=[], count=0))
+
+# - - - - - - - - - - - - - - - - - - -
+# RISK OPERATIONS
+
+@event.listens_for(Session, "before_commit")
+def _bump_risk_versions(session: Session):
+    # Bumped in the committing transaction, so other processes see it with the writes.
+    entities = sorted(
+        [("instrument", id) for id in session.info.get("risk_instrument_ids", ())]
+        + [("user", id) for id in session.info.get("risk_user_ids", ())]
+    )
+    if not entities:
+        return
+    versions = _unnest(
+        "versions",
+        entity=(String, [entity for entity, _ in entities]),
+        entity_id=(Integer, [id for _, id in entities])
+    )
+    statement = pg_insert(RiskVersion).from_select(
+        ["entity", "entity_id", "version"], select(versions.c.entity, versions.c.entity_id, literal(1))
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["entity", "entity_id"],
+        set_={"version": RiskVersion.version + 1}
+    )
+    session.execute(statement)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_risk(session: Session):
+    # Cached metrics are only dropped once changes are committed.
+    user_ids = session.info.pop("risk_user_ids", None)
+    instrument_ids = session.info.pop("risk_instrument_ids", None)
+    if user_ids or instrument_ids:
+        risk_cache.invalidate(user_ids=user_ids or set(), instrument_ids=instrument_ids or set())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_risk_invalidation(session: Session):
+    session.info.pop("risk_user_ids", None)
+    session.info.pop("risk_instrument_ids", None)
+
+
+def _queue_risk_invalidation(*, session: Session, user_ids: set[int]=(), instrument_ids: set[int]=()) -> None:
+    """
+    Drop cached risk metrics once the session commits.
+
+    Args:
+        session (Session): SQL session.
+        user_ids (set[int], optional): Users whose orders changed. Defaults to ().
+        instrument_ids (set[int], optional): Instruments whose prices changed. Defaults to ().
+    """
+    session.info.setdefault("risk_user_ids", set()).update(user_ids)
+    session.info.setdefault("risk_instrument_ids", set()).update(instrument_ids)
+
+
+def _risk_stamp(*, session: Session, user_id: int) -> tuple[int, int]:
+    """
+    Get the db versions that cached risk metrics of a user depend on.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+
+    Returns:
+        tuple[int, int]: Version of the user's orders, and the summed versions
+            of their instruments' prices.
+    """
+    is_user = (RiskVersion.entity == "user") & (RiskVersion.entity_id == user_id)
+    statement = select(
+        func.coalesce(func.sum(case((is_user, RiskVersion.version), else_=0)), 0),
+        func.coalesce(func.sum(case((is_user, 0), else_=RiskVersion.version)), 0)
+    ).where(or_(
+        is_user,
+        (RiskVersion.entity == "instrument") & RiskVersion.entity_id.in_(
+            select(Order.instrument_id).where(Order.user_id == user_id)
+        )
+    ))
+    return tuple(session.exec(statement).one())
+
+
+def get_risk(*, session: Session, user_id: int, start_date: date=None, end_date: date=None, window: int=ROLLING_WINDOW) -> RiskPublic:
+    """
+    Get a user's risk metrics from their daily valuation over a date range.
+
+    Daily returns strip out each day's flows, as time-weighted returns do.
+    Metrics are cached until the user's orders or their instruments' prices change.
+    Writes in this process drop them on commit. Writes from other processes,
+    such as replays or other workers, are caught by checking the db versions
+    the metrics were computed at before serving them.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
+        start_date (date, optional): First date, the first order's if None. Defaults to None.
+        end_date (date, optional): Last date, today if None. Defaults to None.
+        window (int, optional): Days per rolling volatility window. Defaults to ROLLING_WINDOW.
+
+    Returns:
+        RiskPublic: Volatility, rolling volatility, max drawdown and historical value at risk.
+    """
+    end_date = end_date or date.today()
+    key = (user_id, start_date, end_date, window)
+    # Read before valuing, so writes landing meanwhile leave the entry stale.
+    stamp = _risk_stamp(session=session, user_id=user_id)
+    cached = risk_cache.get(key)
+    if cached is not None and cached[1] == stamp:
+        return cached[0]
+
+    version = risk_cache.version
+    series, instrument_ids = _get_valuation_series(session=session, user_id=user_id, start_date=start_date, end_date=end_date)
+    if series is None:
+        risk = RiskPublic(window=window, observations=0, rolling_dates=[], rolling_volatility=[])
+    else:
+        returns = daily_returns(series.market_value, np.diff(series.net_invested, prepend=0.0))
+        at_risk = np.flatnonzero(~np.isnan(returns))
+        observed = returns[at_risk]
+        drawdown, peak, trough = max_drawdown(returns)
+        var_95, var_99 = historical_var(observed).tolist()
+        volatility = annualised_volatility(observed)
+        rolling = rolling_volatility(observed, window)
+        risk = RiskPublic(
+            start_date=series.dates[0].item(),
+            end_date=series.dates[-1].item(),
+            observations=len(observed),
+            volatility=volatility if np.isfinite(volatility) else None,
+            max_drawdown=drawdown,
+            drawdown_peak=series.dates[peak].item(),
+            drawdown_trough=series.dates[trough].item(),
+            var_95=var_95 if np.isfinite(var_95) else None,
+            var_99=var_99 if np.isfinite(var_99) else None,
+            window=window,
+            rolling_dates=series.dates[at_risk[window - 1:]].tolist() if len(rolling) else [],
+            rolling_volatility=rolling.tolist()
+        )
+    risk_cache.put(key, (risk, stamp), set(instrument_ids.tolist()), version)
+    return risk
+
+# - - - - - - - - - - - - - - - - - - -
+# SUMMARY OPERATIONS
+
+def create_summary(*, session: Session, user: User) -> Summary:
+    """
+    Create summary.
+
+    Args:
+        session (Session): SQL session.
+        user (User): User.
+
+    Returns:
+        Summary: New summary.
+    """
+    db_obj = Summary(user=user)
+    session.add(db_obj)
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj
+
+
+def get_summary_by_id(*, session: Session, summary_id: int) -> Summary:
+    """
+    Get summary by id.
+
+    Args:
+        session (Session): SQL session.
+        summary_id (int): Summary id.
+
+    Returns:
+        Summary: Summary.
+    """
+    statement = select(Summary).where(Summary.id == summary_id)
+    db_obj = session.exec(statement).first()
+    return db_obj
+
+
+def get_summary_by_user_id(*, session: Session, user_id: int) -> Summary:
+    """
+    Get summary by user id.
+
+    Args:
+        session (Session): SQL session.
+        user_id (int): User id.
 
     Returns:
         Summary: Summary.
@@ -458,6 +2526,34 @@ def update_summary(*, session: Session, summary: Summary, summary_update: Summar
     return summary
 
 
+def refresh_summary(*, session: Session, summary: Summary) -> Summary:
+    """
+    Recompute summary values from the user's orders and latest closes, in
+    the user's base currency at the latest rates.
+
+    Args:
+        session (Session): SQL session.
+        summary (Summary): Summary to refresh.
+
+    Returns:
+        Summary: Refreshed summary.
+
+    Raises:
+        ValueError: If an order's currency has no rate into the base currency.
+    """
+    arrays = get_order_arrays(session=session, user_id=summary.user_id)
+    base_currency = session.get(User, summary.user_id).base_currency
+    factors = _conversion_factors(session=session, currencies=arrays["currency"], base_currency=base_currency)
+    _check_rates(rates=factors[:, None], currencies=arrays["currency"], base_currency=base_currency, start_date=date.today())
+    values = compute_summary(
+        arrays["sign"],
+        arrays["volume"],
+        arrays["price"] * factors,
+        arrays["close"] * factors
+    )
+    return update_summary(session=session, summary=summary, summary_update=SummaryUpdate(**values._asdict()))
+
+
 def delete_summary(*, session: Session, summary: Summary) -> None:
     """
     Delete summary.
@@ -1,8 +1,21 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api.main import api_router
+from app.core.price_store import price_store
+from app.rebuild_price_store import rebuild
+
+# - - - - - - - - - - - - - - - - - - -
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fill a newly configured price store from history already in the db.
+    if price_store is not None and price_store.empty:
+        rebuild(price_store)
+    yield
 
 # - - - - - - - - - - - - - - - - - - -
 
-app = FastAPI()
-app.include_router(api_router)
\ No newline at end of file
+app = FastAPI(lifespan=lifespan)
+app.include_router(api_router)
@@ -5,11 +5,11 @@ Created on 21-06-2025
 @author: Harry New
 
 '''
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 
 from pydantic import EmailStr
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index, PrimaryKeyConstraint
 
 # - - - - - - - - - - - - - - - - - - -
 
@@ -23,6 +23,9 @@ class User(UserBase, table=True):
     orders: list["Order"] = Relationship(back_populates="user")
     summary: "Summary" = Relationship(back_populates="user")
     hashed_password: str
+    lot_method: str = Field(default="FIFO", max_length=10)
+    # Currency values are converted into, left in instrument currencies if None.
+    base_currency: str | None = Field(default=None, max_length=5)
 
 
 class UserCreate(UserBase):
@@ -31,6 +34,8 @@ class UserCreate(UserBase):
 
 class UserPublic(UserBase):
     id: int
+    lot_method: str
+    base_currency: str | None
 
 
 class UsersPublic(SQLModel):
@@ -41,6 +46,8 @@ class UsersPublic(SQLModel):
 class UserUpdate(SQLModel):
     username: Optional[str] = None
     password: Optional[str] = None
+    lot_method: Optional[str] = None
+    base_currency: Optional[str] = Field(default=None, max_length=5)
 
 # - - - - - - - - - - - - - - - - - - -
 
@@ -62,14 +69,101 @@ class Instrument(InstrumentBase, table=True):
 class InstrumentsPublic(SQLModel):
     data: list[Instrument]
     count: int
+    next_cursor: Optional[str] = None
 
 
 class InstrumentUpdate(SQLModel):
     currency: Optional[str] = None
     prices: Optional[List[float]] = None
 
+
+class InstrumentPriceBase(SQLModel):
+    date: date
+    open: float | None = Field(default=None)
+    high: float | None = Field(default=None)
+    low: float | None = Field(default=None)
+    close: float | None = Field(default=None)
+
+
+class InstrumentPrice(InstrumentPriceBase, table=True):
+    # Bars are clustered by instrument then date, with prices included in the
+    # key index so range reads are index-only.
+    __table_args__ = (
+        PrimaryKeyConstraint("instrument_id", "date", postgresql_include=["open", "high", "low", "close"]),
+    )
+
+    instrument_id: int = Field(foreign_key="instrument.id")
+
+
+class InstrumentPriceCreate(InstrumentPriceBase):
+    instrument_id: int
+
+
+class InstrumentPricesPublic(SQLModel):
+    data: list[InstrumentPriceBase]
+    count: int
+
+
+class InstrumentPricesLoaded(SQLModel):
+    count: int
+
+
+class InstrumentPriceUpdate(SQLModel):
+    id: Optional[int] = None
+    symbol: Optional[str] = None
+    open: float
+    high: float
+    low: float
+    close: float
+
+
+class InstrumentPricesUpdated(SQLModel):
+    count: int
+    missing: list[str]
+
+
+class InstrumentCacheStats(SQLModel):
+    size: int
+    max_size: int
+    version: int
+    hits: int
+    misses: int
+
+# - - - - - - - - - - - - - - - - - - -
+
+class FxRateBase(SQLModel):
+    # One unit of from_currency is worth rate units of to_currency.
+    from_currency: str = Field(max_length=5)
+    to_currency: str = Field(max_length=5)
+    date: date
+    rate: float = Field(gt=0)
+
+
+class FxRate(FxRateBase, table=True):
+    __table_args__ = (
+        PrimaryKeyConstraint("from_currency", "to_currency", "date"),
+    )
+
+
+class FxRateCreate(FxRateBase):
+    pass
+
+
+class FxRatesPublic(SQLModel):
+    data: list[FxRateBase]
+    count: int
+
+
+class FxRatesLoaded(SQLModel):
+    count: int
+
 # - - - - - - - - - - - - - - - - - - -
 
+# Order types, compared case-insensitively.
+BUY = "BUY"
+SELL = "SELL"
+
+
 class OrderBase(SQLModel):
     date: datetime
     volume: float
@@ -78,6 +172,11 @@ class OrderBase(SQLModel):
     
 
 class Order(OrderBase, table=True):
+    # Composite index backing keyset pagination over (date, id) per user.
+    __table_args__ = (
+        Index("ix_order_user_id_date_id", "user_id", "date", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
 
     instrument_id: int = Field(index=True,foreign_key="instrument.id")
@@ -103,7 +202,171 @@ class OrderUpdate(SQLModel):
 class OrdersPublic(SQLModel):
     data: list[Order]
     count: int
+    next_cursor: Optional[str] = None
+
+
+class OrderImportError(SQLModel):
+    row: int
+    detail: str
+
+
+class OrdersImportReport(SQLModel):
+    imported: int
+    failed: int
+    errors: list[OrderImportError]
+
+# - - - - - - - - - - - - - - - - - - -
+
+class Position(SQLModel, table=True):
+    # One position per user and instrument, upserted on order writes.
+    __table_args__ = (
+        Index("ix_position_user_id_instrument_id", "user_id", "instrument_id", unique=True),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    quantity: float = Field(default=0)
+    cost_basis: float = Field(default=0)
+    realised_pnl: float = Field(default=0)
+    gross_invested: float = Field(default=0)
+    last_order_date: datetime | None = Field(default=None)
+
+    user_id: int = Field(foreign_key="user.id")
+    instrument_id: int = Field(index=True,foreign_key="instrument.id")
+
+
+class PositionCheckpoint(SQLModel, table=True):
+    # Positions of a user from all orders before a month start.
+    __table_args__ = (
+        Index("ix_positioncheckpoint_user_id_date_instrument_id", "user_id", "date", "instrument_id", unique=True),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    date: datetime
+    quantity: float = Field(default=0)
+    cost_basis: float = Field(default=0)
+    realised_pnl: float = Field(default=0)
+    gross_invested: float = Field(default=0)
+
+    user_id: int = Field(foreign_key="user.id")
+    instrument_id: int = Field(foreign_key="instrument.id")
+
+
+class PositionPublic(SQLModel):
+    instrument_id: int
+    volume: float
+    average_cost: Optional[float] = None
+    cost_basis: float
+    realised_pnl: float
+    gross_invested: float
+    close: Optional[float] = None
+    market_value: Optional[float] = None
+
+
+class PositionsPublic(SQLModel):
+    data: list[PositionPublic]
+    count: int
+
+# - - - - - - - - - - - - - - - - - - -
+
+class LotMatchPublic(SQLModel):
+    instrument_id: int
+    sell_order_id: int
+    buy_order_id: Optional[int] = None
+    sell_date: datetime
+    buy_date: Optional[datetime] = None
+    volume: float
+    cost: float
+    proceeds: float
+    pnl: float
+
+
+class RealisedPnlPublic(SQLModel):
+    method: str
+    total: float
+    data: list[LotMatchPublic]
+    count: int
+
+# - - - - - - - - - - - - - - - - - - -
+
+class DisposalPublic(SQLModel):
+    instrument_id: int
+    date: date
+    quantity: float
+    proceeds: float
+    cost: float
+    gain: float
+    same_day_quantity: float
+    bed_and_breakfast_quantity: float
+    section_104_quantity: float
+    # Sold beyond the holding, left out of proceeds and gain.
+    unmatched_quantity: float
+
+
+class CgtReportPublic(SQLModel):
+    tax_year: Optional[int] = None
+    total_proceeds: float
+    total_cost: float
+    total_gains: float
+    total_losses: float
+    net_gain: float
+    data: list[DisposalPublic]
+    count: int
+
+# - - - - - - - - - - - - - - - - - - -
+
+class ValuationPublic(SQLModel):
+    # Columns per day, rather than an object per day.
+    dates: list[date]
+    market_value: list[float]
+    net_invested: list[float]
+    profit_loss: list[float]
+    count: int
+
+
+class PeriodReturnPublic(SQLModel):
+    period: str
+    start_date: date
+    end_date: date
+    # Cumulative over the period.
+    time_weighted: Optional[float] = None
+    # Annualised, as XIRR.
+    money_weighted: Optional[float] = None
+
+
+class ReturnsPublic(SQLModel):
+    data: list[PeriodReturnPublic]
+    count: int
+
 
+class RiskPublic(SQLModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    # Daily returns with capital at risk.
+    observations: int
+    # Annualised.
+    volatility: Optional[float] = None
+    # Negative fraction, from the peak to the trough.
+    max_drawdown: Optional[float] = None
+    drawdown_peak: Optional[date] = None
+    drawdown_trough: Optional[date] = None
+    # Daily losses as positive fractions.
+    var_95: Optional[float] = None
+    var_99: Optional[float] = None
+    window: int
+    rolling_dates: list[date]
+    rolling_volatility: list[float]
+
+
+class RiskVersion(SQLModel, table=True):
+    # Bumped with each user's order writes and each instrument's price writes,
+    # so cached risk metrics in any process can tell they're stale.
+    __table_args__ = (
+        PrimaryKeyConstraint("entity", "entity_id"),
+    )
+
+    entity: str = Field(max_length=10)
+    entity_id: int
+    version: int = Field(default=0)
 
 # - - - - - - - - - - - - - - - - - - -
 
@@ -0,0 +1,53 @@
+'''
+Module for filling the price store from the price history in the database.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import argparse
+import logging
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.price_store import PriceStore
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# - - - - - - - - - - - - - - - - - - -
+
+def rebuild(store: PriceStore) -> int:
+    """
+    Copy all price history in the database into a price store.
+
+    Args:
+        store (PriceStore): Price store to fill.
+
+    Returns:
+        int: Number of bars copied.
+    """
+    with Session(engine) as session:
+        return crud.rebuild_price_store(session=session, store=store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the price store from the price history in the database.")
+    parser.add_argument("--path", default=settings.PRICE_STORE_PATH, help="Price store directory, PRICE_STORE_PATH if omitted.")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("No price store path given or configured.")
+
+    logger.info(f"Rebuilding price store in {args.path}.")
+    count = rebuild(PriceStore(args.path))
+    logger.info(f"Copied {count} bars.")
+
+# - - - - - - - - - - - - - - - - - - -
+
+if __name__ == "__main__":
+    main()
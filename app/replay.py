@@ -0,0 +1,58 @@
+'''
+Module for replaying a market data file into instrument prices.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import argparse
+import asyncio
+import logging
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.feed import Quote, read_quote_file, replay, run_feed
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# - - - - - - - - - - - - - - - - - - -
+
+def write_quotes(quotes: list[Quote]):
+    """
+    Write a coalesced batch of quotes in its own session.
+
+    Runs outside the API process, whose cached risk metrics catch these
+    writes through their db versions.
+
+    Args:
+        quotes (list[Quote]): Latest quote per symbol and day.
+    """
+    with Session(engine) as session:
+        missing = crud.apply_quotes(session=session, quotes=quotes)
+    if missing:
+        logger.warning(f"{len(missing)} symbols matched no instrument.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a CSV of bars or ticks into instrument prices.")
+    parser.add_argument("path", help="CSV with time, symbol and either price or open, high, low and close columns.")
+    parser.add_argument("--speed", type=float, default=None, help="Multiple of real time, as fast as possible if omitted.")
+    parser.add_argument("--window", type=float, default=1.0, help="Seconds of quotes coalesced per write.")
+    args = parser.parse_args()
+
+    logger.info(f"Replaying {args.path}.")
+    stats = asyncio.run(run_feed(replay(read_quote_file(args.path), args.speed), write_quotes, args.window))
+    logger.info(
+        f"Received {stats.received} quotes, wrote {stats.written} in {stats.batches} batches "
+        f"over {stats.elapsed:.1f}s ({stats.updates_per_second:.0f} quotes/s)."
+    )
+
+# - - - - - - - - - - - - - - - - - - -
+
+if __name__ == "__main__":
+    main()
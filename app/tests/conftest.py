@@ -14,6 +14,10 @@ from fastapi.testclient import TestClient
 
 from app.main import app
 from app.core.db import engine, create_db_and_tables, clear_db
+from app.core.cache import instrument_cache
+from app.core.search import instrument_search_index
+from app.core.fx import fx_rates
+from app.core.risk import risk_cache
 from app.core.config import test_settings
 from app.models import User, UserCreate, Instrument, InstrumentBase, Summary
 from app.tests.utils.utils import random_email, random_lower_string
@@ -26,6 +30,10 @@ def db() -> Generator[Session, None, None]:
     with Session(engine) as session:
         # Clear previous tables.
         clear_db()
+        instrument_cache.invalidate()
+        instrument_search_index.clear()
+        fx_rates.invalidate()
+        risk_cache.invalidate()
         # Create database with new tables.
         create_db_and_tables()
         yield session
@@ -0,0 +1,122 @@
+'''
+Module for testing capital gains endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Instrument, OrderCreate
+from app.core.cgt import match_disposals
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /USERS/{USER_ID}/CGT TESTS
+
+def test_get_cgt_report(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test same-day, 30-day and Section 104 matching in GBP.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument priced in GBX.
+    """
+    # Create orders, prices in pence.
+    orders = [
+        (datetime(2025,1,1), "BUY", 1000, 400),
+        (datetime(2025,5,1), "BUY", 500, 500),
+        (datetime(2025,6,1,9), "SELL", 700, 600),
+        (datetime(2025,6,1,15), "BUY", 100, 590),
+        (datetime(2025,6,20), "BUY", 200, 550),
+        (datetime(2025,8,1), "BUY", 300, 600),
+    ]
+    for date, type, volume, price in orders:
+        order_create = OrderCreate(date=date, instrument_id=instrument.id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Send get request.
+    response = client.get(f"/users/{user.id}/cgt",params={
+        "tax_year":2025
+    })
+    report_json = response.json()
+    assert response.status_code == 200
+    assert report_json["count"] == 1
+    disposal = report_json["data"][0]
+    assert disposal["date"] == "2025-06-01"
+    assert disposal["same_day_quantity"] == 100
+    assert disposal["bed_and_breakfast_quantity"] == 200
+    assert disposal["section_104_quantity"] == 400
+    assert disposal["proceeds"] == pytest.approx(4200)
+    assert disposal["cost"] == pytest.approx(590 + 1100 + 6500 * 400 / 1500)
+    assert report_json["net_gain"] == pytest.approx(4200 - 590 - 1100 - 6500 * 400 / 1500)
+    assert report_json["total_losses"] == 0
+
+    # Send get request for tax year without disposals.
+    response = client.get(f"/users/{user.id}/cgt",params={
+        "tax_year":2024
+    })
+    report_json = response.json()
+    assert response.status_code == 200
+    assert report_json["count"] == 0
+    assert report_json["net_gain"] == 0
+
+
+def test_get_cgt_report_fx(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test amounts are converted into GBP at the rate of each order's date.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument, priced in USD.
+    """
+    crud.update_instrument_currency(session=db, instrument=db.get(Instrument, instrument.id), currency="USD")
+    client.post("/fx/rates", json=[
+        {"from_currency": "USD", "to_currency": "GBP", "date": "2025-01-01", "rate": 0.8},
+        {"from_currency": "USD", "to_currency": "GBP", "date": "2025-06-01", "rate": 0.75},
+    ])
+    for date, type, price in [(datetime(2025,1,1), "BUY", 100), (datetime(2025,6,1), "SELL", 200)]:
+        order_create = OrderCreate(date=date, instrument_id=instrument.id, type=type, volume=10, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Send get request.
+    response = client.get(f"/users/{user.id}/cgt",params={
+        "tax_year":2025
+    })
+    disposal = response.json()["data"][0]
+    assert response.status_code == 200
+    assert disposal["proceeds"] == pytest.approx(2000 * 0.75)
+    assert disposal["cost"] == pytest.approx(1000 * 0.8)
+
+    # Send get request with an order before the first rate.
+    order_create = OrderCreate(date=datetime(2024,12,1), instrument_id=instrument.id, type="BUY", volume=10, price=100)
+    crud.create_order(session=db, user_id=user.id, order_create=order_create)
+    response = client.get(f"/users/{user.id}/cgt",params={
+        "tax_year":2025
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No FX rate from USD to GBP on 2024-12-01."
+
+
+def test_match_disposals_oversold():
+    """
+    Test proceeds of a sale beyond the holding only count for the matched shares.
+    """
+    orders = [
+        (datetime(2025,1,1), 1, 1, 10, 100),
+        (datetime(2025,6,1), 1, -1, 15, 200),
+    ]
+    disposal, = match_disposals(orders)
+    assert disposal.quantity == 10
+    assert disposal.unmatched_quantity == 5
+    assert disposal.proceeds == pytest.approx(2000)
+    assert disposal.cost == pytest.approx(1000)
+    assert disposal.gain == pytest.approx(1000)
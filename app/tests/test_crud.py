@@ -8,12 +8,14 @@ Created on 24-06-2025
 from datetime import datetime
 import pytest
 
+from sqlalchemy import update
 from sqlmodel import Session, select
 
-from app.models import UserCreate, User, Instrument, OrderCreate, OrderUpdate, InstrumentBase, SummaryUpdate
+from app.models import UserCreate, User, Instrument, InstrumentPriceUpdate, OrderCreate, OrderUpdate, InstrumentBase, SummaryUpdate, Position
 from app import crud
 from app.tests.utils.utils import random_email, random_lower_string
 from app.core.security import verify_password
+from app.core.cache import instrument_cache
 
 # - - - - - - - - - - - - - - - - - - -
 # USER TESTS.
@@ -337,6 +339,47 @@ def test_get_instrument_by_id(db: Session, instrument:Instrument):
     assert db_obj == instrument
 
 
+def test_instrument_cache(db: Session, instrument: Instrument):
+    """
+    Test instrument lookups are cached and invalidated on writes.
+
+    Args:
+        db (Session): SQL session.
+        instrument (Instrument): Test instrument.
+    """
+    stats = instrument_cache.stats()
+
+    # First lookup misses, later lookups by id or symbol hit.
+    assert crud.get_instrument_by_id(session=db, id=instrument.id).symbol == instrument.symbol
+    assert crud.get_instrument_by_symbol(session=db, symbol=instrument.symbol).id == instrument.id
+    assert crud.get_instrument_ids(session=db, ids={instrument.id, 999}) == {instrument.id}
+    new_stats = instrument_cache.stats()
+    assert new_stats["misses"] - stats["misses"] == 2
+    assert new_stats["hits"] - stats["hits"] == 2
+
+    # Cached instrument can be written through another session.
+    with Session(db.get_bind()) as session:
+        cached = crud.get_instrument_by_id(session=session, id=instrument.id)
+        crud.update_instrument_currency(session=session, instrument=cached, currency="GBP")
+    assert instrument_cache.stats()["version"] == new_stats["version"] + 1
+
+    # Prices written by another process are read from the db, not the cache.
+    with Session(db.get_bind()) as session:
+        crud.get_instrument_by_id(session=session, id=instrument.id)
+        session.execute(update(Instrument).where(Instrument.id == instrument.id).values(close=42))
+        session.commit()
+    with Session(db.get_bind()) as session:
+        version = instrument_cache.stats()["version"]
+        cached = crud.get_instrument_by_id(session=session, id=instrument.id)
+        assert cached.close == 42
+        assert instrument_cache.stats()["version"] == version
+    assert crud.get_instrument_by_id(session=db, id=instrument.id).currency == "GBP"
+
+    # Deleted instrument is no longer found.
+    crud.delete_instrument(session=db, instrument=crud.get_instrument_by_id(session=db, id=instrument.id))
+    assert crud.get_instrument_by_id(session=db, id=instrument.id) is None
+
+
 def test_update_instrument_price(db: Session):
     """
     Test update instrument price.
@@ -371,6 +414,11 @@ def test_update_instrument_price(db: Session):
     assert db_obj.low == update_prices["low"]
     assert db_obj.close == update_prices["close"]
 
+    # Check today's bar recorded.
+    prices = crud.get_instrument_prices(session=db,instrument_id=instrument.id)
+    assert prices.count == 1
+    assert prices.data[0].close == update_prices["close"]
+
 
 def test_update_instrument_currency(db: Session):
     """
@@ -461,6 +509,38 @@ def test_create_order(db: Session, user: User, instrument: Instrument):
     assert db_obj.instrument == instrument
 
 
+def test_insert_orders(db: Session, user: User, instrument: Instrument):
+    """
+    Test inserting a batch of orders.
+
+    Args:
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Check existing instrument ids.
+    assert crud.get_instrument_ids(session=db, ids={instrument.id, 999}) == {instrument.id}
+
+    # Properties.
+    properties = {
+        "date": datetime.now(),
+        "volume": 1,
+        "price": 1,
+        "type": "BUY",
+        "instrument_id": instrument.id
+    }
+
+    # Insert orders.
+    order_creates = [OrderCreate(**properties) for i in range(3)]
+    assert crud.insert_orders(session=db, user_id=user.id, order_creates=order_creates) == 3
+    db.commit()
+
+    # Check database.
+    orders = crud.get_orders(session=db, user_id=user.id)
+    assert orders.count == 3
+    assert all(order.user_id == user.id for order in orders.data)
+
+
 @pytest.mark.parametrize("multiple_users", [2], indirect=True)
 def test_get_orders_by_user(db: Session, multiple_users: list[User], instrument: Instrument):
     """
@@ -559,6 +639,49 @@ def test_get_orders_by_date(db: Session, user: User, instrument: Instrument):
     assert orders.data[0] == test_order_2
 
 
+def test_get_orders_paginated(db: Session, user: User, instrument: Instrument):
+    """
+    Test paging through orders with a cursor.
+
+    Args:
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = {
+        "volume": 1,
+        "price": 1,
+        "type": "BUY",
+        "instrument_id": instrument.id
+    }
+
+    # Create orders, two sharing the same date.
+    dates = ["08/07/2025","06/07/2025","07/07/2025","07/07/2025","09/07/2025"]
+    for date in dates:
+        order_create = OrderCreate(date=datetime.strptime(date,"%d/%m/%Y"),**properties)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Page through orders.
+    pages = []
+    after = None
+    while True:
+        page = crud.get_orders(session=db, user_id=user.id, after=after, limit=2)
+        pages.append(page)
+        after = page.next_cursor
+        if not after:
+            break
+
+    assert [page.count for page in pages] == [2,2,1]
+    orders = [order for page in pages for order in page.data]
+    assert [(order.date, order.id) for order in orders] == sorted((order.date, order.id) for order in orders)
+    assert len({order.id for order in orders}) == 5
+
+    # Invalid cursor.
+    with pytest.raises(ValueError):
+        crud.get_orders(session=db, user_id=user.id, after="invalid", limit=2)
+
+
 def test_get_order_by_id(db: Session, user: User, instrument: Instrument):
     """
     Test get order by id.
@@ -713,6 +836,81 @@ def test_delete_order(db: Session, user: User, instrument: Instrument):
     crud.delete_order(session=db, order=test_order)
     assert not crud.get_order_by_id(session=db, order_id=test_order.id)
 
+
+@pytest.mark.parametrize("multiple_users", [2], indirect=True)
+def test_delete_orders_bulk(db: Session, multiple_users: list[User], instrument: Instrument):
+    """
+    Test bulk deleting orders with filters.
+
+    Args:
+        db (Session): SQL session.
+        multiple_users (list[User]): Test multiple users.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = {
+        "date": datetime.now(),
+        "volume": 1,
+        "price": 1,
+        "instrument_id": instrument.id
+    }
+
+    # Create orders for both users.
+    for user_id in [1,2]:
+        crud.create_order(session=db, user_id=user_id, order_create=OrderCreate(type="BUY",**properties))
+        crud.create_order(session=db, user_id=user_id, order_create=OrderCreate(type="SELL",**properties))
+
+    # Delete sell orders for first user.
+    deleted = crud.delete_orders_bulk(session=db, user_id=1, type="SELL")
+    assert deleted.count == 1
+    assert deleted.data[0].type == "SELL"
+    assert deleted.data[0].user_id == 1
+    assert crud.get_orders(session=db, user_id=1).count == 1
+
+    # Delete remaining orders for first user.
+    deleted = crud.delete_orders_bulk(session=db, user_id=1)
+    assert deleted.count == 1
+    assert crud.get_orders(session=db, user_id=1).count == 0
+    assert crud.get_orders(session=db, user_id=2).count == 2
+
+# - - - - - - - - - - - - - - - - - - -
+# POSITION TESTS
+
+def test_positions_maintained_on_order_writes(db: Session, user: User, instrument: Instrument):
+    """
+    Test positions follow order writes, including back-dated orders.
+
+    Args:
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    def get_position():
+        position = db.exec(select(Position).where(Position.user_id == user.id)).first()
+        if not position:
+            return None
+        db.refresh(position)
+        return (position.quantity, position.cost_basis, position.realised_pnl)
+
+    # Buy then sell part at a gain.
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(date=datetime(2025,7,1),type="BUY",volume=10,price=10,instrument_id=instrument.id))
+    sell = crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(date=datetime(2025,7,3),type="SELL",volume=5,price=12,instrument_id=instrument.id))
+    assert get_position() == pytest.approx((5, 50, 10))
+
+    # Back-dated buy changes the average cost at the sale.
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(date=datetime(2025,7,2),type="BUY",volume=10,price=4,instrument_id=instrument.id))
+    assert get_position() == pytest.approx((15, 105, 25))
+
+    # Update and delete the sale.
+    crud.update_order(session=db, order=sell, order_update=OrderUpdate(volume=10))
+    assert get_position() == pytest.approx((10, 70, 50))
+    crud.delete_order(session=db, order=sell)
+    assert get_position() == pytest.approx((20, 140, 0))
+
+    # Bulk delete removes the position.
+    crud.delete_orders_bulk(session=db, user_id=user.id)
+    assert get_position() == None
+
 # - - - - - - - - - - - - - - - - - - -
 # SUMMARY TESTS
 
@@ -783,6 +981,66 @@ def test_update_summary(db: Session, multiple_users: list[User]):
     assert updated_summary.profit_loss == 0
 
 
+def test_summary_maintained_on_order_writes(db: Session, user: User, instrument: Instrument):
+    """
+    Test summary values follow order and price writes without a rebuild.
+
+    Args:
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    summary = crud.create_summary(session=db, user=user)
+    summary = crud.refresh_summary(session=db, summary=summary)
+
+    def check_summary():
+        # Compare maintained values against a full computation.
+        db.refresh(summary)
+        maintained = (summary.ending_market_value, summary.beginning_market_value, summary.profit_loss)
+        rebuilt = crud.refresh_summary(session=db, summary=summary)
+        assert maintained == pytest.approx((rebuilt.ending_market_value, rebuilt.beginning_market_value, rebuilt.profit_loss))
+        return maintained
+
+    # Properties.
+    properties = {
+        "date": datetime.now(),
+        "instrument_id": instrument.id
+    }
+
+    # Create orders before any close is known.
+    buy = crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="BUY",volume=10,price=10,**properties))
+    sell = crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="SELL",volume=4,price=11,**properties))
+    assert check_summary() == pytest.approx((56, 56, 0))
+
+    # Set close price.
+    instrument = crud.get_instrument_by_id(session=db, id=instrument.id)
+    crud.update_instrument_prices(session=db, instrument=instrument, open=1, high=1, low=1, close=12)
+    assert check_summary() == pytest.approx((72, 56, 16))
+
+    # Bulk update close price by symbol.
+    updated = crud.update_instrument_prices_bulk(session=db, prices=[
+        InstrumentPriceUpdate(symbol=instrument.symbol, open=1, high=1, low=1, close=14),
+        InstrumentPriceUpdate(id=instrument.id, open=1, high=1, low=1, close=13),
+        InstrumentPriceUpdate(symbol="MISSING", open=1, high=1, low=1, close=1)
+    ])
+    assert (updated.count, updated.missing) == (1, ["MISSING"])
+    assert check_summary() == pytest.approx((78, 56, 22))
+    crud.update_instrument_prices_bulk(session=db, prices=[InstrumentPriceUpdate(id=instrument.id, open=1, high=1, low=1, close=12)])
+    assert check_summary() == pytest.approx((72, 56, 16))
+
+    # Update and delete orders.
+    crud.update_order(session=db, order=sell, order_update=OrderUpdate(volume=5))
+    assert check_summary() == pytest.approx((60, 45, 15))
+    crud.delete_order(session=db, order=buy)
+    assert check_summary() == pytest.approx((-60, -55, -5))
+
+    # Batch create and bulk delete orders.
+    crud.create_orders(session=db, user_id=user.id, order_creates=[OrderCreate(type="BUY",volume=5,price=9,**properties)])
+    assert check_summary() == pytest.approx((0, -10, 10))
+    crud.delete_orders_bulk(session=db, user_id=user.id)
+    assert check_summary() == pytest.approx((0, 0, 0))
+
+
 def test_delete_summary(db: Session, user: User):
     """
     Test deleting summary.
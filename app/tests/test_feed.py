@@ -0,0 +1,135 @@
+'''
+Module for testing market data ingestion.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session
+
+from app.models import Instrument
+from app.core.db import engine
+from app.core.feed import Quote, read_quote_file, replay, coalesce, run_feed
+from app.core.price_store import PriceStore
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# FEED TESTS
+
+def test_read_quote_file(tmp_path):
+    """
+    Test reading bar and tick files.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    bars = tmp_path / "bars.csv"
+    bars.write_text("time,symbol,open,high,low,close\n2025-07-01T08:00:00,CCR,1,2,0.5,1.5\n")
+    ticks = tmp_path / "ticks.csv"
+    ticks.write_text("time,symbol,price\n2025-07-01T08:00:00,CCR,3\n")
+
+    assert list(read_quote_file(bars)) == [Quote("CCR", datetime(2025,7,1,8), 1, 2, 0.5, 1.5)]
+    assert list(read_quote_file(ticks)) == [Quote("CCR", datetime(2025,7,1,8), 3, 3, 3, 3)]
+
+
+def test_replay_coalesces_bursts():
+    """
+    Test replayed quotes are coalesced to one bar per symbol each window.
+    """
+    start = datetime(2025,7,1,8)
+    quotes = [Quote("A", start + timedelta(seconds=i), i, i, i, i) for i in [2, 4, 0, 3, 1]]
+    quotes += [Quote("B", start + timedelta(seconds=5), 9, 9, 9, 9)]
+    quotes += [Quote("A", start + timedelta(seconds=50), 7, 7, 7, 7)]
+
+    async def collect():
+        # 100 times real time puts the first six quotes in one 0.2s window.
+        return [batch async for batch in coalesce(replay(quotes, speed=100), window=0.2)]
+
+    batches = asyncio.run(collect())
+    assert batches[0] == [Quote("A", quotes[4].time, 2, 4, 0, 1), quotes[5]]
+    assert batches[-1] == [quotes[6]]
+    assert sum(len(batch) for batch in batches) == 3
+
+
+def test_run_feed_writes_prices(instrument: Instrument):
+    """
+    Test the feed writes coalesced quotes through to instrument prices.
+
+    Args:
+        instrument (Instrument): Test instrument.
+    """
+    start = datetime(2025,7,1,8)
+    quotes = [Quote(instrument.symbol, start + timedelta(seconds=i), 1, 2, 0.5, i) for i in range(100)]
+    quotes.append(Quote("MISSING", start, 1, 1, 1, 1))
+
+    def write(batch: list[Quote]):
+        with Session(engine) as session:
+            crud.apply_quotes(session=session, quotes=batch)
+
+    stats = asyncio.run(run_feed(replay(quotes), write, window=0.05))
+    assert stats.received == 101
+    assert stats.written <= 101
+
+    with Session(engine) as session:
+        assert crud.get_instrument_by_id(session=session, id=instrument.id).close == 99
+
+
+def test_apply_quotes_merges_todays_bar(tmp_path, monkeypatch, instrument: Instrument):
+    """
+    Test quotes widen today's bar rather than overwriting its open, high and low.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+        monkeypatch (MonkeyPatch): Patching fixture.
+        instrument (Instrument): Test instrument.
+    """
+    store = PriceStore(tmp_path)
+    monkeypatch.setattr(crud, "price_store", store)
+    now = datetime.now()
+
+    with Session(engine) as session:
+        crud.apply_quotes(session=session, quotes=[Quote(instrument.symbol, now, 10, 12, 9, 11)])
+        crud.apply_quotes(session=session, quotes=[Quote(instrument.symbol, now, 8, 8, 8, 8)])
+        crud.apply_quotes(session=session, quotes=[Quote(instrument.symbol, now, 13, 13, 13, 13)])
+
+        bar = crud.get_instrument_prices(session=session, instrument_id=instrument.id).data[-1]
+        assert (bar.date, bar.open, bar.high, bar.low, bar.close) == (date.today(), 10, 13, 8, 13)
+        db_instrument = crud.get_instrument_by_id(session=session, id=instrument.id)
+        assert (db_instrument.open, db_instrument.high, db_instrument.low, db_instrument.close) == (10, 13, 8, 13)
+        series = store.read(instrument.id)
+        assert (series.open[-1], series.high[-1], series.low[-1], series.close[-1]) == (10, 13, 8, 13)
+
+
+def test_replay_keeps_bars_per_day(instrument: Instrument):
+    """
+    Test replaying past days stores a bar per day, rather than folding them into today's.
+
+    Args:
+        instrument (Instrument): Test instrument.
+    """
+    start = datetime(2025,7,1,16)
+    quotes = [
+        Quote(instrument.symbol, start, 10, 11, 9, 10),
+        Quote(instrument.symbol, start + timedelta(hours=1), 10, 14, 10, 12),
+        Quote(instrument.symbol, start + timedelta(days=1), 20, 21, 19, 20),
+        Quote(instrument.symbol, start + timedelta(days=1, hours=1), 20, 20, 15, 16)
+    ]
+
+    def write(batch: list[Quote]):
+        with Session(engine) as session:
+            crud.apply_quotes(session=session, quotes=batch)
+
+    # One window holds both days.
+    asyncio.run(run_feed(replay(quotes), write, window=1))
+
+    with Session(engine) as session:
+        bars = crud.get_instrument_prices(session=session, instrument_id=instrument.id).data
+        assert [(bar.date, bar.open, bar.high, bar.low, bar.close) for bar in bars] == [
+            (date(2025,7,1), 10, 14, 9, 12),
+            (date(2025,7,2), 20, 21, 15, 16)
+        ]
+        db_instrument = crud.get_instrument_by_id(session=session, id=instrument.id)
+        assert (db_instrument.open, db_instrument.high, db_instrument.low, db_instrument.close) == (20, 21, 15, 16)
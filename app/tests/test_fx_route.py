@@ -0,0 +1,135 @@
+'''
+Module for testing FX rate endpoints and base currency conversion.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Summary, Instrument, OrderCreate
+from app.core.fx import FxRates
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# FX TESTS
+
+def test_fx_matrices():
+    """
+    Test conversion matrices from recorded, inverse, subunit and cross rates.
+    """
+    rates = FxRates()
+    rates.load([
+        ("EUR", "GBP", date(2025,1,1), 0.8),
+        ("GBP", "USD", date(2025,1,2), 1.25),
+        ("GBP", "USD", date(2025,1,4), 1.5),
+    ], rates.version)
+
+    matrices = rates.matrices(["GBX", "USD", "EUR", "JPY"], date(2025,1,1), date(2025,1,4))
+    assert matrices.shape == (4, 4, 4)
+    # GBX to USD through GBP, missing before the first rate.
+    assert np.isnan(matrices[0, 1, 0])
+    assert matrices[0, 1, 1:].tolist() == pytest.approx([0.0125, 0.0125, 0.015])
+    assert matrices[1, 0, -1] == pytest.approx(100 / 1.5)
+    assert matrices[2, 1, -1] == pytest.approx(0.8 * 1.5)
+    # No rates at all for JPY.
+    assert np.isnan(matrices[3, :3, -1]).all() and matrices[3, 3, -1] == 1
+
+    # Matrices are reused until rates change.
+    matrix = rates.matrix(["GBP", "USD"], date(2025,1,3))
+    assert matrix.ravel().tolist() == pytest.approx([1, 1.25, 0.8, 1])
+    assert rates.matrix(["GBP", "USD"], date(2025,1,3)) is matrix
+    rates.invalidate()
+    assert not rates.loaded
+    assert np.isnan(rates.matrix(["GBP", "USD"], date(2025,1,3))).tolist() == [[False, True], [True, False]]
+
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_base_currency_conversion(client: TestClient, db: Session, user: User, summary: Summary, multiple_instruments: list[Instrument]):
+    """
+    Test loading rates and converting summary and valuation into a base currency.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        summary (Summary): Test summary.
+        multiple_instruments (list[Instrument]): Test multiple instruments, quoted in GBX.
+    """
+    crud.update_instrument_currency(session=db, instrument=crud.get_instrument_by_id(session=db, id=2), currency="USD")
+
+    # Load rates.
+    rates = [
+        {"from_currency": "GBP", "to_currency": "USD", "date": "2025-01-01", "rate": 1.25},
+        {"from_currency": "GBP", "to_currency": "USD", "date": "2025-01-04", "rate": 1.5},
+    ]
+    response = client.post("/fx/rates", json=rates)
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    assert client.get("/fx/rates", params={"from_currency": "GBP"}).json()["count"] == 2
+    assert client.get("/fx/rates", params={"start_date": "02/01/2025"}).json()["data"][0]["rate"] == 1.5
+    invalid = [{"from_currency": "GBP", "to_currency": "GBP", "date": "2025-01-01", "rate": 1}]
+    assert client.post("/fx/rates", json=invalid).status_code == 400
+
+    # Convert into dollars.
+    response = client.put(f"/users/{user.id}/", json={"base_currency": "USD"})
+    assert response.status_code == 200
+    assert response.json()["base_currency"] == "USD"
+    orders = [
+        (datetime(2025,1,2,9), 1, 10, 200),
+        (datetime(2025,1,4,9), 2, 5, 4),
+    ]
+    for order_date, instrument_id, volume, price in orders:
+        order_create = OrderCreate(date=order_date, instrument_id=instrument_id, type="BUY", volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Each day at that day's rate, without closes marked at order prices.
+    valuation = client.get(f"/users/{user.id}/valuation", params={"end": "05/01/2025"}).json()
+    assert valuation["market_value"] == pytest.approx([25, 25, 50, 50])
+    assert valuation["net_invested"] == pytest.approx([25, 25, 45, 45])
+    # Returns include the currency gain.
+    returns = client.get(f"/users/{user.id}/returns", params={"as_of": "05/01/2025"}).json()
+    assert returns["data"][-1]["time_weighted"] == pytest.approx(0.2)
+
+    # Summary at the latest rate, maintained as closes move.
+    summary_json = client.get(f"/users/{user.id}/summary").json()
+    assert summary_json["beginning_market_value"] == pytest.approx(50)
+    assert summary_json["ending_market_value"] == pytest.approx(50)
+    crud.update_instrument_prices(session=db, instrument=crud.get_instrument_by_id(session=db, id=1), open=300, high=300, low=300, close=300)
+    summary_json = client.get(f"/users/{user.id}/summary").json()
+    assert summary_json["ending_market_value"] == pytest.approx(65)
+    assert summary_json["profit_loss"] == pytest.approx(15)
+
+    # New rates rebuild summaries.
+    client.post("/fx/rates", json=[{"from_currency": "GBP", "to_currency": "USD", "date": str(date.today()), "rate": 2}])
+    summary_json = client.get(f"/users/{user.id}/summary").json()
+    assert summary_json["beginning_market_value"] == pytest.approx(60)
+    assert summary_json["ending_market_value"] == pytest.approx(80)
+
+    # Amounts in a subunit convert without recorded rates.
+    client.put(f"/users/{user.id}/", json={"base_currency": "GBP"})
+    summary_json = client.get(f"/users/{user.id}/summary").json()
+    assert summary_json["ending_market_value"] == pytest.approx(30 + 20 / 2)
+
+    # Pairs without a rate are reported rather than converted at par.
+    assert client.put(f"/users/{user.id}/", json={"base_currency": "XYZ"}).status_code == 400
+    client.post("/fx/rates", json=[{"from_currency": "JPY", "to_currency": "CHF", "date": "2025-01-01", "rate": 0.006}])
+    assert client.put(f"/users/{user.id}/", json={"base_currency": "JPY"}).status_code == 200
+    response = client.get(f"/users/{user.id}/summary")
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"No FX rate from GBX to JPY on {date.today()}."
+    response = client.get(f"/users/{user.id}/valuation", params={"end": "05/01/2025"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No FX rate from GBX to JPY on 2025-01-02."
+    assert client.get(f"/users/{user.id}/returns", params={"as_of": "05/01/2025"}).status_code == 400
+
+    # A null base currency clears it.
+    response = client.put(f"/users/{user.id}/", json={"base_currency": None})
+    assert response.status_code == 200
+    assert response.json()["base_currency"] is None
+    assert client.get(f"/users/{user.id}/summary").json()["ending_market_value"] == pytest.approx(300 * 10 + 20)
@@ -0,0 +1,104 @@
+'''
+Module for testing point-in-time holdings endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.models import User, Instrument, InstrumentPriceCreate, OrderCreate, OrderUpdate, PositionCheckpoint
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /USERS/{USER_ID}/HOLDINGS TESTS
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_get_holdings(client: TestClient, db: Session, user: User, multiple_instruments: list[Instrument]):
+    """
+    Test get holdings endpoint at historical dates.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        multiple_instruments (list[Instrument]): Test multiple instruments.
+    """
+    crud.upsert_instrument_prices(session=db, prices=[
+        InstrumentPriceCreate(instrument_id=1, date=date(2025,1,31), close=12),
+        InstrumentPriceCreate(instrument_id=1, date=date(2025,3,31), close=30),
+    ])
+    orders = [
+        (datetime(2025,1,10), 1, "BUY", 10, 10),
+        (datetime(2025,1,20), 2, "BUY", 4, 5),
+        (datetime(2025,2,15), 1, "SELL", 4, 20),
+        (datetime(2025,3,5), 2, "SELL", 4, 6),
+        (datetime(2025,3,31,12), 1, "BUY", 2, 25),
+    ]
+    for order_date, instrument_id, type, volume, price in orders:
+        order_create = OrderCreate(date=order_date, instrument_id=instrument_id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Holdings at the end of January, marked at that month's close.
+    response = client.get(f"/users/{user.id}/holdings", params={"as_of": "31/01/2025"})
+    assert response.status_code == 200
+    holdings = response.json()
+    assert [(position["instrument_id"], position["volume"]) for position in holdings["data"]] == [(1, 10), (2, 4)]
+    assert holdings["data"][0]["market_value"] == 120
+    assert holdings["data"][1]["close"] is None
+
+    # Later date builds checkpoints for the months crossed.
+    holdings = client.get(f"/users/{user.id}/holdings", params={"as_of": "31/03/2025"}).json()
+    assert [(position["instrument_id"], position["volume"]) for position in holdings["data"]] == [(1, 8)]
+    assert holdings["data"][0]["realised_pnl"] == 40
+    assert holdings["data"][0]["market_value"] == 240
+    dates = set(db.exec(select(PositionCheckpoint.date).where(PositionCheckpoint.user_id == user.id)).all())
+    assert dates == {datetime(2025,2,1), datetime(2025,3,1), datetime(2025,4,1)}
+
+    # Matches the current positions.
+    today = client.get(f"/users/{user.id}/holdings").json()
+    assert today["data"][0]["volume"] == client.get(f"/users/{user.id}/positions").json()["data"][0]["volume"]
+
+    # Invalid user.
+    assert client.get("/users/999/holdings").status_code == 400
+
+
+def test_holdings_checkpoint_invalidation(db: Session, user: User, instrument: Instrument):
+    """
+    Test back-dated order changes invalidate later checkpoints only.
+
+    Args:
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    for month in range(1, 7):
+        order_create = OrderCreate(date=datetime(2025,month,10), instrument_id=instrument.id, type="BUY", volume=1, price=month)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,6,30)).data[0].volume == 6
+
+    def checkpoint_dates() -> list[datetime]:
+        return sorted(db.exec(select(PositionCheckpoint.date).where(PositionCheckpoint.user_id == user.id)).all())
+
+    assert len(checkpoint_dates()) == 6
+
+    # Back-dated order drops checkpoints after it.
+    order_create = OrderCreate(date=datetime(2025,3,20), instrument_id=instrument.id, type="SELL", volume=3, price=9)
+    order = crud.create_order(session=db, user_id=user.id, order_create=order_create)
+    assert checkpoint_dates() == [datetime(2025,2,1), datetime(2025,3,1)]
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,3,31)).count == 0
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,6,30)).data[0].volume == 3
+
+    # Moving an order earlier drops checkpoints after its new date.
+    crud.update_order(session=db, order=order, order_update=OrderUpdate(date=datetime(2025,1,5)))
+    assert checkpoint_dates() == []
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,1,5)).data[0].volume == -3
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,6,30)).data[0].volume == 3
+
+    # Deleting restores the original holdings.
+    crud.delete_order(session=db, order=order)
+    assert crud.get_holdings(session=db, user_id=user.id, as_of=date(2025,6,30)).data[0].volume == 6
@@ -5,9 +5,11 @@ Created on 02-07-2025
 @author: Harry New
 
 '''
+import pytest
 from fastapi.testclient import TestClient
 
 from app.models import Instrument
+from app.core.search import instrument_search_index
 
 # - - - - - - - - - - - - - - - - - - -
 # GET /INSTRUMENTS TESTS
@@ -58,6 +60,44 @@ def test_get_instruments(client: TestClient, instrument: Instrument):
     assert response.status_code == 200
     assert len(instrument_list_json["data"]) == 0
 
+
+@pytest.mark.parametrize("multiple_instruments", [5], indirect=True)
+def test_get_instruments_paginated(client: TestClient, multiple_instruments: list[Instrument]):
+    """
+    Test paging through filtered instruments.
+
+    Args:
+        client (TestClient): Test client.
+        multiple_instruments (list[Instrument]): Test instruments.
+    """
+    # Page through all instruments.
+    ids = []
+    params = {"currency":"GBX","limit":2}
+    while True:
+        response = client.get("/instruments/",params=params)
+        instrument_list_json = response.json()
+        assert response.status_code == 200
+        assert instrument_list_json["count"] == 5
+        ids.extend(instrument["id"] for instrument in instrument_list_json["data"])
+        if not instrument_list_json["next_cursor"]:
+            break
+        params["after"] = instrument_list_json["next_cursor"]
+    assert ids == sorted(ids)
+    assert len(ids) == 5
+
+    # Combined filters count only matching instruments.
+    instrument = client.get(f"/instruments/{ids[0]}/").json()
+    response = client.get("/instruments/",params={"exchange":instrument["exchange"],"currency":"GBX"})
+    instrument_list_json = response.json()
+    assert instrument_list_json["count"] == 1
+    assert instrument_list_json["data"][0]["id"] == ids[0]
+    response = client.get("/instruments/",params={"exchange":instrument["exchange"],"currency":"USD"})
+    assert response.json() == {"data":[],"count":0,"next_cursor":None}
+
+    # Invalid cursor and limit.
+    assert client.get("/instruments/",params={"after":"bad"}).status_code == 400
+    assert client.get("/instruments/",params={"limit":0}).status_code == 400
+
 # - - - - - - - - - - - - - - - - - - -
 # POST /INSTRUMENTS TESTS
 
@@ -84,6 +124,146 @@ def test_create_instrument(client: TestClient):
     assert instrument_json["symbol"] == properties["symbol"]
     assert instrument_json["currency"] == properties["currency"]
 
+# - - - - - - - - - - - - - - - - - - -
+# POST /INSTRUMENTS/PRICES/HISTORY TESTS
+
+def test_load_instrument_prices(client: TestClient, instrument: Instrument):
+    """
+    Test bulk loading and reading price history.
+
+    Args:
+        client (TestClient): Test client.
+        instrument (Instrument): Test instrument.
+    """
+    # Bars, with a repeated date overwriting the first.
+    bars = [
+        {"instrument_id":instrument.id,"date":f"2025-07-0{day}","open":day,"high":day,"low":day,"close":day}
+        for day in range(1,6)
+    ]
+    bars.append({"instrument_id":instrument.id,"date":"2025-07-01","open":9,"high":9,"low":9,"close":9})
+
+    # Send post request.
+    response = client.post("/instruments/prices/history",json=bars)
+    assert response.status_code == 200
+    assert response.json()["count"] == 5
+
+    # Send get request for range.
+    response = client.get(f"/instruments/{instrument.id}/prices",params={
+        "start_date":"01/07/2025",
+        "end_date":"03/07/2025"
+    })
+    prices_json = response.json()
+    assert response.status_code == 200
+    assert prices_json["count"] == 3
+    assert [bar["close"] for bar in prices_json["data"]] == [9,2,3]
+
+    # Send post request for unknown instrument.
+    response = client.post("/instruments/prices/history",json=[{**bars[0],"instrument_id":999}])
+    assert response.status_code == 400
+
+# - - - - - - - - - - - - - - - - - - -
+# PUT /INSTRUMENTS/PRICES TESTS
+
+@pytest.mark.parametrize("multiple_instruments", [3], indirect=True)
+def test_update_instrument_prices_bulk(client: TestClient, multiple_instruments: list[Instrument]):
+    """
+    Test bulk updating instrument prices by id and symbol.
+
+    Args:
+        client (TestClient): Test client.
+        multiple_instruments (list[Instrument]): Test instruments.
+    """
+    instruments = client.get("/instruments/").json()["data"]
+    prices = [
+        {"id":instruments[0]["id"],"open":1,"high":2,"low":3,"close":4},
+        {"symbol":instruments[1]["symbol"],"open":5,"high":6,"low":7,"close":8},
+        {"symbol":"MISSING","open":1,"high":1,"low":1,"close":1},
+        {"id":instruments[1]["id"],"open":5,"high":6,"low":7,"close":8}
+    ]
+
+    # Send put request, counting the repeated instrument once.
+    response = client.put("/instruments/prices",json=prices)
+    assert response.status_code == 200
+    assert response.json() == {"count":2,"missing":["MISSING"]}
+
+    # Check instruments.
+    for instrument, price in zip(instruments, [prices[0], prices[1], {"close":None}]):
+        instrument_json = client.get(f"/instruments/{instrument['id']}/").json()
+        assert instrument_json["close"] == price["close"]
+
+    # Send put request without identifier.
+    response = client.put("/instruments/prices",json=[{"open":1,"high":1,"low":1,"close":1}])
+    assert response.status_code == 400
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /INSTRUMENTS/SEARCH TESTS
+
+def test_search_instruments(client: TestClient):
+    """
+    Test ranked prefix and fuzzy instrument search.
+
+    Args:
+        client (TestClient): Test client.
+    """
+    # Create instruments.
+    for name, symbol in [("VODAFONE GROUP PLC","VOD"),("VODAFONE IDEA","VODI"),("AVIVA PLC","AV."),("C&C GROUP ORD EURO.01","CCR")]:
+        client.post("/instruments/",json={"name":name,"exchange":"LSE","symbol":symbol,"currency":"GBX"})
+
+    # Exact symbol before symbol prefix.
+    response = client.get("/instruments/search",params={"q":"vod"})
+    assert response.status_code == 200
+    assert [instrument["symbol"] for instrument in response.json()["data"]] == ["VOD","VODI"]
+
+    # Name word prefix.
+    response = client.get("/instruments/search",params={"q":"group"})
+    assert [instrument["symbol"] for instrument in response.json()["data"]] == ["CCR","VOD"]
+
+    # Typo in name.
+    response = client.get("/instruments/search",params={"q":"vodafne","limit":1})
+    assert response.json()["data"][0]["symbol"] == "VOD"
+
+    # Instrument created after the index is built.
+    client.post("/instruments/",json={"name":"AVIVA INVESTORS","exchange":"LSE","symbol":"AVI","currency":"GBX"})
+    response = client.get("/instruments/search",params={"q":"av"})
+    assert [instrument["symbol"] for instrument in response.json()["data"]] == ["AV.","AVI"]
+    # Keys stay sorted, so unrelated prefixes don't pick it up.
+    response = client.get("/instruments/search",params={"q":"vod"})
+    assert [instrument["symbol"] for instrument in response.json()["data"]] == ["VOD","VODI"]
+
+    # Deleted instruments leave the index.
+    avi = client.get("/instruments/",params={"symbol":"AVI"}).json()["data"][0]
+    client.delete(f"/instruments/{avi['id']}/")
+    assert avi["id"] not in instrument_search_index.search("av", 20)
+    response = client.get("/instruments/search",params={"q":"av"})
+    assert [instrument["symbol"] for instrument in response.json()["data"]] == ["AV."]
+
+    # Invalid queries.
+    assert client.get("/instruments/search",params={"q":" "}).status_code == 400
+    assert client.get("/instruments/search",params={"q":"vod","limit":0}).status_code == 400
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /INSTRUMENTS/CACHE TESTS
+
+def test_get_instrument_cache_stats(client: TestClient, instrument: Instrument):
+    """
+    Test instrument cache counters.
+
+    Args:
+        client (TestClient): Test client.
+        instrument (Instrument): Test instrument.
+    """
+    # Look up instrument twice.
+    client.get(f"/instruments/{instrument.id}/")
+    client.get(f"/instruments/{instrument.id}/")
+
+    # Send get request.
+    response = client.get("/instruments/cache")
+    stats_json = response.json()
+    assert response.status_code == 200
+    assert stats_json["size"] == 1
+    assert stats_json["hits"] >= 1
+    assert stats_json["misses"] >= 1
+
 # - - - - - - - - - - - - - - - - - - -
 # GET /INSTRUMENTS/{INSTRUMENT_ID} TESTS
 
@@ -235,6 +415,24 @@ def test_delete_instrument(client: TestClient, instrument: Instrument):
     assert instrument_json["currency"] == instrument.currency
 
 
+
+def test_delete_cached_instrument(client: TestClient, instrument: Instrument):
+    """
+    Test delete instrument after it was read into the cache, returning its prices.
+
+    Args:
+        client (TestClient): Test client.
+        instrument (Instrument): Test instrument.
+    """
+    client.put("/instruments/prices",json=[{"id":instrument.id,"open":1,"high":2,"low":0.5,"close":1.5}])
+    assert client.get(f"/instruments/{instrument.id}/").status_code == 200
+
+    # Send delete request.
+    response = client.delete(f"/instruments/{instrument.id}/")
+    assert response.status_code == 200
+    instrument_json = response.json()
+    assert instrument_json["symbol"] == instrument.symbol
+    assert [instrument_json[column] for column in ["open", "high", "low", "close"]] == [1, 2, 0.5, 1.5]
 def test_delete_instrument_invalid(client: TestClient):
     """
     Test delete instrument for invalid instrument.
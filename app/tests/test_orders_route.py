@@ -5,6 +5,7 @@ Created on 07-07-2025
 @author: Harry New
 
 '''
+import json
 import pytest
 from datetime import datetime
 
@@ -149,6 +150,55 @@ def test_get_orders_by_type(client: TestClient, db: Session, user: User, instrum
     assert len(orders_json["data"]) == 1
     assert orders_json["count"] == 1
 
+
+def test_get_orders_paginated(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test paging through orders endpoint.
+
+    Args:
+        client (TestClient): Test client.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = {
+        "volume": 1,
+        "price": 1,
+        "type": "BUY",
+        "instrument_id": instrument.id
+    }
+
+    # Create orders.
+    for day in range(1,4):
+        order_create = OrderCreate(date=datetime(2025,7,day),**properties)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Send get request for first page.
+    response = client.get(f"/users/{user.id}/orders",params={
+        "limit":2
+    })
+    orders_json = response.json()
+    assert response.status_code == 200
+    assert orders_json["count"] == 2
+    assert orders_json["next_cursor"]
+
+    # Send get request for last page.
+    response = client.get(f"/users/{user.id}/orders",params={
+        "limit":2,
+        "after":orders_json["next_cursor"]
+    })
+    orders_json = response.json()
+    assert response.status_code == 200
+    assert orders_json["count"] == 1
+    assert orders_json["data"][0]["date"] == "2025-07-03T00:00:00"
+    assert orders_json["next_cursor"] == None
+
+    # Send get request with invalid cursor.
+    response = client.get(f"/users/{user.id}/orders",params={
+        "after":"invalid"
+    })
+    assert response.status_code == 400
+
 # - - - - - - - - - - - - - - - - - - -
 # POST /USERS/{USER_ID}/ORDERS TESTS
 
@@ -186,6 +236,165 @@ def test_create_order(client: TestClient, db: Session, user: User, instrument: I
     assert order.instrument_id == order_json["instrument_id"]
     assert order.user_id == order_json["user_id"]
 
+# - - - - - - - - - - - - - - - - - - -
+# POST /USERS/{USER_ID}/ORDERS/BATCH TESTS
+
+def test_create_orders(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test creating a basket of orders.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = [{
+        "volume": i,
+        "price": 1,
+        "date": str(datetime(2025,7,i)),
+        "type": "BUY",
+        "instrument_id": instrument.id
+    } for i in range(1,4)]
+
+    # Send post request.
+    response = client.post(f"/users/{user.id}/orders/batch",json=properties)
+    orders_json = response.json()
+    assert response.status_code == 200
+    assert orders_json["count"] == 3
+    assert sorted(order["volume"] for order in orders_json["data"]) == [1,2,3]
+    assert all(order["user_id"] == user.id for order in orders_json["data"])
+
+    # Check database.
+    assert crud.get_orders(session=db, user_id=user.id).count == 3
+
+    # Send post request with unknown instrument.
+    properties[0]["instrument_id"] = 999
+    response = client.post(f"/users/{user.id}/orders/batch",json=properties)
+    assert response.status_code == 400
+    assert crud.get_orders(session=db, user_id=user.id).count == 3
+
+# - - - - - - - - - - - - - - - - - - -
+# POST /USERS/{USER_ID}/ORDERS/IMPORT TESTS
+
+def test_import_orders_csv(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test importing orders from CSV.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # CSV body with a note over two lines, an invalid volume, an unknown
+    # instrument and a dd/mm/yyyy date.
+    body = "\n".join([
+        "date,volume,price,type,instrument_id,note",
+        f'2025-07-01T00:00:00,1,10.5,BUY,{instrument.id},"first',
+        'line"',
+        f"2025-07-02T00:00:00,abc,10.5,BUY,{instrument.id},",
+        "2025-07-03T00:00:00,1,10.5,BUY,999,",
+        f"04/07/2025,2,11,SELL,{instrument.id},",
+    ])
+
+    # Send post request.
+    response = client.post(f"/users/{user.id}/orders/import",content=body,params={
+        "format":"csv"
+    })
+    report_json = response.json()
+    assert response.status_code == 200
+    assert report_json["imported"] == 2
+    assert report_json["failed"] == 2
+    assert [error["row"] for error in report_json["errors"]] == [2,3]
+
+    # Check database.
+    orders = crud.get_orders(session=db, user_id=user.id)
+    assert orders.count == 2
+    assert orders.data[1].volume == 2
+    assert orders.data[1].type == "SELL"
+    assert orders.data[1].date == datetime(2025,7,4)
+
+
+def test_import_orders_ndjson(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test importing orders from NDJSON.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # NDJSON body with a malformed line.
+    body = "\n".join([
+        f'{{"date":"2025-07-01T00:00:00","volume":1,"price":1,"type":"BUY","instrument_id":{instrument.id}}}',
+        '{"date":',
+        f'{{"date":"2025-07-02T00:00:00","volume":1,"price":1,"type":"BUY","instrument_id":{instrument.id}}}',
+    ]) + "\n"
+
+    # Send post request.
+    response = client.post(f"/users/{user.id}/orders/import",content=body,params={
+        "format":"ndjson"
+    })
+    report_json = response.json()
+    assert response.status_code == 200
+    assert report_json["imported"] == 2
+    assert report_json["failed"] == 1
+    assert report_json["errors"][0]["row"] == 2
+
+    # Check unsupported format.
+    response = client.post(f"/users/{user.id}/orders/import",content=body,params={
+        "format":"xml"
+    })
+    assert response.status_code == 400
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /USERS/{USER_ID}/ORDERS/EXPORT TESTS
+
+def test_export_orders(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test exporting orders as NDJSON and CSV.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = {
+        "volume": 1,
+        "price": 1,
+        "instrument_id": instrument.id
+    }
+
+    # Create orders.
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(date=datetime(2025,7,2),type="SELL",**properties))
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(date=datetime(2025,7,1),type="BUY",**properties))
+
+    # Send get request for NDJSON.
+    response = client.get(f"/users/{user.id}/orders/export",params={
+        "format":"ndjson"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["date"] for row in rows] == ["2025-07-01T00:00:00","2025-07-02T00:00:00"]
+    assert rows[0]["type"] == "BUY"
+
+    # Send get request for CSV, filtered by type.
+    response = client.get(f"/users/{user.id}/orders/export",params={
+        "format":"csv",
+        "type":"SELL"
+    })
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,date,volume,price,type,instrument_id"
+    assert len(lines) == 2
+    assert lines[1].endswith(f"2025-07-02T00:00:00,1.0,1.0,SELL,{instrument.id}")
+
 # - - - - - - - - - - - - - - - - - - -
 # DELETE /USERS/{USER_ID}/ORDERS TESTS
 
@@ -225,6 +434,43 @@ def test_delete_orders(client: TestClient, db: Session, user: User, instrument:
     assert len(orders.data) == 0
     assert orders.count == 0
 
+
+def test_delete_orders_by_type(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test delete orders filtered by type.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Properties.
+    properties = {
+        "date": datetime.now(),
+        "volume": 1,
+        "price": 1,
+        "instrument_id": instrument.id,
+    }
+
+    # Create orders.
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="BUY",**properties))
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="SELL",**properties))
+
+    # Delete request.
+    response = client.delete(f"/users/{user.id}/orders",params={
+        "type":"SELL"
+    })
+    orders_json = response.json()
+    assert response.status_code == 200
+    assert orders_json["count"] == 1
+    assert orders_json["data"][0]["type"] == "SELL"
+
+    # Check database.
+    orders = crud.get_orders(session=db, user_id=user.id)
+    assert orders.count == 1
+    assert orders.data[0].type == "BUY"
+
 # - - - - - - - - - - - - - - - - - - -
 # GET /USERS/{USER_ID}/ORDERS/{ORDER_ID} TESTS
 
@@ -0,0 +1,97 @@
+'''
+Module for testing positions endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.models import User, Instrument, OrderCreate, Position
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /USERS/{USER_ID}/POSITIONS TESTS
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_get_positions(client: TestClient, db: Session, user: User, multiple_instruments: list[Instrument]):
+    """
+    Test get positions endpoint.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        multiple_instruments (list[Instrument]): Test multiple instruments.
+    """
+    # Set close price of first instrument.
+    instrument = crud.get_instrument_by_id(session=db, id=1)
+    crud.update_instrument_prices(session=db, instrument=instrument, open=1, high=1, low=1, close=15)
+
+    # Create orders, second instrument fully sold.
+    orders = [
+        (1, "BUY", 10, 10),
+        (1, "BUY", 10, 20),
+        (1, "SELL", 5, 25),
+        (2, "BUY", 3, 5),
+        (2, "SELL", 3, 6),
+    ]
+    for instrument_id, type, volume, price in orders:
+        order_create = OrderCreate(date=datetime.now(), instrument_id=instrument_id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Send get request.
+    response = client.get(f"/users/{user.id}/positions")
+    positions_json = response.json()
+    assert response.status_code == 200
+    assert positions_json["count"] == 1
+    position = positions_json["data"][0]
+    assert position["instrument_id"] == 1
+    assert position["volume"] == 15
+    assert position["average_cost"] == 15
+    assert position["cost_basis"] == 225
+    assert position["realised_pnl"] == 50
+    assert position["gross_invested"] == 300
+    assert position["close"] == 15
+    assert position["market_value"] == 225
+
+
+def test_rebuild_positions(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test rebuilding positions endpoint.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Create order and corrupt its position.
+    order_create = OrderCreate(date=datetime.now(), instrument_id=instrument.id, type="BUY", volume=2, price=3)
+    crud.create_order(session=db, user_id=user.id, order_create=order_create)
+    position = db.exec(select(Position)).one()
+    position.quantity = 100
+    db.commit()
+
+    # Send post request.
+    response = client.post(f"/users/{user.id}/positions/rebuild")
+    positions_json = response.json()
+    assert response.status_code == 200
+    assert positions_json["count"] == 1
+    assert positions_json["data"][0]["volume"] == 2
+    assert positions_json["data"][0]["cost_basis"] == 6
+
+
+def test_get_positions_invalid_user(client: TestClient):
+    """
+    Test get positions for unknown user.
+
+    Args:
+        client (TestClient): Test client.
+    """
+    response = client.get("/users/1/positions")
+    assert response.status_code == 400
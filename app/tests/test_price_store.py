@@ -0,0 +1,158 @@
+'''
+Module for testing memory-mapped price history store.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import Instrument, InstrumentPriceCreate
+from app.core.db import engine
+from app.core import price_store as price_store_module
+from app import main
+from app.core.price_store import PriceStore
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# PRICE STORE TESTS
+
+def test_price_store_read_write(tmp_path):
+    """
+    Test writing bars and reading ranges as views.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    store = PriceStore(tmp_path)
+    dates = np.arange("2025-01-01", "2025-01-11", dtype="datetime64[D]")
+    prices = np.vstack([np.arange(10.0) + offset for offset in range(4)])
+    store.write(1, dates, prices)
+
+    # Range lookup views the map rather than copying.
+    series = store.read(1, date(2025,1,3), date(2025,1,5))
+    assert series.dates.tolist() == [date(2025,1,3), date(2025,1,4), date(2025,1,5)]
+    assert series.close.tolist() == [5, 6, 7]
+    assert isinstance(series.close.base, np.memmap) or isinstance(series.close.base.base, np.memmap)
+    assert len(store.read(2).dates) == 0
+
+    # Overwrite the latest bar in place.
+    store.write(1, dates[-1:], [[1], [2], [3], [4]])
+    assert store.read(1, date(2025,1,10)).close.tolist() == [4]
+
+    # Merge earlier, repeated and later bars.
+    store.write(1, np.array(["2024-12-31", "2025-01-05", "2025-01-12"], "datetime64[D]"), np.full((4, 3), -1.0))
+    series = store.read(1)
+    assert len(series.dates) == 12
+    assert np.all(series.dates[1:] > series.dates[:-1])
+    assert series.close[[0, 5, 11]].tolist() == [-1, -1, -1]
+
+    store.delete(1)
+    assert len(store.read(1).dates) == 0
+
+
+
+def test_price_store_threads(tmp_path, monkeypatch):
+    """
+    Test concurrent reads and writes while open maps are evicted.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+        monkeypatch (MonkeyPatch): Pytest monkeypatch.
+    """
+    monkeypatch.setattr(price_store_module, "MAX_OPEN_MAPS", 2)
+    store = PriceStore(tmp_path)
+    dates = np.arange("2025-01-01", "2025-01-06", dtype="datetime64[D]")
+    for instrument_id in range(8):
+        store.write(instrument_id, dates, np.full((4, 5), float(instrument_id)))
+
+    def work(instrument_id: int) -> float:
+        if instrument_id % 4 == 0:
+            store.write(instrument_id % 8, dates[-1:], np.full((4, 1), float(instrument_id % 8)))
+        return store.read(instrument_id % 8).close[-1]
+
+    with ThreadPoolExecutor(8) as executor:
+        closes = list(executor.map(work, range(2000)))
+    assert closes == [float(instrument_id % 8) for instrument_id in range(2000)]
+
+
+def test_price_store_sync(tmp_path, monkeypatch, instrument: Instrument):
+    """
+    Test committed price updates reach the store and rolled back ones don't.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+        monkeypatch (MonkeyPatch): Patching fixture.
+        instrument (Instrument): Test instrument.
+    """
+    store = PriceStore(tmp_path)
+    monkeypatch.setattr(crud, "price_store", store)
+
+    with Session(engine) as session:
+        crud.upsert_instrument_prices(session=session, prices=[
+            InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,1,day), open=1, high=2, low=0.5, close=day)
+            for day in range(1, 4)
+        ])
+        db_instrument = crud.get_instrument_by_id(session=session, id=instrument.id)
+        crud.update_instrument_prices(session=session, instrument=db_instrument, open=1, high=1, low=1, close=9)
+        assert store.read(instrument.id).close.tolist() == [1, 2, 3, 9]
+        assert store.read(instrument.id).dates[-1] == np.datetime64(date.today())
+
+        # Uncommitted bars are discarded.
+        crud._upsert_price_bars(session=session, rows=[
+            {"instrument_id": instrument.id, "date": date(2025,1,1), "open": 0, "high": 0, "low": 0, "close": 0}
+        ])
+        session.rollback()
+        assert store.read(instrument.id).close[0] == 1
+
+        # Rebuild from the db matches.
+        rebuilt = PriceStore(tmp_path / "rebuilt")
+        assert crud.rebuild_price_store(session=session, store=rebuilt) == 4
+        assert rebuilt.read(instrument.id).close.tolist() == [1, 2, 3, 9]
+
+        crud.delete_instrument(session=session, instrument=crud.get_instrument_by_id(session=session, id=instrument.id))
+        assert len(store.read(instrument.id).dates) == 0
+
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_price_store_fallback(tmp_path, monkeypatch, multiple_instruments: list[Instrument]):
+    """
+    Test instruments missing from the store are read from the db, and startup fills an empty store.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+        monkeypatch (MonkeyPatch): Patching fixture.
+        multiple_instruments (list[Instrument]): Test instruments.
+    """
+    first, second = 1, 2
+    with Session(engine) as session:
+        crud.upsert_instrument_prices(session=session, prices=[
+            InstrumentPriceCreate(instrument_id=id, date=date(2025,1,day), close=day * id)
+            for id in [first, second] for day in range(1, 4)
+        ])
+
+        # Configured after history was loaded, with only one instrument written since.
+        store = PriceStore(tmp_path)
+        assert store.empty
+        monkeypatch.setattr(crud, "price_store", store)
+        store.write(second, np.array(["2025-01-03"], "datetime64[D]"), [[1], [1], [1], [-1]])
+        indexes, dates, closes = crud._get_close_arrays(
+            session=session, instrument_ids=np.array([first, second]), start_date=date(2025,1,2), end_date=date(2025,1,3)
+        )
+        assert indexes.tolist() == [0, 0, 0, 1]
+        assert dates.tolist() == [date(2025,1,1), date(2025,1,2), date(2025,1,3), date(2025,1,3)]
+        assert closes.tolist() == [first, 2 * first, 3 * first, -1]
+
+    # Startup rebuilds an empty store.
+    rebuilt = PriceStore(tmp_path / "rebuilt")
+    monkeypatch.setattr(main, "price_store", rebuilt)
+    with TestClient(main.app):
+        pass
+    assert rebuilt.read(first).close.tolist() == [first, 2 * first, 3 * first]
+    assert not rebuilt.empty
@@ -0,0 +1,64 @@
+'''
+Module for testing live price streaming endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import Instrument
+from app.core.hub import Subscriber
+
+# - - - - - - - - - - - - - - - - - - -
+# WEBSOCKET /WS/PRICES TESTS
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_stream_prices(client: TestClient, multiple_instruments: list[Instrument]):
+    """
+    Test subscribers receive updates for subscribed instruments only.
+
+    Args:
+        client (TestClient): Test client.
+        multiple_instruments (list[Instrument]): Test instruments.
+    """
+    first_id, second_id = [instrument["id"] for instrument in client.get("/instruments/").json()["data"]]
+
+    with client.websocket_connect("/ws/prices") as websocket:
+        # Subscribe to first instrument.
+        websocket.send_json({"subscribe": [first_id]})
+        assert websocket.receive_json() == {"subscribed": [first_id]}
+
+        # Update both instruments, by single and bulk updates.
+        client.put(f"/instruments/{second_id}/",json={"prices":[1,2,3,4]})
+        client.put(f"/instruments/{first_id}/",json={"prices":[5,6,7,8]})
+        assert websocket.receive_json() == {"instrument_id":first_id,"open":5,"high":6,"low":7,"close":8}
+        client.put("/instruments/prices",json=[
+            {"id":second_id,"open":1,"high":1,"low":1,"close":1},
+            {"id":first_id,"open":9,"high":9,"low":9,"close":9}
+        ])
+        assert websocket.receive_json() == {"instrument_id":first_id,"open":9,"high":9,"low":9,"close":9}
+
+        # Invalid message keeps the connection open.
+        websocket.send_json({"subscribe": "all"})
+        assert "detail" in websocket.receive_json()
+        websocket.send_json({"unsubscribe": [first_id]})
+        assert websocket.receive_json() == {"subscribed": []}
+
+
+def test_subscriber_drops_oldest():
+    """
+    Test a full subscriber queue drops its oldest update.
+    """
+    async def fill():
+        subscriber = Subscriber(size=2)
+        for close in range(3):
+            subscriber.offer({"instrument_id": 1, "close": close})
+        return subscriber, [subscriber.queue.get_nowait()["close"] for _ in range(2)]
+
+    subscriber, closes = asyncio.run(fill())
+    assert closes == [1, 2]
+    assert subscriber.dropped == 1
@@ -0,0 +1,97 @@
+'''
+Module for testing realised profit and loss endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Instrument, OrderCreate
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# GET /USERS/{USER_ID}/REALISED-PNL TESTS
+
+@pytest.mark.parametrize("method,total,buy_order_ids", [
+    ("FIFO", 10, [1]),
+    ("LIFO", -10, [3]),
+    ("HIFO", -10, [3]),
+    ("AVERAGE", 0, [None]),
+])
+def test_get_realised_pnl(client: TestClient, db: Session, user: User, instrument: Instrument, method: str, total: float, buy_order_ids: list):
+    """
+    Test realised profit and loss for each lot matching method.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+        method (str): Lot matching method.
+        total (float): Expected total.
+        buy_order_ids (list): Expected matched buy order ids.
+    """
+    # Create orders.
+    orders = [
+        (datetime(2025,7,1), "BUY", 10, 10),
+        (datetime(2025,7,2), "BUY", 10, 11),
+        (datetime(2025,7,3), "BUY", 10, 12),
+        (datetime(2025,7,4), "SELL", 10, 11),
+    ]
+    for date, type, volume, price in orders:
+        order_create = OrderCreate(date=date, instrument_id=instrument.id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Send get request.
+    response = client.get(f"/users/{user.id}/realised-pnl",params={
+        "method":method
+    })
+    pnl_json = response.json()
+    assert response.status_code == 200
+    assert pnl_json["method"] == method
+    assert pnl_json["total"] == pytest.approx(total)
+    assert [lot["buy_order_id"] for lot in pnl_json["data"]] == buy_order_ids
+    assert all(lot["sell_order_id"] == 4 for lot in pnl_json["data"])
+
+
+def test_get_realised_pnl_user_method(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test realised profit and loss uses the user's lot method.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    # Create orders, sell split across two lots.
+    orders = [
+        (datetime(2025,7,1), "BUY", 5, 10),
+        (datetime(2025,7,2), "BUY", 5, 20),
+        (datetime(2025,7,3), "SELL", 6, 15),
+    ]
+    for date, type, volume, price in orders:
+        order_create = OrderCreate(date=date, instrument_id=instrument.id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    # Set user lot method.
+    response = client.put(f"/users/{user.id}/",json={"lot_method":"LIFO"})
+    assert response.status_code == 200
+    assert response.json()["lot_method"] == "LIFO"
+
+    # Send get request.
+    response = client.get(f"/users/{user.id}/realised-pnl")
+    pnl_json = response.json()
+    assert response.status_code == 200
+    assert pnl_json["method"] == "LIFO"
+    assert [(lot["buy_order_id"], lot["volume"]) for lot in pnl_json["data"]] == [(2,5),(1,1)]
+    assert pnl_json["total"] == pytest.approx(-25 + 5)
+
+    # Send get request with unsupported method.
+    response = client.get(f"/users/{user.id}/realised-pnl",params={"method":"test"})
+    assert response.status_code == 400
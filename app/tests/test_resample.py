@@ -0,0 +1,87 @@
+'''
+Module for testing tick resampling.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlmodel import Session
+
+from app.models import Instrument
+from app.core.resample import BarResampler, resample
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# RESAMPLE TESTS
+
+def test_resample():
+    """
+    Test ticks of two instruments are resampled into minute bars.
+    """
+    instrument_ids = [1, 2, 1, 1, 2, 1]
+    timestamps = np.array([
+        "2025-07-01T08:00:05", "2025-07-01T08:00:10", "2025-07-01T08:00:30",
+        "2025-07-01T08:00:59", "2025-07-01T08:01:00", "2025-07-01T08:02:00"
+    ], "datetime64[ns]")
+    prices = [10, 50, 12, 9, 51, 11]
+    volumes = [1, 2, 3, 4, 5, 6]
+
+    bars = resample(instrument_ids, timestamps, prices, "1m", volumes)
+    assert bars.instrument_id.tolist() == [1, 1, 2, 2]
+    assert bars.start.astype(str).tolist() == ["2025-07-01T08:00:00", "2025-07-01T08:02:00", "2025-07-01T08:00:00", "2025-07-01T08:01:00"]
+    assert bars.open.tolist() == [10, 11, 50, 51]
+    assert bars.high.tolist() == [12, 11, 50, 51]
+    assert bars.low.tolist() == [9, 11, 50, 51]
+    assert bars.close.tolist() == [9, 11, 50, 51]
+    assert bars.volume.tolist() == [8, 6, 2, 5]
+
+    with pytest.raises(ValueError):
+        BarResampler("2m")
+
+
+def test_resampler_incremental():
+    """
+    Test incremental updates match resampling all ticks at once.
+    """
+    rng = np.random.default_rng(0)
+    instrument_ids = rng.integers(0, 5, 1000)
+    timestamps = np.datetime64("2025-07-01T08:00:00", "ns") + np.sort(rng.integers(0, 3600 * 10**9, 1000)).astype("timedelta64[ns]")
+    prices = rng.random(1000)
+    expected = resample(instrument_ids, timestamps, prices, "5m")
+
+    # Feed in uneven batches.
+    resampler = BarResampler("5m")
+    parts = [resampler.update(instrument_ids[i:i + 97], timestamps[i:i + 97], prices[i:i + 97]) for i in range(0, 1000, 97)]
+    parts.append(resampler.flush())
+    bars = [np.concatenate(field) for field in zip(*parts)]
+    order = np.lexsort((bars[1], bars[0]))
+    for field, expected_field in zip(bars, expected):
+        assert (field[order] == expected_field).all()
+
+    # Ticks before an open bar are counted as late, not placed.
+    resampler = BarResampler("5m")
+    resampler.update(instrument_ids[-1:], timestamps[-1:], prices[-1:])
+    resampler.update(instrument_ids[-1:], timestamps[:1], prices[:1])
+    assert resampler.late == 1
+
+
+def test_store_daily_bars(db: Session, instrument: Instrument):
+    """
+    Test daily bars are written to price history and current prices.
+
+    Args:
+        db (Session): SQL session.
+        instrument (Instrument): Test instrument.
+    """
+    today = np.datetime64(date.today(), "ns")
+    timestamps = np.array([np.datetime64("2025-07-01T08:00", "ns"), np.datetime64("2025-07-01T09:00", "ns"), today, today + np.timedelta64(1, "h")])
+    bars = resample([instrument.id] * 4, timestamps, [1, 2, 3, 4], "1d")
+
+    assert crud.store_daily_bars(session=db, bars=bars) == 2
+    prices = crud.get_instrument_prices(session=db, instrument_id=instrument.id)
+    assert [(bar.date, bar.close) for bar in prices.data] == [(date(2025,7,1), 2), (date.today(), 4)]
+    assert crud.get_instrument_by_id(session=db, id=instrument.id).close == 4
@@ -0,0 +1,80 @@
+'''
+Module for testing portfolio returns endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Instrument, InstrumentPriceCreate, OrderCreate
+from app.core.returns import period_starts, time_weighted_returns, xirr
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# RETURNS TESTS
+
+def test_return_calculators():
+    """
+    Test period starts, chain-linked returns and the vectorised XIRR solver.
+    """
+    starts = period_starts(date(2025,8,20), date(2025,2,3))
+    assert starts == {"MTD": date(2025,8,1), "QTD": date(2025,7,1), "YTD": date(2025,2,3), "ITD": date(2025,2,3)}
+
+    # Doubling, then a deposit with no growth.
+    returns = time_weighted_returns(np.array([100.0, 200.0, 400.0]), np.array([100.0, 0.0, 200.0]), np.array([0, 2]))
+    assert returns.tolist() == [1.0, 0.0]
+
+    # Padded rows, the last without a sign change.
+    rates = xirr(
+        np.array([[-100.0, 110.0, 0.0], [-1000.0, 500.0, 600.0], [100.0, 0.0, 0.0]]),
+        np.array([[0.0, 1.0, 0.0], [0.0, 0.5, 1.0], [0.0, 0.0, 0.0]])
+    )
+    assert rates[0] == pytest.approx(0.1)
+    assert -1000 + 500 / (1 + rates[1]) ** 0.5 + 600 / (1 + rates[1]) == pytest.approx(0, abs=1e-6)
+    assert np.isnan(rates[2])
+
+
+@pytest.mark.parametrize("multiple_users", [2], indirect=True)
+def test_get_returns(client: TestClient, db: Session, multiple_users: list[User], instrument: Instrument):
+    """
+    Test get returns endpoint and the batch for all users.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        multiple_users (list[User]): Test users.
+        instrument (Instrument): Test instrument.
+    """
+    crud.upsert_instrument_prices(session=db, prices=[
+        InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,1,1), close=10),
+        InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,6,30), close=12),
+    ])
+    crud.create_order(session=db, user_id=1, order_create=OrderCreate(date=datetime(2025,1,1,9), instrument_id=instrument.id, type="BUY", volume=10, price=10))
+    crud.create_order(session=db, user_id=2, order_create=OrderCreate(date=datetime(2025,6,1,9), instrument_id=instrument.id, type="BUY", volume=5, price=10))
+
+    response = client.get("/users/1/returns", params={"as_of": "30/06/2025"})
+    assert response.status_code == 200
+    returns = {period["period"]: period for period in response.json()["data"]}
+    assert list(returns) == ["MTD", "QTD", "YTD", "ITD"]
+    assert returns["QTD"]["start_date"] == "2025-04-01"
+    for period in returns.values():
+        assert period["time_weighted"] == pytest.approx(0.2)
+    # Invested at the end of the first day, valued 180 days later.
+    assert returns["ITD"]["money_weighted"] == pytest.approx(1.2 ** (365 / 180) - 1)
+
+    # Batch matches each user.
+    batch = crud.get_all_returns(session=db, as_of=date(2025,6,30))
+    assert set(batch) == {1, 2}
+    for user_id in batch:
+        assert batch[user_id] == crud.get_returns(session=db, user_id=user_id, as_of=date(2025,6,30))
+    assert batch[2].data[0].start_date == date(2025,6,1)
+
+    # No orders by the date, and invalid user.
+    assert client.get("/users/2/returns", params={"as_of": "01/01/2025"}).json() == {"data": [], "count": 0}
+    assert client.get("/users/999/returns").status_code == 400
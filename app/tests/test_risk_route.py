@@ -0,0 +1,110 @@
+'''
+Module for testing portfolio risk endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Instrument, InstrumentPriceCreate, OrderCreate
+from app.core.risk import RiskCache, historical_var, max_drawdown, risk_cache, rolling_volatility
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# RISK TESTS
+
+def test_risk_metrics():
+    """
+    Test drawdown, rolling volatility and value at risk against direct calculations.
+    """
+    drawdown, peak, trough = max_drawdown(np.array([np.nan, 0.1, -0.5, 0.2]))
+    assert drawdown == pytest.approx(-0.5)
+    assert (peak, trough) == (1, 2)
+
+    returns = np.random.default_rng(0).normal(0, 0.01, 250)
+    rolling = rolling_volatility(returns, 20)
+    assert len(rolling) == 231
+    assert rolling[-1] == pytest.approx(returns[-20:].std(ddof=1) * np.sqrt(365))
+    assert len(rolling_volatility(returns[:5], 20)) == 0
+
+    var_95, var_99 = historical_var(returns)
+    assert var_95 == -np.quantile(returns, 0.05, method="inverted_cdf")
+    assert var_99 == -np.quantile(returns, 0.01, method="inverted_cdf")
+
+
+def test_risk_cache():
+    """
+    Test entries are dropped by user or instrument, and racing puts are discarded.
+    """
+    cache = RiskCache()
+    cache.put((1, "a"), "one", {10, 11}, cache.version)
+    cache.put((2, "a"), "two", {11}, cache.version)
+    assert cache.get((1, "a")) == "one"
+
+    cache.invalidate(user_ids={1})
+    assert cache.get((1, "a")) is None and cache.get((2, "a")) == "two"
+    cache.invalidate(instrument_ids={11})
+    assert len(cache) == 0
+
+    version = cache.version
+    cache.invalidate(instrument_ids={12})
+    cache.put((1, "a"), "stale", {12}, version)
+    assert cache.get((1, "a")) is None
+
+
+def test_get_risk(client: TestClient, db: Session, user: User, instrument: Instrument):
+    """
+    Test get risk endpoint, and its cache following prices and orders.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        instrument (Instrument): Test instrument.
+    """
+    crud.upsert_instrument_prices(session=db, prices=[
+        InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,1,day), close=close)
+        for day, close in enumerate([10, 12, 6, 9, 9, 12], start=1)
+    ])
+    order_create = OrderCreate(date=datetime(2025,1,1,9), instrument_id=instrument.id, type="BUY", volume=10, price=10)
+    crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    params = {"end": "06/01/2025", "window": 3}
+    response = client.get(f"/users/{user.id}/risk", params=params)
+    assert response.status_code == 200
+    risk = response.json()
+    assert risk["observations"] == 5
+    assert risk["max_drawdown"] == pytest.approx(-0.5)
+    assert (risk["drawdown_peak"], risk["drawdown_trough"]) == ("2025-01-02", "2025-01-03")
+    assert risk["var_95"] == risk["var_99"] == pytest.approx(0.5)
+    assert risk["rolling_dates"] == ["2025-01-04", "2025-01-05", "2025-01-06"]
+    assert risk["rolling_volatility"][0] == pytest.approx(np.std([0.2, -0.5, 0.5], ddof=1) * np.sqrt(365))
+    assert len(risk_cache) == 1
+
+    # Price changes drop the cached metrics.
+    crud.upsert_instrument_prices(session=db, prices=[InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,1,3), close=3)])
+    assert len(risk_cache) == 0
+    assert client.get(f"/users/{user.id}/risk", params=params).json()["max_drawdown"] == pytest.approx(-0.75)
+
+    # Writes from other processes are caught by the db versions, even if
+    # the entry was never dropped here.
+    entry = risk_cache.get((user.id, None, date(2025,1,6), 3))
+    crud.upsert_instrument_prices(session=db, prices=[InstrumentPriceCreate(instrument_id=instrument.id, date=date(2025,1,3), close=4.5)])
+    risk_cache.put((user.id, None, date(2025,1,6), 3), entry, {instrument.id}, risk_cache.version)
+    assert client.get(f"/users/{user.id}/risk", params=params).json()["max_drawdown"] == pytest.approx(-0.625)
+
+    # As do orders.
+    order_create = OrderCreate(date=datetime(2025,1,5,9), instrument_id=instrument.id, type="SELL", volume=5, price=9)
+    crud.create_order(session=db, user_id=user.id, order_create=order_create)
+    assert len(risk_cache) == 0
+
+    # Invalid window, range and user.
+    assert client.get(f"/users/{user.id}/risk", params={"window": 1}).status_code == 400
+    assert client.get(f"/users/{user.id}/risk", params={"start": "01/02/2025", "end": "01/01/2025"}).status_code == 400
+    assert client.get("/users/999/risk").status_code == 400
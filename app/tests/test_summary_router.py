@@ -5,9 +5,13 @@ Created on 16-07-2025
 @author: Harry New
 
 '''
+from datetime import datetime
+
 from fastapi.testclient import TestClient
+from sqlmodel import Session
 
-from app.models import User, Summary, SummaryUpdate
+from app.models import User, Summary, SummaryUpdate, Instrument, OrderCreate
+from app import crud
 
 # - - - - - - - - - - - - - - - - - - -
 
@@ -27,14 +31,48 @@ def test_get_summary(client: TestClient, user: User, summary: Summary):
     # Check summary.
     assert response.status_code == 200
     assert summary_json["user_id"] == user.id
-    assert summary_json["ending_market_value"] == None
-    assert summary_json["beginning_market_value"] == None
-    assert summary_json["profit_loss"] == None
+    assert summary_json["ending_market_value"] == 0
+    assert summary_json["beginning_market_value"] == 0
+    assert summary_json["profit_loss"] == 0
+
+
+def test_get_summary_computed(client: TestClient, db: Session, user: User, summary: Summary, instrument: Instrument):
+    """
+    Test get summary computes values from orders and closes.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        summary (Summary): Test summary.
+        instrument (Instrument): Test instrument.
+    """
+    # Set close price.
+    instrument = crud.get_instrument_by_id(session=db, id=instrument.id)
+    crud.update_instrument_prices(session=db, instrument=instrument, open=1, high=1, low=1, close=12)
+
+    # Create orders.
+    properties = {
+        "date": datetime.now(),
+        "instrument_id": instrument.id
+    }
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="BUY",volume=10,price=10,**properties))
+    crud.create_order(session=db, user_id=user.id, order_create=OrderCreate(type="SELL",volume=4,price=11,**properties))
+
+    # Send get request to endpoint.
+    response = client.get(f"/users/{user.id}/summary")
+    summary_json = response.json()
+
+    # Check summary.
+    assert response.status_code == 200
+    assert summary_json["beginning_market_value"] == 56
+    assert summary_json["ending_market_value"] == 72
+    assert summary_json["profit_loss"] == 16
 
 
 def test_put_summary(client: TestClient, user: User, summary: Summary):
     """
-    Test updating summary.
+    Test summary values can't be overwritten, as order writes maintain them.
 
     Args:
         client (TestClient): Test client.
@@ -47,11 +85,33 @@ def test_put_summary(client: TestClient, user: User, summary: Summary):
         "beginning_market_value":1,
         "profit_loss":1
     }
-    
+
     # Send put request.
     response = client.put(f"/users/{user.id}/summary",json=properties)
-    updated_summary = response.json()
+    assert response.status_code == 405
+    assert client.get(f"/users/{user.id}/summary").json()["ending_market_value"] == 0
+
+
+def test_rebuild_summary(client: TestClient, db: Session, user: User, summary: Summary):
+    """
+    Test rebuilding summary after values were overwritten.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        summary (Summary): Test summary.
+    """
+    # Overwrite summary values.
+    summary = crud.get_summary_by_id(session=db, summary_id=summary.id)
+    crud.update_summary(session=db, summary=summary, summary_update=SummaryUpdate(ending_market_value=1,beginning_market_value=1,profit_loss=1))
+
+    # Send post request to endpoint.
+    response = client.post(f"/users/{user.id}/summary/rebuild")
+    summary_json = response.json()
 
+    # Check summary.
     assert response.status_code == 200
-    for key in properties:
-        assert updated_summary[key] == properties[key]
\ No newline at end of file
+    assert summary_json["ending_market_value"] == 0
+    assert summary_json["beginning_market_value"] == 0
+    assert summary_json["profit_loss"] == 0
\ No newline at end of file
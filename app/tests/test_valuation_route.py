@@ -0,0 +1,92 @@
+'''
+Module for testing portfolio valuation endpoint.
+
+Created on 17-10-2026
+@author: Harry New
+
+'''
+import pytest
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.models import User, Instrument, InstrumentPriceCreate, OrderCreate
+from app.core.price_store import PriceStore
+from app.core.valuation import forward_fill, value_portfolio
+from app import crud
+
+# - - - - - - - - - - - - - - - - - - -
+# VALUATION TESTS
+
+def test_value_portfolio():
+    """
+    Test valuing holdings against forward-filled closes.
+    """
+    nan = np.nan
+    assert np.array_equal(forward_fill(np.array([[nan, 1, nan, 2, nan]])), [[nan, 1, 1, 2, 2]], equal_nan=True)
+
+    series = value_portfolio(
+        np.datetime64("2025-01-02"),
+        np.datetime64("2025-01-06"),
+        # Buy before the range, sell within it, and buy an instrument without closes.
+        np.array([0, 0, 1]),
+        np.array(["2024-12-30", "2025-01-04", "2025-01-03"], "datetime64[us]"),
+        np.array([10.0, -4.0, 2.0]),
+        np.array([5.0, 8.0, 3.0]),
+        np.array([0, 0, 0]),
+        np.array(["2024-12-31", "2025-01-03", "2025-01-05"], "datetime64[D]"),
+        np.array([6.0, 7.0, nan])
+    )
+    assert series.dates[0] == np.datetime64("2025-01-02") and len(series.dates) == 5
+    assert series.market_value.tolist() == [60, 76, 48, 48, 48]
+    assert series.net_invested.tolist() == [50, 56, 24, 24, 24]
+
+
+@pytest.mark.parametrize("multiple_instruments", [2], indirect=True)
+def test_get_valuation(client: TestClient, db: Session, user: User, multiple_instruments: list[Instrument], tmp_path, monkeypatch):
+    """
+    Test get valuation endpoint, from the db and the price store.
+
+    Args:
+        client (TestClient): Test client.
+        db (Session): SQL session.
+        user (User): Test user.
+        multiple_instruments (list[Instrument]): Test multiple instruments.
+        tmp_path (Path): Temporary directory.
+        monkeypatch (MonkeyPatch): Patching fixture.
+    """
+    crud.upsert_instrument_prices(session=db, prices=[
+        InstrumentPriceCreate(instrument_id=1, date=date(2025,1,day), close=day)
+        for day in [1, 3, 6]
+    ])
+    orders = [
+        (datetime(2025,1,2,9), 1, "BUY", 10, 2),
+        (datetime(2025,1,4,9), 2, "BUY", 5, 4),
+        (datetime(2025,1,5,9), 1, "SELL", 5, 4),
+    ]
+    for order_date, instrument_id, type, volume, price in orders:
+        order_create = OrderCreate(date=order_date, instrument_id=instrument_id, type=type, volume=volume, price=price)
+        crud.create_order(session=db, user_id=user.id, order_create=order_create)
+
+    response = client.get(f"/users/{user.id}/valuation", params={"end": "06/01/2025"})
+    assert response.status_code == 200
+    valuation = response.json()
+    assert valuation["count"] == 5
+    assert valuation["dates"][0] == "2025-01-02"
+    assert valuation["market_value"] == [10, 30, 50, 35, 50]
+    assert valuation["net_invested"] == [20, 20, 40, 20, 20]
+    assert valuation["profit_loss"] == [-10, 10, 10, 15, 30]
+
+    # Price store gives the same series.
+    store = PriceStore(tmp_path)
+    crud.rebuild_price_store(session=db, store=store)
+    monkeypatch.setattr(crud, "price_store", store)
+    assert client.get(f"/users/{user.id}/valuation", params={"end": "06/01/2025"}).json() == valuation
+    partial = client.get(f"/users/{user.id}/valuation", params={"start": "05/01/2025", "end": "06/01/2025"}).json()
+    assert partial["market_value"] == [35, 50]
+
+    # Invalid range and user.
+    assert client.get(f"/users/{user.id}/valuation", params={"start": "01/02/2025", "end": "01/01/2025"}).status_code == 400
+    assert client.get("/users/999/valuation").status_code == 400